@@ -1,9 +1,11 @@
 use std::{
+    cell::Cell,
     cell::RefCell,
     cell::RefMut,
-    collections::HashMap,
+    collections::{HashMap, HashSet},
     rc::Rc,
     convert::TryInto,
+    time::{Duration, Instant},
 };
 
 use log::{error, info, trace, warn};
@@ -17,9 +19,12 @@ use solana_program::{
     instruction::AccountMeta,
 };
 
+use solana_client::rpc_request::MAX_MULTIPLE_ACCOUNTS;
+
 use solana_sdk::{
     account::Account,
     account_info::AccountInfo,
+    clock::DEFAULT_MS_PER_SLOT,
     pubkey::Pubkey,
     sysvar::rent
 };
@@ -39,6 +44,9 @@ use crate::NeonCliError;
 
 use spl_associated_token_account::{get_associated_token_address};
 
+/// Accounts read from Solana are reused by the following emulations for at most one slot
+const FETCHED_ACCOUNTS_MAX_AGE: Duration = Duration::from_millis(DEFAULT_MS_PER_SLOT);
+
 #[derive(Debug, Clone)]
 pub struct TokenAccount {
     owner: Pubkey,
@@ -107,6 +115,16 @@ struct SolanaAccount {
     code_size_current: Option<usize>,
 }
 
+/// Solana account as it was read by the storage, `account` is None if it didn't exist
+#[derive(Debug, Clone)]
+pub struct AccountSnapshot {
+    /// Ethereum account the Solana account belongs to
+    pub address: H160,
+    pub key: Pubkey,
+    pub slot: u64,
+    pub account: Option<Account>,
+}
+
 struct SolanaNewAccount {
     key: Pubkey,
     writable: bool,
@@ -132,6 +150,14 @@ pub struct EmulatorAccountStorage<'a> {
     new_accounts: RefCell<HashMap<H160, SolanaNewAccount>>,
     pub solana_accounts: RefCell<HashMap<Pubkey, AccountMeta>>,
     pub token_accounts: RefCell<HashMap<Pubkey, TokenAccount>>,
+    /// Ethereum accounts (and their code accounts) read from Solana, kept across `reset`
+    fetched_accounts: RefCell<HashMap<H160, Option<(Account, Option<Account>)>>>,
+    /// Solana accounts read with `getMultipleAccounts` and the slots they were read at, kept across `reset`
+    snapshots: RefCell<HashMap<Pubkey, (u64, Option<Account>)>>,
+    /// When `fetched_accounts` and `snapshots` were cleared last
+    fetched_since: Cell<Instant>,
+    /// Addresses the emulation may use, read together with the first account missing from `fetched_accounts`
+    expected: RefCell<Vec<H160>>,
     config: &'a Config,
     block_number: u64,
     block_timestamp: i64,
@@ -166,6 +192,10 @@ impl<'a> EmulatorAccountStorage<'a> {
             new_accounts: RefCell::new(HashMap::new()),
             solana_accounts: RefCell::new(HashMap::new()),
             token_accounts: RefCell::new(HashMap::new()),
+            fetched_accounts: RefCell::new(HashMap::new()),
+            snapshots: RefCell::new(HashMap::new()),
+            fetched_since: Cell::new(Instant::now()),
+            expected: RefCell::new(Vec::new()),
             config,
             block_number: slot,
             block_timestamp: timestamp,
@@ -208,6 +238,160 @@ impl<'a> EmulatorAccountStorage<'a> {
         }
     }
 
+    /// Forgets the accounts used by the previous emulation.
+    /// Accounts read from Solana are reused unless they were read more than a slot ago.
+    pub fn reset(&self) {
+        self.accounts.borrow_mut().clear();
+        self.new_accounts.borrow_mut().clear();
+        self.solana_accounts.borrow_mut().clear();
+        self.token_accounts.borrow_mut().clear();
+        self.expected.borrow_mut().clear();
+
+        if self.fetched_since.get().elapsed() > FETCHED_ACCOUNTS_MAX_AGE {
+            self.fetched_accounts.borrow_mut().clear();
+            self.snapshots.borrow_mut().clear();
+            self.fetched_since.set(Instant::now());
+        }
+    }
+
+    /// Reads the Ethereum accounts of `addresses` (and their code accounts) which weren't read yet,
+    /// with one `getMultipleAccounts` request for the accounts and one for the code accounts.
+    pub fn prefetch(&self, addresses: &[H160]) {
+        let addresses: Vec<H160> = {
+            let fetched_accounts = self.fetched_accounts.borrow();
+            let mut unique = HashSet::new();
+            addresses.iter()
+                .filter(|address| !fetched_accounts.contains_key(address) && unique.insert(**address))
+                .copied()
+                .collect()
+        };
+        if addresses.is_empty() {
+            return;
+        }
+        info!("Prefetch {} accounts", addresses.len());
+
+        let keys: Vec<Pubkey> = addresses.iter()
+            .map(|address| make_solana_program_address(address, &self.config.evm_loader).0)
+            .collect();
+        let accounts = match self.get_multiple_accounts(&keys) {
+            Some(accounts) => accounts,
+            None => return,
+        };
+
+        // None for accounts which don't exist or aren't Ethereum accounts, the same as get_account_from_solana
+        let accounts: Vec<Option<(Account, Option<Pubkey>)>> = accounts.into_iter()
+            .zip(&keys)
+            .map(|(account, key)| {
+                let mut account = account?;
+                let code_address = {
+                    let info = account_info(key, &mut account);
+                    EthereumAccount::from_account(&self.config.evm_loader, &info).ok()?.code_account
+                };
+                Some((account, code_address))
+            })
+            .collect();
+
+        let code_keys: Vec<Pubkey> = accounts.iter()
+            .flatten()
+            .filter_map(|(_, code_address)| *code_address)
+            .collect();
+        let mut code_accounts: HashMap<Pubkey, Option<Account>> = match self.get_multiple_accounts(&code_keys) {
+            Some(code_accounts) => code_keys.into_iter().zip(code_accounts).collect(),
+            None => return,
+        };
+
+        let mut fetched_accounts = self.fetched_accounts.borrow_mut();
+        for (address, account) in addresses.into_iter().zip(accounts) {
+            let account = account.map(|(account, code_address)| {
+                let code_account = code_address.and_then(|code_address| code_accounts.remove(&code_address).flatten());
+                (account, code_account)
+            });
+            fetched_accounts.insert(address, account);
+        }
+    }
+
+    /// Remembers addresses the emulation may use: they aren't read now, but with the first account
+    /// which has to be read from Solana, in the same `getMultipleAccounts` request.
+    pub fn expect(&self, addresses: &[H160]) {
+        self.expected.borrow_mut().extend_from_slice(addresses);
+    }
+
+    /// `getMultipleAccounts` split into requests of the maximum size, None if any of them fails
+    fn get_multiple_accounts(&self, keys: &[Pubkey]) -> Option<Vec<Option<Account>>> {
+        let commitment = self.config.rpc_client.commitment();
+        let mut accounts = Vec::with_capacity(keys.len());
+        for chunk in keys.chunks(MAX_MULTIPLE_ACCOUNTS) {
+            match self.config.rpc_client.get_multiple_accounts_with_commitment(chunk, commitment) {
+                Ok(response) => {
+                    let mut snapshots = self.snapshots.borrow_mut();
+                    for (key, account) in chunk.iter().zip(&response.value) {
+                        snapshots.insert(*key, (response.context.slot, account.clone()));
+                    }
+                    accounts.extend(response.value);
+                },
+                Err(e) => {
+                    warn!("getMultipleAccounts error: {}", e);
+                    return None;
+                }
+            }
+        }
+        Some(accounts)
+    }
+
+    /// Solana accounts behind the Ethereum accounts used by the last emulation, with the slots they were read at.
+    /// None if some of them weren't read with `getMultipleAccounts`.
+    pub fn snapshots(&self) -> Option<Vec<AccountSnapshot>> {
+        let snapshots = self.snapshots.borrow();
+        let mut result = Vec::new();
+        for address in self.touched_addresses() {
+            let (key, _) = make_solana_program_address(&address, &self.config.evm_loader);
+            let (slot, account) = snapshots.get(&key)?.clone();
+
+            let code_key = account.clone().and_then(|mut account| {
+                let info = account_info(&key, &mut account);
+                EthereumAccount::from_account(&self.config.evm_loader, &info).ok()?.code_account
+            });
+            result.push(AccountSnapshot { address, key, slot, account });
+
+            if let Some(code_key) = code_key {
+                let (slot, account) = snapshots.get(&code_key)?.clone();
+                result.push(AccountSnapshot { address, key: code_key, slot, account });
+            }
+        }
+        Some(result)
+    }
+
+    /// Forgets the accounts read from Solana which the snapshots were taken of, they are read again when used
+    pub fn forget(&self, accounts: &[&AccountSnapshot]) {
+        let mut fetched_accounts = self.fetched_accounts.borrow_mut();
+        let mut snapshots = self.snapshots.borrow_mut();
+        for snapshot in accounts {
+            fetched_accounts.remove(&snapshot.address);
+            snapshots.remove(&snapshot.key);
+        }
+    }
+
+    /// Ethereum addresses used by the last emulation, existing or not
+    pub fn touched_addresses(&self) -> Vec<H160> {
+        self.accounts.borrow().keys()
+            .chain(self.new_accounts.borrow().keys())
+            .copied()
+            .collect()
+    }
+
+    fn load_account(&self, address: &H160) -> Option<(Account, Option<Account>)> {
+        if !self.fetched_accounts.borrow().contains_key(address) {
+            let mut addresses = vec![*address];
+            addresses.append(&mut self.expected.borrow_mut());
+            self.prefetch(&addresses);
+        }
+
+        self.fetched_accounts.borrow_mut()
+            .entry(*address)
+            .or_insert_with(|| Self::get_account_from_solana(self.config, address))
+            .clone()
+    }
+
     fn create_acc_if_not_exists(&self, address: &H160, writable: bool) -> bool {
         let mut accounts = self.accounts.borrow_mut();
         let mut new_accounts = self.new_accounts.borrow_mut();
@@ -217,7 +401,7 @@ impl<'a> EmulatorAccountStorage<'a> {
             true
         } else {
             let (solana_address, _solana_nonce) = make_solana_program_address(address, &self.config.evm_loader);
-            if let Some((acc, code_account)) = Self::get_account_from_solana(self.config, address) {
+            if let Some((acc, code_account)) = self.load_account(address) {
                 let mut account = SolanaAccount::new(acc, solana_address, code_account);
                 account.writable |= writable;
 
@@ -247,6 +431,16 @@ impl<'a> EmulatorAccountStorage<'a> {
                 A: IntoIterator<Item=Apply<I>>,
                 I: IntoIterator<Item=(U256, U256)>,
     {
+        // modified accounts were read by the emulation, deleted ones may be not
+        let values: Vec<Apply<I>> = values.into_iter().collect();
+        let deleted: Vec<H160> = values.iter()
+            .filter_map(|apply| match apply {
+                Apply::Delete {address} => Some(*address),
+                Apply::Modify {..} => None,
+            })
+            .collect();
+        self.prefetch(&deleted);
+
         for apply in values {
             match apply {
                 Apply::Modify {address, nonce, code_and_valids, storage, reset_storage} => {
@@ -355,6 +549,11 @@ impl<'a> EmulatorAccountStorage<'a> {
     }
 
     pub fn apply_transfers(&self, transfers: Vec<Transfer>) {
+        let addresses: Vec<H160> = transfers.iter()
+            .flat_map(|transfer| [transfer.source, transfer.target])
+            .collect();
+        self.prefetch(&addresses);
+
         for transfer in transfers {
             self.create_acc_if_not_exists(&transfer.source, true);
             self.create_acc_if_not_exists(&transfer.target, true);
@@ -362,6 +561,11 @@ impl<'a> EmulatorAccountStorage<'a> {
     }
 
     pub fn apply_spl_transfers(&self, transfers: Vec<SplTransfer>) {
+        let addresses: Vec<H160> = transfers.iter()
+            .flat_map(|transfer| [transfer.source, transfer.target])
+            .collect();
+        self.prefetch(&addresses);
+
         let mut token_accounts = self.token_accounts.borrow_mut();
 
         for transfer in transfers {
@@ -403,6 +607,9 @@ impl<'a> EmulatorAccountStorage<'a> {
     }
 
     pub fn apply_spl_approves(&self, approves: Vec<SplApprove>) {
+        let owners: Vec<H160> = approves.iter().map(|approve| approve.owner).collect();
+        self.prefetch(&owners);
+
         let mut token_accounts = self.token_accounts.borrow_mut();
 
         let mut solana_accounts = self.solana_accounts.borrow_mut();
@@ -734,3 +941,22 @@ pub fn account_info<'a>(key: &'a Pubkey, account: &'a mut Account) -> AccountInf
         rent_epoch: account.rent_epoch,
     }
 }
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use std::str::FromStr;
+
+    #[test]
+    fn solana_program_address() {
+        let program_id = Pubkey::from_str("53DfF883gyixYNXnM7s5xhdeyV8mVk9T4i2hGV9vG9io").unwrap();
+        let vectors = [
+            ("ffffffffffffffffffffffffffffffffffffffff", "HAR9YUmjADbYQotnHmbujrnbKdNMAMLxhTwcmjS1igyX", 252),
+            ("c1566af4699928fdf9be097ca3dc47ece39f8f8e", "DfyNbtSY8dryLAanVLAbjpsFWsDSPuanSBsqXxPtFavz", 253),
+        ];
+        for (ether, address, nonce) in &vectors {
+            let ether = H160::from_slice(&hex::decode(ether).unwrap());
+            assert_eq!(make_solana_program_address(&ether, &program_id), (Pubkey::from_str(address).unwrap(), *nonce));
+        }
+    }
+}
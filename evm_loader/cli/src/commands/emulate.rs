@@ -1,4 +1,13 @@
-use log::{debug, info};
+use std::{
+    cell::RefCell,
+    collections::HashMap,
+    fs::File,
+    io::{self, BufRead, BufReader},
+    str::FromStr,
+    time::Instant,
+};
+
+use log::{debug, error, info, warn};
 
 use evm::{H160, U256, ExitReason,};
 
@@ -9,6 +18,7 @@ use evm_loader::{
 use crate::{
     account_storage::{
         EmulatorAccountStorage,
+        AccountSnapshot,
         AccountJSON,
         SolanaAccountJSON,
         TokenAccountJSON,
@@ -18,10 +28,40 @@ use crate::{
     syscall_stubs::Stubs,
 };
 
-use solana_sdk::pubkey::Pubkey;
-use crate::{errors};
+use solana_client::rpc_request::MAX_MULTIPLE_ACCOUNTS;
+use solana_sdk::{account::Account, commitment_config::CommitmentConfig, pubkey::Pubkey};
+use crate::{errors, errors::NeonCliError};
+
+/// Maximum number of emulation results kept by the cache
+const MAX_CACHED_EMULATIONS: usize = 1024;
+/// Maximum size of the account data kept by the cache
+const MAX_CACHED_EMULATION_BYTES: usize = 256 * 1024 * 1024;
+/// Maximum number of calls whose touched addresses are remembered
+const MAX_TOUCHED_CALLS: usize = 1024;
+
+/// Calls which are expected to touch the same accounts: the contract and the method selector
+type CallKey = (H160, Vec<u8>);
+
+thread_local! {
+    /// Addresses touched by the previous emulation of a call (in batch or server mode),
+    /// they are read in one request before emulating the call again
+    static TOUCHED_ADDRESSES: RefCell<HashMap<CallKey, (Instant, Vec<H160>)>> = RefCell::new(HashMap::new());
+
+    /// Results of previous emulations (in batch or server mode) with the accounts they read,
+    /// the server serves several configurations from one process
+    static EMULATION_CACHE: RefCell<HashMap<(ConfigKey, EmulationRequest), CachedEmulation>> = RefCell::new(HashMap::new());
+}
+
+/// Node and program an emulation was made against: RPC URL, commitment, evm_loader and token mint
+type ConfigKey = (String, CommitmentConfig, Pubkey, Pubkey);
+
+struct CachedEmulation {
+    result: serde_json::Value,
+    accounts: Vec<AccountSnapshot>,
+    slot: u64,
+    bytes: usize,
+}
 
-#[allow(clippy::too_many_lines)]
 pub fn execute(
     config: &Config, 
     contract_id: Option<H160>, 
@@ -41,7 +81,208 @@ pub fn execute(
     solana_sdk::program_stubs::set_syscall_stubs(syscall_stubs);
 
     let storage = EmulatorAccountStorage::new(config, *token_mint);
-    
+    let js = emulate_cached(config, &storage, contract_id, caller_id, data, value, token_mint)?;
+
+    println!("{}", js);
+
+    Ok(())
+}
+
+/// Emulates the transactions of `input` ('-' for stdin) one by one and prints a JSON result per line.
+/// The storage and the RPC client are shared, so accounts are read from Solana only once.
+/// Lines which fail are answered with `{"error": ..., "error_code": ...}`.
+pub fn execute_batch(
+    config: &Config,
+    input: &str,
+    token_mint: &Pubkey
+) -> NeonCliResult {
+    debug!("command_emulate_batch(config={:?}, input={})", config, input);
+
+    let syscall_stubs = Stubs::new(config)?;
+    solana_sdk::program_stubs::set_syscall_stubs(syscall_stubs);
+
+    let storage = EmulatorAccountStorage::new(config, *token_mint);
+
+    let reader: Box<dyn BufRead> = if input == "-" {
+        Box::new(BufReader::new(io::stdin()))
+    } else {
+        Box::new(BufReader::new(File::open(input)?))
+    };
+
+    for line in reader.lines() {
+        let line = line?;
+        if line.trim().is_empty() {
+            continue;
+        }
+
+        let js = parse_request(&line)
+            .and_then(|(contract_id, caller_id, data, value)| {
+                storage.reset();
+                emulate_cached(config, &storage, contract_id, caller_id, data, value, token_mint)
+            })
+            .unwrap_or_else(|e| {
+                error!("NeonCli Error ({}): {}", e.error_code(), e);
+                serde_json::json!({
+                    "error": e.to_string(),
+                    "error_code": e.error_code(),
+                })
+            });
+
+        println!("{}", js);
+    }
+
+    Ok(())
+}
+
+type EmulationRequest = (Option<H160>, H160, Option<Vec<u8>>, Option<U256>);
+
+/// Parses `SENDER CONTRACT [DATA] [VALUE]`, the same values as the arguments of the command
+fn parse_request(line: &str) -> Result<EmulationRequest, NeonCliError> {
+    let invalid = |what: &str| NeonCliError::InvalidEmulationRequest(format!("{}: {}", what, line));
+    let strip_hex = |value: &str| value.strip_prefix("0x").unwrap_or(value).to_string();
+
+    let mut items = line.split_whitespace();
+
+    let caller_id = items.next()
+        .and_then(|sender| H160::from_str(&strip_hex(sender)).ok())
+        .ok_or_else(|| invalid("sender"))?;
+
+    let contract_id = match items.next() {
+        Some("deploy") => None,
+        Some(contract) => Some(H160::from_str(&strip_hex(contract)).map_err(|_| invalid("contract"))?),
+        None => return Err(invalid("contract")),
+    };
+
+    let data = match items.next() {
+        None => None,
+        Some(data) if data.eq_ignore_ascii_case("none") => None,
+        Some(data) => Some(hex::decode(strip_hex(data)).map_err(|_| invalid("data"))?),
+    };
+
+    let value = items.next()
+        .map(|value| U256::from_str(&strip_hex(value)).map_err(|_| invalid("value")))
+        .transpose()?;
+
+    if items.next().is_some() {
+        return Err(invalid("unexpected arguments"));
+    }
+
+    Ok((contract_id, caller_id, data, value))
+}
+
+/// `emulate` reusing the result of the same request while none of the accounts it read has changed.
+/// The block number and timestamp seen by the cached emulation aren't checked.
+fn emulate_cached(
+    config: &Config,
+    storage: &EmulatorAccountStorage<'_>,
+    contract_id: Option<H160>,
+    caller_id: H160,
+    data: Option<Vec<u8>>,
+    value: Option<U256>,
+    token_mint: &Pubkey
+) -> Result<serde_json::Value, NeonCliError> {
+    let config_key: ConfigKey = (config.json_rpc_url.clone(), config.commitment, config.evm_loader, *token_mint);
+    let request: EmulationRequest = (contract_id, caller_id, data, value);
+    let key = (config_key, request);
+
+    let cached = EMULATION_CACHE.with(|cache| {
+        let mut cache = cache.borrow_mut();
+        let entry = cache.get(&key)?;
+        let changed = changed_accounts(config, &entry.accounts);
+        if changed.is_empty() {
+            return Some(entry.result.clone());
+        }
+        // the storage still holds the accounts the cached emulation read
+        storage.forget(&changed);
+        cache.remove(&key);
+        None
+    });
+    if let Some(result) = cached {
+        debug!("Emulation result is taken from the cache");
+        return Ok(result);
+    }
+
+    let (contract_id, caller_id, data, value) = key.1.clone();
+    let result = emulate(config, storage, contract_id, caller_id, data, value, token_mint)?;
+
+    // Solana accounts read directly (e.g. token balances) aren't tracked, such emulations aren't cached
+    if !storage.solana_accounts.borrow().is_empty() || !storage.token_accounts.borrow().is_empty() {
+        return Ok(result);
+    }
+
+    if let Some(accounts) = storage.snapshots() {
+        let slot = accounts.iter().map(|snapshot| snapshot.slot).max().unwrap_or_default();
+        let bytes = accounts.iter()
+            .filter_map(|snapshot| snapshot.account.as_ref())
+            .map(|account| account.data.len())
+            .sum();
+        if bytes > MAX_CACHED_EMULATION_BYTES {
+            return Ok(result);
+        }
+
+        EMULATION_CACHE.with(|cache| {
+            let mut cache = cache.borrow_mut();
+            cache.remove(&key);
+            let mut total: usize = cache.values().map(|entry| entry.bytes).sum();
+            while cache.len() >= MAX_CACHED_EMULATIONS || total + bytes > MAX_CACHED_EMULATION_BYTES {
+                let oldest = cache.iter().min_by_key(|(_, entry)| entry.slot).map(|(key, _)| key.clone());
+                match oldest.and_then(|oldest| cache.remove(&oldest)) {
+                    Some(entry) => total -= entry.bytes,
+                    None => break,
+                }
+            }
+            cache.insert(key, CachedEmulation { result: result.clone(), accounts, slot, bytes });
+        });
+    }
+
+    Ok(result)
+}
+
+/// Accounts which aren't the same as at the slots they were read at, checked with `getMultipleAccounts`.
+/// All of them if the check fails.
+fn changed_accounts<'s>(config: &Config, snapshots: &'s [AccountSnapshot]) -> Vec<&'s AccountSnapshot> {
+    let same = |current: &Option<Account>, previous: &Option<Account>| match (current, previous) {
+        (None, None) => true,
+        // rent_epoch changes without the account being modified
+        (Some(current), Some(previous)) =>
+            current.lamports == previous.lamports
+                && current.owner == previous.owner
+                && current.executable == previous.executable
+                && current.data == previous.data,
+        _ => false,
+    };
+
+    let commitment = config.rpc_client.commitment();
+    let mut changed = Vec::new();
+    for chunk in snapshots.chunks(MAX_MULTIPLE_ACCOUNTS) {
+        let keys: Vec<Pubkey> = chunk.iter().map(|snapshot| snapshot.key).collect();
+        let response = match config.rpc_client.get_multiple_accounts_with_commitment(&keys, commitment) {
+            Ok(response) => response,
+            Err(e) => {
+                warn!("getMultipleAccounts error: {}", e);
+                return snapshots.iter().collect();
+            }
+        };
+
+        changed.extend(chunk.iter()
+            .zip(&response.value)
+            .filter(|(snapshot, current)| response.context.slot < snapshot.slot || !same(current, &snapshot.account))
+            .map(|(snapshot, _)| snapshot));
+    }
+
+    changed
+}
+
+#[allow(clippy::too_many_lines)]
+fn emulate(
+    config: &Config,
+    storage: &EmulatorAccountStorage<'_>,
+    contract_id: Option<H160>,
+    caller_id: H160,
+    data: Option<Vec<u8>>,
+    value: Option<U256>,
+    token_mint: &Pubkey
+) -> Result<serde_json::Value, NeonCliError> {
     let program_id = if let Some(program_id) = contract_id {
         debug!("program_id to call: {}", program_id);
         program_id
@@ -54,9 +295,30 @@ pub fn execute(
         program_id
     };
 
+    let call_key: Option<CallKey> = contract_id.map(|contract_id| {
+        let selector = data.as_ref().map(|data| data.iter().take(4).copied().collect()).unwrap_or_default();
+        (contract_id, selector)
+    });
+
+    // addresses touched by the call before are read now, the ones touched by other methods
+    // of the contract are read together with the first account the emulation misses
+    let mut prefetch = vec![caller_id, program_id];
+    if let Some(call_key) = &call_key {
+        TOUCHED_ADDRESSES.with(|touched| {
+            for (key, (_, addresses)) in touched.borrow().iter() {
+                if key == call_key {
+                    prefetch.extend(addresses);
+                } else if key.0 == call_key.0 {
+                    storage.expect(addresses);
+                }
+            }
+        });
+    }
+    storage.prefetch(&prefetch);
+
     let (exit_reason, result, applies_logs,  steps_executed, used_gas) = {
         let gas_limit = U256::from(999_999_999_999_u64);
-        let mut executor = Machine::new(caller_id, &storage)?;
+        let mut executor = Machine::new(caller_id, storage)?;
         debug!("Executor initialized");
 
         let (result, exit_reason) = match &contract_id {
@@ -148,6 +410,19 @@ pub fn execute(
         debug!("Not succeed execution");
     }
 
+    if let Some(call_key) = call_key {
+        TOUCHED_ADDRESSES.with(|touched| {
+            let mut touched = touched.borrow_mut();
+            if touched.len() >= MAX_TOUCHED_CALLS && !touched.contains_key(&call_key) {
+                let oldest = touched.iter().min_by_key(|(_, (used, _))| *used).map(|(key, _)| key.clone());
+                if let Some(oldest) = oldest {
+                    touched.remove(&oldest);
+                }
+            }
+            touched.insert(call_key, (Instant::now(), storage.touched_addresses()));
+        });
+    }
+
     let accounts: Vec<AccountJSON> = storage.get_used_accounts();
 
     let solana_accounts: Vec<SolanaAccountJSON> = storage.solana_accounts
@@ -164,7 +439,7 @@ pub fn execute(
         .map(TokenAccountJSON::from)
         .collect();
 
-    let js = serde_json::json!({
+    Ok(serde_json::json!({
         "accounts": accounts,
         "solana_accounts": solana_accounts,
         "token_accounts": token_accounts,
@@ -173,10 +448,58 @@ pub fn execute(
         "exit_reason": exit_reason,
         "steps_executed": steps_executed,
         "used_gas": used_gas.as_u64(),
-    }).to_string();
+    }))
+}
 
-    println!("{}", js);
+#[cfg(test)]
+mod tests {
+    use super::*;
 
-    Ok(())
-}
+    const SENDER: &str = "0x1111111111111111111111111111111111111111";
+    const CONTRACT: &str = "2222222222222222222222222222222222222222";
+
+    #[test]
+    fn parse_call() {
+        let line = format!("{} {} 0x3917b3df 10", SENDER, CONTRACT);
+        let (contract_id, caller_id, data, value) = parse_request(&line).unwrap();
+        assert_eq!(caller_id, H160::repeat_byte(0x11));
+        assert_eq!(contract_id, Some(H160::repeat_byte(0x22)));
+        assert_eq!(data, Some(vec![0x39, 0x17, 0xb3, 0xdf]));
+        assert_eq!(value, Some(U256::from(0x10)));
+    }
 
+    #[test]
+    fn parse_deploy() {
+        let (contract_id, _, data, value) = parse_request(&format!("{} deploy", SENDER)).unwrap();
+        assert_eq!(contract_id, None);
+        assert_eq!(data, None);
+        assert_eq!(value, None);
+    }
+
+    #[test]
+    fn parse_value_without_data() {
+        let (_, _, data, value) = parse_request(&format!("{} {} none 5", SENDER, CONTRACT)).unwrap();
+        assert_eq!(data, None);
+        assert_eq!(value, Some(U256::from(5)));
+    }
+
+    #[test]
+    fn parse_prefixed_value() {
+        let (_, _, _, value) = parse_request(&format!("{} {} none 0xff", SENDER, CONTRACT)).unwrap();
+        assert_eq!(value, Some(U256::from(0xff)));
+    }
+
+    #[test]
+    fn parse_invalid() {
+        for line in &[
+            "".to_string(),
+            SENDER.to_string(),
+            format!("{} 0x22", SENDER),
+            format!("{} {} 0x3", SENDER, CONTRACT),
+            format!("{} {} none 1 2", SENDER, CONTRACT),
+            format!("{} {} none 0xz", SENDER, CONTRACT),
+        ] {
+            assert!(matches!(parse_request(line), Err(NeonCliError::InvalidEmulationRequest(_))), "{}", line);
+        }
+    }
+}
@@ -110,6 +110,9 @@ pub enum NeonCliError {
     /// too many steps
     #[error("Too many steps")]
     TooManySteps,
+    /// Invalid line of an emulation batch
+    #[error("Invalid emulation request. {0:?}")]
+    InvalidEmulationRequest(String),
     /// Unknown Error.
     #[error("Unknown error.")]
     UnknownError
@@ -148,6 +151,7 @@ impl NeonCliError {
             NeonCliError::InvalidVerbosityMessage           => 243, // => 4100,
             NeonCliError::TransactionFailed                 => 244, // => 4200,
             NeonCliError::TooManySteps                      => 245,
+            NeonCliError::InvalidEmulationRequest(_)        => 246,
             NeonCliError::UnknownError                      => 249, // => 4900,
         }
     }
@@ -8,6 +8,7 @@ mod syscall_stubs;
 mod errors;
 mod logs;
 mod commands;
+mod server;
 
 use crate::{
     account_storage::{
@@ -93,6 +94,7 @@ type NeonCliResult = Result<(),NeonCliError>;
 
 pub struct Config {
     rpc_client: Arc<RpcClient>,
+    json_rpc_url: String,
     websocket_url: String,
     evm_loader: Pubkey,
     // #[allow(unused)]
@@ -416,8 +418,8 @@ macro_rules! version_string {
 
 
 #[allow(clippy::too_many_lines)]
-fn main() {
-    let app_matches = App::new(crate_name!())
+fn build_app<'a, 'b>() -> App<'a, 'b> {
+    App::new(crate_name!())
         .about(crate_description!())
         .version(version_string!())
         .setting(AppSettings::SubcommandRequiredElseHelp)
@@ -503,7 +505,7 @@ fn main() {
                         .value_name("SENDER")
                         .takes_value(true)
                         .index(1)
-                        .required(true)
+                        .required_unless("batch")
                         .validator(is_valid_h160)
                         .help("The sender of the transaction")
                 )
@@ -512,7 +514,7 @@ fn main() {
                         .value_name("CONTRACT")
                         .takes_value(true)
                         .index(2)
-                        .required(true)
+                        .required_unless("batch")
                         .validator(is_valid_h160_or_deploy)
                         .help("The contract that executes the transaction or 'deploy'")
                 )
@@ -543,6 +545,14 @@ fn main() {
                         .validator(is_valid_pubkey)
                         .help("Pubkey for token_mint")
                 )
+                .arg(
+                    Arg::with_name("batch")
+                        .long("batch")
+                        .value_name("PATH")
+                        .takes_value(true)
+                        .conflicts_with_all(&["sender", "contract", "data", "value"])
+                        .help("Emulate transactions read from the file ('-' for stdin), one 'SENDER CONTRACT [DATA] [VALUE]' per line")
+                )
         )
         .subcommand(
             SubCommand::with_name("create-ether-account")
@@ -703,165 +713,176 @@ fn main() {
                         .required(true),
                 )
         )
-        .get_matches();
-
-    let context: LogContext =
-        app_matches.value_of("logging_ctx")
-            .map(|ctx| LogContext::new(ctx.to_string()) )
-            .unwrap_or_default();
-    logs::init(context).unwrap();
+        .subcommand(
+            SubCommand::with_name("server")
+                .about("Execute commands read from stdin, one JSON array of arguments per line")
+        )
+}
 
+fn create_config(app_matches: &ArgMatches<'_>) -> Result<Config, NeonCliError> {
     let mut wallet_manager = None;
-    let config = {
-        let cli_config = app_matches.value_of("config_file").map_or_else(
-            solana_cli_config::Config::default,
-            |config_file| solana_cli_config::Config::load(config_file).unwrap_or_default()
-        );
+    let cli_config = app_matches.value_of("config_file").map_or_else(
+        solana_cli_config::Config::default,
+        |config_file| solana_cli_config::Config::load(config_file).unwrap_or_default()
+    );
+
+    let commitment = CommitmentConfig::from_str(app_matches.value_of("commitment").unwrap()).unwrap();
+
+    let json_rpc_url = normalize_to_url_if_moniker(
+        app_matches
+            .value_of("json_rpc_url")
+            .unwrap_or(&cli_config.json_rpc_url),
+    );
+
+    let evm_loader = pubkey_of(app_matches, "evm_loader")
+        .ok_or(NeonCliError::EvmLoaderNotSpecified)?;
+
+    let signer = signer_from_path(
+        app_matches,
+        app_matches
+            .value_of("fee_payer")
+            .unwrap_or(&cli_config.keypair_path),
+        "fee_payer",
+        &mut wallet_manager,
+    ).map_err(|e| {
+        error!("{}", e);
+        NeonCliError::FeePayerNotSpecified
+    })?;
+
+    let keypair = keypair_from_path(
+        app_matches,
+        app_matches
+            .value_of("fee_payer")
+            .unwrap_or(&cli_config.keypair_path),
+        "fee_payer",
+        true,
+    ).ok();
+
+    Ok(Config {
+        rpc_client: Arc::new(RpcClient::new_with_commitment(json_rpc_url.clone(), commitment)),
+        json_rpc_url,
+        websocket_url: "".to_string(),
+        evm_loader,
+        signer,
+        keypair,
+        commitment,
+    })
+}
 
-        let commitment = CommitmentConfig::from_str(app_matches.value_of("commitment").unwrap()).unwrap();
+#[allow(clippy::too_many_lines)]
+fn execute(config: &Config, app_matches: &ArgMatches<'_>) -> NeonCliResult {
+    let (sub_command, sub_matches) = app_matches.subcommand();
+    match (sub_command, sub_matches) {
+        ("emulate", Some(arg_matches)) => {
+            let token_mint = pubkey_of(arg_matches, "token_mint")
+                .unwrap_or_else(|| {
+                    let elf_params = get_neon_elf::read_elf_parameters_from_account(config).unwrap();
+                    Pubkey::from_str(elf_params.get("NEON_TOKEN_MINT").unwrap()).unwrap()
+                });
+
+            if let Some(batch) = arg_matches.value_of("batch") {
+                return emulate::execute_batch(config, batch, &token_mint);
+            }
 
-        let json_rpc_url = normalize_to_url_if_moniker(
-            app_matches
-                .value_of("json_rpc_url")
-                .unwrap_or(&cli_config.json_rpc_url),
-        );
+            let contract = h160_or_deploy_of(arg_matches, "contract");
+            let sender = h160_of(arg_matches, "sender").unwrap();
+            let data = hexdata_of(arg_matches, "data");
+            let value = value_of(arg_matches, "value");
+            emulate::execute(config, contract, sender, data, value, &token_mint)
+        }
+        ("create-program-address", Some(arg_matches)) => {
+            let ether = h160_of(arg_matches, "seed").unwrap();
 
-        let evm_loader = 
-            if let Some(evm_loader) = pubkey_of(&app_matches, "evm_loader") {
-                evm_loader
-            } else {
-                let e = NeonCliError::EvmLoaderNotSpecified;
-                error!("{}", e);
-                exit(e.error_code() as i32);
-            };
-
-        let (signer, _fee_payer) = signer_from_path(
-            &app_matches,
-            app_matches
-                .value_of("fee_payer")
-                .unwrap_or(&cli_config.keypair_path),
-            "fee_payer",
-            &mut wallet_manager,
-        ).map_or_else(
-            |e| {
-                error!("{}", e);
-                let e = NeonCliError::FeePayerNotSpecified;
-                error!("{}", e);
-                exit(e.error_code() as i32);
-            },
-            |s| {
-                let p = s.pubkey();
-                (s, p)
-            }
-        );
+            create_program_address::execute(config, &ether);
 
-        let keypair = keypair_from_path(
-            &app_matches,
-            app_matches
-                .value_of("fee_payer")
-                .unwrap_or(&cli_config.keypair_path),
-            "fee_payer",
-            true,
-        ).ok();
-
-        Config {
-            rpc_client: Arc::new(RpcClient::new_with_commitment(json_rpc_url, commitment)),
-            websocket_url: "".to_string(),
-            evm_loader,
-            signer,
-            keypair,
-            commitment,
+            Ok(())
         }
-    };
+        ("create-ether-account", Some(arg_matches)) => {
+            let ether = h160_of(arg_matches, "ether").unwrap();
 
-    let (sub_command, sub_matches) = app_matches.subcommand();
-    let result: NeonCliResult =
-        match (sub_command, sub_matches) {
-            ("emulate", Some(arg_matches)) => {
-                let contract = h160_or_deploy_of(arg_matches, "contract");
-                let sender = h160_of(arg_matches, "sender").unwrap();
-                let data = hexdata_of(arg_matches, "data");
-                let value = value_of(arg_matches, "value");
-
-                let token_mint = pubkey_of(arg_matches, "token_mint")
-                    .unwrap_or_else(|| {
-                        let elf_params = get_neon_elf::read_elf_parameters_from_account(&config).unwrap();
-                        Pubkey::from_str(elf_params.get("NEON_TOKEN_MINT").unwrap()).unwrap()
-                    });
-                emulate::execute(&config, contract, sender, data, value, &token_mint)
-            }
-            ("create-program-address", Some(arg_matches)) => {
-                let ether = h160_of(arg_matches, "seed").unwrap();
+            create_ether_account::execute(config, &ether)
+        }
+        ("deploy", Some(arg_matches)) => {
+            let program_location = arg_matches.value_of("program_location").unwrap().to_string();
+
+            let mut elf_params : HashMap<String,String> = HashMap::new();
+
+            let collateral_pool_base = pubkey_of(arg_matches, "collateral_pool_base")
+                .unwrap_or_else(|| {
+                    if elf_params.is_empty(){
+                        elf_params = get_neon_elf::read_elf_parameters_from_account(config).unwrap();
+                    }
+                    Pubkey::from_str(elf_params.get("NEON_POOL_BASE").unwrap()).unwrap()
+                });
+
+            let chain_id = value_of(arg_matches, "chain_id")
+                .unwrap_or_else(|| {
+                    if elf_params.is_empty(){
+                        elf_params = get_neon_elf::read_elf_parameters_from_account(config).unwrap();
+                    }
+                    u64::from_str(elf_params.get("NEON_CHAIN_ID").unwrap()).unwrap()
+                });
+            deploy::execute(config, &program_location, &collateral_pool_base, chain_id)
+        }
+        ("deposit", Some(arg_matches)) => {
+            let amount = value_of(arg_matches, "amount").unwrap();
+            let ether = h160_of(arg_matches, "ether").unwrap();
+            deposit::execute(config, amount, &ether)
+        }
+        ("migrate-account", Some(arg_matches)) => {
+            let ether = h160_of(arg_matches, "ether").unwrap();
+            migrate_account::execute(config, &ether)
+        }
+        ("get-ether-account-data", Some(arg_matches)) => {
+            let ether = h160_of(arg_matches, "ether").unwrap();
 
-                create_program_address::execute(&config, &ether);
+            get_ether_account_data::execute(config, &ether);
 
-                Ok(())
-            }
-            ("create-ether-account", Some(arg_matches)) => {
-                let ether = h160_of(arg_matches, "ether").unwrap();
+            Ok(())
+        }
+        ("cancel-trx", Some(arg_matches)) => {
+            let storage_account = pubkey_of(arg_matches, "storage_account").unwrap();
 
-                create_ether_account::execute(&config, &ether)
-            }
-            ("deploy", Some(arg_matches)) => {
-                let program_location = arg_matches.value_of("program_location").unwrap().to_string();
-
-                let mut elf_params : HashMap<String,String> = HashMap::new();
-
-                let collateral_pool_base = pubkey_of(arg_matches, "collateral_pool_base")
-                    .unwrap_or_else(|| {
-                        if elf_params.is_empty(){
-                            elf_params = get_neon_elf::read_elf_parameters_from_account(&config).unwrap();
-                        }
-                        Pubkey::from_str(elf_params.get("NEON_POOL_BASE").unwrap()).unwrap()
-                    });
-
-                let chain_id = value_of(arg_matches, "chain_id")
-                    .unwrap_or_else(|| {
-                        if elf_params.is_empty(){
-                            elf_params = get_neon_elf::read_elf_parameters_from_account(&config).unwrap();
-                        }
-                        u64::from_str(elf_params.get("NEON_CHAIN_ID").unwrap()).unwrap()
-                    });
-                deploy::execute(&config, &program_location, &collateral_pool_base, chain_id)
-            }
-            ("deposit", Some(arg_matches)) => {
-                let amount = value_of(arg_matches, "amount").unwrap();
-                let ether = h160_of(arg_matches, "ether").unwrap();
-                deposit::execute(&config, amount, &ether)
-            }
-            ("migrate-account", Some(arg_matches)) => {
-                let ether = h160_of(arg_matches, "ether").unwrap();
-                migrate_account::execute(&config, &ether)
-            }
-            ("get-ether-account-data", Some(arg_matches)) => {
-                let ether = h160_of(arg_matches, "ether").unwrap();
+            cancel_trx::execute(config, &storage_account)
+        }
+        ("neon-elf-params", Some(arg_matches)) => {
+            let program_location = arg_matches.value_of("program_location");
 
-                get_ether_account_data::execute(&config, &ether);
+            get_neon_elf::execute(config, program_location)
+        }
+        ("get-storage-at", Some(arg_matches)) => {
+            let contract_id = h160_of(arg_matches, "contract_id").unwrap();
+            let index = u256_of(arg_matches, "index").unwrap();
 
-                Ok(())
-            }
-            ("cancel-trx", Some(arg_matches)) => {
-                let storage_account = pubkey_of(arg_matches, "storage_account").unwrap();
+            get_storage_at::execute(config, contract_id, &index)
+        }
+        ("update-valids-table", Some(arg_matches)) => {
+            let contract_id = h160_of(arg_matches, "contract_id").unwrap();
 
-                cancel_trx::execute(&config, &storage_account)
-            }
-            ("neon-elf-params", Some(arg_matches)) => {
-                let program_location = arg_matches.value_of("program_location");
+            update_valids_table::execute(config, contract_id)
+        }
+        _ => unreachable!(),
+    }
+}
 
-                get_neon_elf::execute(&config, program_location)
-            }
-            ("get-storage-at", Some(arg_matches)) => {
-                let contract_id = h160_of(arg_matches, "contract_id").unwrap();
-                let index = u256_of(arg_matches, "index").unwrap();
+fn main() {
+    let app_matches = build_app().get_matches();
 
-                get_storage_at::execute(&config, contract_id, &index)
-            }
-            ("update-valids-table", Some(arg_matches)) => {
-                let contract_id = h160_of(arg_matches, "contract_id").unwrap();
+    let context: LogContext =
+        app_matches.value_of("logging_ctx")
+            .map(|ctx| LogContext::new(ctx.to_string()) )
+            .unwrap_or_default();
+    logs::init(context).unwrap();
 
-                update_valids_table::execute(&config, contract_id)
-            }
-            _ => unreachable!(),
+    let result: NeonCliResult =
+        if app_matches.subcommand_name() == Some("server") {
+            server::run()
+        } else {
+            let config = create_config(&app_matches).unwrap_or_else(|e| {
+                error!("{}", e);
+                exit(e.error_code() as i32);
+            });
+            execute(&config, &app_matches)
         };
     
     let exit_code: i32 =
@@ -0,0 +1,110 @@
+//! Server mode: keeps one neon-cli process (and its RPC clients) alive for many commands.
+//!
+//! Every line read from stdin is a JSON array with the arguments of one command, exactly as
+//! they would follow `neon-cli` on the command line. The command prints its output to stdout as
+//! usual, then the server prints a newline and a single response line
+//! `{"neon_cli_server":{"exit_code":N}}`. The newline puts the response on a line of its own even
+//! after output without a trailing newline (e.g. `get-storage-at`); clients drop it from the output.
+
+use std::{
+    collections::{hash_map::Entry, HashMap},
+    io::{self, BufRead, Write},
+    panic::{self, AssertUnwindSafe},
+};
+
+use clap::ArgMatches;
+use log::{debug, error};
+
+use crate::{
+    build_app,
+    create_config,
+    execute,
+    Config,
+    NeonCliResult,
+};
+
+/// Exit code reported for requests which can't be parsed
+const INVALID_REQUEST_EXIT_CODE: i32 = 1;
+/// Exit code reported for commands which panicked, the same as the one of a panicking process
+const PANIC_EXIT_CODE: i32 = 101;
+
+/// Global arguments which the command configuration is built from
+const CONFIG_ARGS: [&str; 4] = ["config_file", "json_rpc_url", "evm_loader", "commitment"];
+
+pub fn run() -> NeonCliResult {
+    let mut configs: HashMap<Vec<Option<String>>, Config> = HashMap::new();
+
+    let stdin = io::stdin();
+    for line in stdin.lock().lines() {
+        let line = line?;
+        if line.trim().is_empty() {
+            continue;
+        }
+
+        let exit_code = process_request(&line, &mut configs);
+
+        let stdout = io::stdout();
+        let mut stdout = stdout.lock();
+        writeln!(stdout, "\n{}", serde_json::json!({ "neon_cli_server": { "exit_code": exit_code } }))?;
+        stdout.flush()?;
+    }
+
+    Ok(())
+}
+
+fn process_request(line: &str, configs: &mut HashMap<Vec<Option<String>>, Config>) -> i32 {
+    debug!("request: {}", line);
+    let args: Vec<String> = match serde_json::from_str(line) {
+        Ok(args) => args,
+        Err(e) => {
+            error!("Invalid request {}: {}", line, e);
+            return INVALID_REQUEST_EXIT_CODE;
+        }
+    };
+
+    let app_matches = match build_app().get_matches_from_safe(std::iter::once(clap::crate_name!().to_string()).chain(args)) {
+        Ok(app_matches) => app_matches,
+        Err(e) => {
+            error!("{}", e);
+            return INVALID_REQUEST_EXIT_CODE;
+        }
+    };
+    match app_matches.subcommand() {
+        ("server", _) => {
+            error!("Server can't be started from the server");
+            return INVALID_REQUEST_EXIT_CODE;
+        },
+        ("emulate", Some(arg_matches)) if arg_matches.value_of("batch") == Some("-") => {
+            error!("Batch emulation can't read stdin of the server, which carries the requests");
+            return INVALID_REQUEST_EXIT_CODE;
+        },
+        _ => {},
+    }
+
+    let config = match configs.entry(config_key(&app_matches)) {
+        Entry::Occupied(entry) => entry.into_mut(),
+        Entry::Vacant(entry) => match create_config(&app_matches) {
+            Ok(config) => entry.insert(config),
+            Err(e) => {
+                error!("{}", e);
+                return e.error_code() as i32;
+            }
+        },
+    };
+
+    match panic::catch_unwind(AssertUnwindSafe(|| execute(config, &app_matches))) {
+        Ok(Ok(())) => 0,
+        Ok(Err(e)) => {
+            let error_code = e.error_code();
+            error!("NeonCli Error ({}): {}", error_code, e);
+            error_code as i32
+        },
+        Err(_) => PANIC_EXIT_CODE,
+    }
+}
+
+fn config_key(app_matches: &ArgMatches<'_>) -> Vec<Option<String>> {
+    CONFIG_ARGS.iter()
+        .map(|name| app_matches.value_of(name).map(ToString::to_string))
+        .collect()
+}
@@ -9,13 +9,13 @@ print(collateral_pool_base)
 for collateral_pool_index in range(0, 10):
     COLLATERAL_SEED_PREFIX = "collateral_seed_"
     seed = COLLATERAL_SEED_PREFIX + str(collateral_pool_index)
-    collateral_pool_address = accountWithSeed(PublicKey(collateral_pool_base), seed, PublicKey(EVM_LOADER))
+    collateral_pool_address = accountWithSeed(PublicKey(collateral_pool_base), seed, PublicKey(solana_config.evm_loader))
     print("Collateral pool address: ", collateral_pool_address)
     if getBalance(collateral_pool_address) == 0:
         print("Creating...")
-        minimum_balance = client.get_minimum_balance_for_rent_exemption(0, commitment=Confirmed)["result"]
+        minimum_balance = solana_config.rent_calculator.minimum_balance(0)
         trx = TransactionWithComputeBudget()
-        trx.add(createAccountWithSeed(wallet.public_key(), PublicKey(collateral_pool_base), seed, minimum_balance, 0, PublicKey(EVM_LOADER)))
-        result = send_transaction(client, trx, wallet)
+        trx.add(createAccountWithSeed(wallet.public_key(), PublicKey(collateral_pool_base), seed, minimum_balance, 0, PublicKey(solana_config.evm_loader)))
+        result = send_transaction(solana_config.client, trx, wallet)
         print(result)
 print(collateral_pool_base)
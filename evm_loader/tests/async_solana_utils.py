@@ -0,0 +1,224 @@
+import asyncio
+import base64
+import itertools
+from typing import List, Optional, Sequence, Union
+
+import aiohttp
+from base58 import b58encode
+from solana.account import Account
+from solana.publickey import PublicKey
+from solana.rpc.api import Client, SendTransactionError
+from solana.rpc.commitment import Commitment, Confirmed, Max
+from solana.rpc.types import TxOpts
+from solana.transaction import Transaction
+
+from solana_utils import (ACCOUNT_INFO_LAYOUT, MAX_ACCOUNTS_PER_REQUEST, AccountData, AccountInfo, EvmLoader, Receipt,
+                          account_cache, decodeMultipleAccounts, sign_transaction, solana_config)
+
+# maximum number of simultaneously open HTTP connections to the RPC node
+MAX_CONNECTIONS = 100
+
+
+class AsyncClient:
+    """Asyncio counterpart of solana.rpc.api.Client.
+
+    Responses have the same shape as the ones returned by the blocking client,
+    so the helpers below are drop-in replacements for the solana_utils ones.
+    """
+
+    def __init__(self, endpoint: Optional[str] = None, max_connections: int = MAX_CONNECTIONS):
+        # SOLANA_URL is read when a client is created, not when the module is imported
+        endpoint = endpoint or solana_config.solana_url
+        self.endpoint_uri = endpoint
+        self._max_connections = max_connections
+        self._request_counter = itertools.count(1)
+        self._session = None
+        # used to sign and size transactions, both are done by blocking helpers
+        self._sync_client = Client(endpoint)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self._max_connections),
+                headers={"Content-Type": "application/json"},
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def make_request(self, method: str, *params):
+        data = {"jsonrpc": "2.0", "id": next(self._request_counter), "method": method, "params": params}
+        async with self._get_session().post(self.endpoint_uri, json=data) as response:
+            response.raise_for_status()
+            return await response.json(content_type=None)
+
+    async def get_balance(self, pubkey: Union[str, PublicKey], commitment: Commitment = Max):
+        return await self.make_request("getBalance", str(pubkey), {"commitment": commitment})
+
+    async def get_account_info(self, pubkey: Union[str, PublicKey], commitment: Commitment = Max,
+                               encoding: str = "base64"):
+        return await self.make_request("getAccountInfo", str(pubkey), {"encoding": encoding, "commitment": commitment})
+
+    async def get_multiple_accounts(self, pubkeys: Sequence[Union[str, PublicKey]], commitment: Commitment = Max,
+                                    encoding: str = "base64"):
+        return await self.make_request("getMultipleAccounts", [str(pubkey) for pubkey in pubkeys],
+                                       {"encoding": encoding, "commitment": commitment})
+
+    async def get_minimum_balance_for_rent_exemption(self, usize: int, commitment: Commitment = Max):
+        return await self.make_request("getMinimumBalanceForRentExemption", usize, {"commitment": commitment})
+
+    async def get_recent_blockhash(self, commitment: Commitment = Max):
+        return await self.make_request("getRecentBlockhash", {"commitment": commitment})
+
+    async def get_signature_statuses(self, signatures: List[Union[str, bytes]],
+                                     search_transaction_history: bool = False):
+        base58_sigs = [sig if isinstance(sig, str) else b58encode(sig).decode("utf-8") for sig in signatures]
+        return await self.make_request("getSignatureStatuses", base58_sigs,
+                                       {"searchTransactionHistory": search_transaction_history})
+
+    async def get_confirmed_transaction(self, tx_sig: str, encoding: str = "json", commitment: Commitment = Confirmed):
+        return await self.make_request("getConfirmedTransaction", tx_sig, {"commitment": commitment, "encoding": encoding})
+
+    async def send_raw_transaction(self, txn: Union[bytes, str], opts: TxOpts = TxOpts()):
+        if isinstance(txn, bytes):
+            txn = base64.b64encode(txn).decode("utf-8")
+        resp = await self.make_request("sendTransaction", txn, {
+            "skipPreflight": opts.skip_preflight,
+            "preflightCommitment": opts.preflight_commitment,
+            "encoding": "base64",
+        })
+        if resp.get("error"):
+            raise SendTransactionError(resp["error"])
+        if not resp.get("result"):
+            raise Exception("Failed to send transaction")
+        if not opts.skip_confirmation:
+            await confirm_transaction(self, resp["result"])
+        return resp
+
+    async def send_transaction(self, txn: Transaction, *signers: Account, opts: TxOpts = TxOpts()):
+        # signing waits for the first blockhash (and the budget simulation), keep it off the event loop
+        await asyncio.get_running_loop().run_in_executor(None, sign_transaction, self._sync_client, txn, *signers)
+        return await self.send_raw_transaction(txn.serialize(), opts=opts)
+
+
+async def confirm_transaction(http_client: AsyncClient, tx_sig, confirmations=0):
+    """Confirm a transaction."""
+    from confirmation_tracker import get_confirmation_tracker
+    tracker = get_confirmation_tracker(http_client.endpoint_uri)
+    return await asyncio.wrap_future(tracker.track(tx_sig, confirmations))
+
+
+async def confirm_transactions(http_client: AsyncClient, tx_sigs, confirmations=0):
+    """Confirm many transactions at once, their statuses are polled in batches."""
+    return await asyncio.gather(*(confirm_transaction(http_client, tx_sig, confirmations) for tx_sig in tx_sigs))
+
+
+class AsyncReceipt(Receipt):
+    """Receipt of a transaction sent by the async helpers, `await receipt.fetch()` reads it without blocking.
+
+    Accessed before that, it is read with a blocking call as Receipt is.
+    """
+
+    def __init__(self, client: AsyncClient, signature: str):
+        super().__init__(client._sync_client, signature)
+        self.async_client = client
+
+    async def fetch(self) -> 'AsyncReceipt':
+        if not self.fetched:
+            response = await self.async_client.get_confirmed_transaction(self.signature)
+            with self._lock:
+                if self._response is None:
+                    self._response = response
+        return self
+
+
+async def fetchReceipts(receipts: Sequence[AsyncReceipt]) -> Sequence[AsyncReceipt]:
+    """Fetches the receipts which weren't accessed yet concurrently."""
+    await asyncio.gather(*(receipt.fetch() for receipt in receipts if not receipt.fetched))
+    return receipts
+
+
+async def send_transaction(client: AsyncClient, trx, acc) -> AsyncReceipt:
+    try:
+        result = await client.send_transaction(trx, acc, opts=TxOpts(skip_confirmation=True, preflight_commitment="confirmed"))
+        await confirm_transaction(client, result["result"])
+    finally:
+        account_cache.invalidate_transaction(trx)
+    return AsyncReceipt(client, result["result"])
+
+
+async def getBalance(client: AsyncClient, account):
+    return (await client.get_balance(account, commitment=Confirmed))['result']['value']
+
+
+async def getAccountData(client: AsyncClient, account: Union[str, PublicKey], expected_length: int) -> bytes:
+    info = (await client.get_account_info(account, commitment=Confirmed))['result']['value']
+    if info is None:
+        raise Exception("Can't get information about {}".format(account))
+
+    data = base64.b64decode(info['data'][0])
+    if len(data) < expected_length:
+        print("len(data)({}) < expected_length({})".format(len(data), expected_length))
+        raise Exception("Wrong data length for account data {}".format(account))
+    return data
+
+
+async def getMultipleAccounts(client: AsyncClient, accounts: Sequence[Union[str, PublicKey]],
+                              commitment=Confirmed) -> List[Optional[AccountData]]:
+    """Reads accounts with concurrent getMultipleAccounts requests, None stands for accounts that don't exist."""
+    keys = [str(account) for account in accounts]
+    chunks = [keys[i:i + MAX_ACCOUNTS_PER_REQUEST] for i in range(0, len(keys), MAX_ACCOUNTS_PER_REQUEST)]
+    responses = await asyncio.gather(*(client.get_multiple_accounts(chunk, commitment) for chunk in chunks))
+    return [info for (chunk, resp) in zip(chunks, responses) for info in decodeMultipleAccounts(chunk, resp)]
+
+
+async def getAccountsData(client: AsyncClient, accounts: Sequence[Union[str, PublicKey]],
+                          expected_length: int) -> List[bytes]:
+    result = []
+    for (account, info) in zip(accounts, await getMultipleAccounts(client, accounts)):
+        if info is None:
+            raise Exception("Can't get information about {}".format(account))
+        if len(info.data) < expected_length:
+            print("len(data)({}) < expected_length({})".format(len(info.data), expected_length))
+            raise Exception("Wrong data length for account data {}".format(account))
+        result.append(info.data)
+    return result
+
+
+async def getTransactionCounts(client: AsyncClient, sol_accounts: Sequence[Union[str, PublicKey]]) -> List[int]:
+    infos = await getAccountsData(client, sol_accounts, ACCOUNT_INFO_LAYOUT.sizeof())
+    return [int.from_bytes(AccountInfo.frombytes(info).trx_count, 'little') for info in infos]
+
+
+async def getNeonBalances(client: AsyncClient, sol_accounts: Sequence[Union[str, PublicKey]]) -> List[int]:
+    infos = await getAccountsData(client, sol_accounts, ACCOUNT_INFO_LAYOUT.sizeof())
+    return [int.from_bytes(ACCOUNT_INFO_LAYOUT.parse(info).balance, byteorder="little") for info in infos]
+
+
+async def getTransactionCount(client: AsyncClient, sol_account: Union[str, PublicKey]) -> int:
+    info = await getAccountData(client, sol_account, ACCOUNT_INFO_LAYOUT.sizeof())
+    acc_info = AccountInfo.frombytes(info)
+    return int.from_bytes(acc_info.trx_count, 'little')
+
+
+async def getNeonBalance(client: AsyncClient, sol_account: Union[str, PublicKey]) -> int:
+    info = await getAccountData(client, sol_account, ACCOUNT_INFO_LAYOUT.sizeof())
+    account = ACCOUNT_INFO_LAYOUT.parse(info)
+    return int.from_bytes(account.balance, byteorder="little")
+
+
+async def createEtherAccount(client: AsyncClient, loader: EvmLoader, ether):
+    # createEtherAccountTrx derives the address through neon-cli, keep it off the event loop
+    loop = asyncio.get_running_loop()
+    (trx, sol) = await loop.run_in_executor(None, loader.createEtherAccountTrx, ether)
+    await send_transaction(client, trx, loader.acc.get_acc())
+    return sol
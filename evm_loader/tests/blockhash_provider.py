@@ -0,0 +1,159 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional
+
+from solana.account import Account
+from solana.blockhash import Blockhash
+from solana.rpc import types
+from solana.rpc.api import Client
+from solana.rpc.commitment import Confirmed
+from solana.transaction import Transaction
+
+from solana_utils import SLOT_DURATION
+
+REFRESH_INTERVAL = 1.0  # seconds
+# transactions whose blockhash stays valid for fewer blocks than this are re-signed
+EXPIRY_MARGIN = 30
+# number of recent blockhashes (and signatures made with them) remembered by the provider
+MAX_KNOWN_BLOCKHASHES = 256
+MAX_USED_SIGNATURES = 4096
+
+
+class RecentBlockhash(NamedTuple):
+    blockhash: Blockhash
+    last_valid_block_height: int
+
+
+class BlockhashProvider:
+    """Keeps a recent blockhash of the node at hand, so that signing a transaction needs no RPC call.
+
+    The blockhash is refreshed on a timer by a daemon thread. Only the very first `get` waits for it,
+    afterwards the last fetched one is returned immediately.
+
+    Nodes older than 1.9 don't have getLatestBlockhash, with them the provider falls back to getFees
+    and tracks slots instead of block heights.
+    """
+
+    def __init__(self, url: str, refresh_interval: float = REFRESH_INTERVAL, expiry_margin: int = EXPIRY_MARGIN):
+        self.client = Client(url)
+        self.refresh_interval = refresh_interval
+        self.expiry_margin = expiry_margin
+        self._current: Optional[RecentBlockhash] = None
+        self._block_height = 0
+        self._block_height_time = 0.0
+        self._known: Dict[str, int] = OrderedDict()
+        self._used_signatures: Dict[bytes, None] = OrderedDict()
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> 'BlockhashProvider':
+        with self._lock:
+            if self._thread is None:
+                self._stopped.clear()
+                self._thread = threading.Thread(target=self._run, name="blockhash-provider", daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self):
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stopped.set()
+            thread.join()
+
+    def _run(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception as err:
+                print("failed to refresh recent blockhash:", err)
+            if self._stopped.wait(self.refresh_interval):
+                return
+
+    def _fetch(self):
+        resp = self.client._provider.make_request(types.RPCMethod("getLatestBlockhash"), {"commitment": Confirmed})
+        if resp.get("result"):
+            value = resp["result"]["value"]
+            height = self.client._provider.make_request(types.RPCMethod("getBlockHeight"), {"commitment": Confirmed})
+            return value["blockhash"], value["lastValidBlockHeight"], height["result"]
+        value = self.client.get_fees(commitment=Confirmed)["result"]["value"]
+        slot = self.client.get_slot(commitment=Confirmed)["result"]
+        return value["blockhash"], value["lastValidSlot"], slot
+
+    def refresh(self) -> RecentBlockhash:
+        """Fetches the blockhash right away, bypassing the timer."""
+        (blockhash, last_valid_block_height, block_height) = self._fetch()
+        current = RecentBlockhash(Blockhash(blockhash), last_valid_block_height)
+        with self._lock:
+            self._current = current
+            self._block_height = block_height
+            self._block_height_time = time.monotonic()
+            self._known[blockhash] = last_valid_block_height
+            while len(self._known) > MAX_KNOWN_BLOCKHASHES:
+                self._known.popitem(last=False)
+        self._ready.set()
+        return current
+
+    def get(self) -> RecentBlockhash:
+        self.start()
+        self._ready.wait()
+        with self._lock:
+            return self._current
+
+    def block_height(self) -> int:
+        """Block height of the node, extrapolated from the last refresh."""
+        with self._lock:
+            return self._block_height + int((time.monotonic() - self._block_height_time) / SLOT_DURATION)
+
+    def is_expiring(self, blockhash: Blockhash) -> bool:
+        """True when `blockhash` is unknown or will expire within `expiry_margin` blocks."""
+        with self._lock:
+            last_valid_block_height = self._known.get(str(blockhash))
+        return last_valid_block_height is None or last_valid_block_height - self.block_height() < self.expiry_margin
+
+    def sign(self, trx: Transaction, *signers: Account) -> Transaction:
+        """Signs `trx` with the current blockhash.
+
+        Signing the same message twice with one blockhash would make a duplicate of an already sent
+        transaction, in that case the provider waits for the next blockhash.
+        """
+        trx.recent_blockhash = self.get().blockhash
+        trx.sign(*signers)
+        while not self._mark_used(trx.signature()):
+            time.sleep(SLOT_DURATION)
+            if self.refresh().blockhash != trx.recent_blockhash:
+                trx.recent_blockhash = self.get().blockhash
+                trx.sign(*signers)
+        return trx
+
+    def ensure_valid(self, trx: Transaction, *signers: Account) -> Transaction:
+        """Re-signs a prepared transaction if its blockhash is about to expire (or it isn't signed yet)."""
+        if (trx.recent_blockhash is None or not trx.signatures or not all(sig.signature for sig in trx.signatures)
+                or self.is_expiring(trx.recent_blockhash)):
+            self.sign(trx, *signers)
+        return trx
+
+    def _mark_used(self, signature: bytes) -> bool:
+        with self._lock:
+            if signature in self._used_signatures:
+                return False
+            self._used_signatures[signature] = None
+            while len(self._used_signatures) > MAX_USED_SIGNATURES:
+                self._used_signatures.popitem(last=False)
+            return True
+
+
+_providers: Dict[str, BlockhashProvider] = {}
+_providers_lock = threading.Lock()
+
+
+def get_blockhash_provider(url: str) -> BlockhashProvider:
+    """Returns the provider shared by all helpers talking to the node at `url`."""
+    with _providers_lock:
+        provider = _providers.get(url)
+        if provider is None:
+            provider = _providers[url] = BlockhashProvider(url)
+    return provider.start()
@@ -0,0 +1,273 @@
+import asyncio
+import itertools
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, Iterable, List, Optional
+from urllib.parse import urlsplit, urlunsplit
+
+import aiohttp
+
+from async_solana_utils import AsyncClient
+
+# getSignatureStatuses accepts at most 256 signatures per request
+MAX_SIGNATURES_PER_REQUEST = 256
+CONFIRMATION_TIMEOUT = 30  # seconds
+POLL_INTERVAL = 0.1  # seconds
+# while the websocket is up, polling only catches notifications that were missed: it runs once
+# more after new subscriptions are acknowledged (a transaction may have been confirmed before
+# its subscription was registered) and at this interval otherwise
+WS_POLL_INTERVAL = 1.0  # seconds
+WS_RECONNECT_DELAY = 1.0  # seconds
+WS_HEARTBEAT = 10.0  # seconds
+WS_COMMITMENT = "confirmed"
+
+
+class _PendingSignature:
+    def __init__(self, confirmations: int, deadline: float):
+        self.future = Future()
+        self.confirmations = confirmations
+        self.deadline = deadline
+
+
+def is_confirmed(status, confirmations=0) -> bool:
+    return bool(status) and (status['confirmationStatus'] == 'finalized'
+                             or status['confirmationStatus'] == 'confirmed' and status['confirmations'] >= confirmations)
+
+
+def websocket_url_for(url: str) -> str:
+    """Returns the pubsub endpoint of a validator, it listens on the RPC port + 1."""
+    parts = urlsplit(url)
+    scheme = "wss" if parts.scheme == "https" else "ws"
+    netloc = parts.netloc
+    if parts.port is not None:
+        netloc = "{}:{}".format(parts.hostname, parts.port + 1)
+    return urlunsplit((scheme, netloc, parts.path, parts.query, parts.fragment))
+
+
+class ConfirmationTracker:
+    """Confirms pending transactions with one batched getSignatureStatuses call per tick.
+
+    The tracker owns an event loop running in a daemon thread. Every tracked signature gets
+    a concurrent.futures.Future resolved with its status, so the tracker can be waited on from
+    blocking code (`future.result()`) as well as from coroutines (`asyncio.wrap_future(future)`).
+
+    When `websocket_url` is given, every signature is also subscribed through `signatureSubscribe`
+    and resolved as soon as the node pushes the notification. Polling keeps running at a lower rate,
+    once more right after subscriptions are acknowledged, and takes over completely while the socket is down.
+    """
+
+    def __init__(self, url: str, websocket_url: Optional[str] = None, timeout: float = CONFIRMATION_TIMEOUT,
+                 poll_interval: float = POLL_INTERVAL):
+        self.url = url
+        self.websocket_url = websocket_url
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self._pending: Dict[str, _PendingSignature] = {}
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        # set when polling at the full rate is due again while the websocket is up
+        self._poll_due: Optional[asyncio.Event] = None
+        self._to_subscribe: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Future] = []
+        self._thread: Optional[threading.Thread] = None
+        self._started = threading.Event()
+
+    def start(self) -> 'ConfirmationTracker':
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="confirmation-tracker", daemon=True)
+                self._thread.start()
+        self._started.wait()
+        return self
+
+    def stop(self):
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._loop.call_soon_threadsafe(self._cancel)
+            thread.join()
+            self._started.clear()
+
+    def track(self, tx_sig: str, confirmations: int = 0, callback: Optional[Callable[[Future], None]] = None) -> Future:
+        """Register a signature; the returned future resolves with its status once it is confirmed."""
+        self.start()
+        with self._lock:
+            pending = self._pending.get(tx_sig)
+            if pending is None:
+                pending = _PendingSignature(confirmations, time.monotonic() + self.timeout)
+                self._pending[tx_sig] = pending
+            else:
+                pending.confirmations = max(pending.confirmations, confirmations)
+        if callback is not None:
+            pending.future.add_done_callback(callback)
+        self._loop.call_soon_threadsafe(self._on_track, tx_sig)
+        return pending.future
+
+    def confirm(self, tx_sig: str, confirmations: int = 0):
+        return self.track(tx_sig, confirmations).result()
+
+    def confirm_many(self, tx_sigs: Iterable[str], confirmations: int = 0) -> List:
+        futures = [self.track(tx_sig, confirmations) for tx_sig in tx_sigs]
+        return [future.result() for future in futures]
+
+    @property
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    @property
+    def websocket_connected(self) -> bool:
+        return self._to_subscribe is not None
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._wakeup = asyncio.Event()
+        self._poll_due = asyncio.Event()
+        try:
+            self._loop.run_until_complete(self._main())
+        finally:
+            self._loop.close()
+
+    async def _main(self):
+        async with AsyncClient(self.url) as client:
+            self._tasks = [asyncio.ensure_future(self._poll(client))]
+            if self.websocket_url:
+                self._tasks.append(asyncio.ensure_future(self._subscribe(client)))
+            self._started.set()
+            try:
+                await asyncio.gather(*self._tasks)
+            except asyncio.CancelledError:
+                pass
+
+    def _cancel(self):
+        for task in self._tasks:
+            task.cancel()
+
+    def _on_track(self, tx_sig: str):
+        self._wakeup.set()
+        if self._to_subscribe is not None:
+            self._to_subscribe.put_nowait(tx_sig)
+
+    async def _poll(self, client: AsyncClient):
+        while True:
+            with self._lock:
+                signatures = list(self._pending)
+            if not signatures:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+
+            self._poll_due.clear()
+            chunks = [signatures[i:i + MAX_SIGNATURES_PER_REQUEST]
+                      for i in range(0, len(signatures), MAX_SIGNATURES_PER_REQUEST)]
+            responses = await asyncio.gather(*(client.get_signature_statuses(chunk) for chunk in chunks),
+                                             return_exceptions=True)
+            for chunk, resp in zip(chunks, responses):
+                if isinstance(resp, dict) and resp.get("result"):
+                    self._resolve(chunk, resp["result"]["value"])
+            self._expire()
+            await asyncio.sleep(self.poll_interval)
+            if self.websocket_connected and not self._poll_due.is_set():
+                try:
+                    await asyncio.wait_for(self._poll_due.wait(), max(WS_POLL_INTERVAL - self.poll_interval, 0))
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _subscribe(self, client: AsyncClient):
+        while True:
+            try:
+                async with client._get_session().ws_connect(self.websocket_url, heartbeat=WS_HEARTBEAT) as ws:
+                    await self._listen(ws)
+            except (aiohttp.ClientError, asyncio.TimeoutError, OSError):
+                pass
+            await asyncio.sleep(WS_RECONNECT_DELAY)
+
+    async def _listen(self, ws: aiohttp.ClientWebSocketResponse):
+        requests: Dict[int, str] = {}
+        subscriptions: Dict[int, str] = {}
+        queue = asyncio.Queue()
+        with self._lock:
+            for tx_sig in self._pending:
+                queue.put_nowait(tx_sig)
+        self._to_subscribe = queue
+        sender = asyncio.ensure_future(self._send_subscriptions(ws, queue, requests))
+        try:
+            async for msg in ws:
+                if msg.type != aiohttp.WSMsgType.TEXT:
+                    continue
+                data = json.loads(msg.data)
+                if "id" in data:
+                    tx_sig = requests.pop(data["id"], None)
+                    if tx_sig is not None and "result" in data:
+                        subscriptions[data["result"]] = tx_sig
+                        self._poll_due.set()
+                elif data.get("method") == "signatureNotification":
+                    params = data["params"]
+                    tx_sig = subscriptions.pop(params["subscription"], None)
+                    if tx_sig is not None:
+                        result = params["result"]
+                        status = {
+                            'slot': result['context']['slot'],
+                            'confirmations': 0,
+                            'err': result['value']['err'],
+                            'confirmationStatus': WS_COMMITMENT,
+                        }
+                        self._resolve([tx_sig], [status])
+        finally:
+            self._to_subscribe = None
+            self._poll_due.set()
+            sender.cancel()
+
+    async def _send_subscriptions(self, ws: aiohttp.ClientWebSocketResponse, queue: asyncio.Queue,
+                                  requests: Dict[int, str]):
+        request_ids = itertools.count(1)
+        while True:
+            tx_sig = await queue.get()
+            with self._lock:
+                if tx_sig not in self._pending:
+                    continue
+            request_id = next(request_ids)
+            requests[request_id] = tx_sig
+            await ws.send_json({"jsonrpc": "2.0", "id": request_id, "method": "signatureSubscribe",
+                                "params": [tx_sig, {"commitment": WS_COMMITMENT}]})
+
+    def _resolve(self, signatures: List[str], statuses: List):
+        for tx_sig, status in zip(signatures, statuses):
+            with self._lock:
+                pending = self._pending.get(tx_sig)
+                if pending is None or not is_confirmed(status, pending.confirmations):
+                    continue
+                del self._pending[tx_sig]
+            pending.future.set_result(status)
+
+    def _expire(self):
+        now = time.monotonic()
+        with self._lock:
+            expired = [(tx_sig, pending) for tx_sig, pending in self._pending.items() if pending.deadline < now]
+            for tx_sig, _ in expired:
+                del self._pending[tx_sig]
+        for tx_sig, pending in expired:
+            pending.future.set_exception(RuntimeError("could not confirm transaction: ", tx_sig))
+
+
+_trackers: Dict[str, ConfirmationTracker] = {}
+_trackers_lock = threading.Lock()
+
+
+def get_confirmation_tracker(url: str) -> ConfirmationTracker:
+    """Returns the tracker shared by all helpers talking to the node at `url`.
+
+    Shared trackers subscribe to the node's pubsub endpoint (SOLANA_WS_URL, or the RPC port + 1),
+    set SOLANA_WS_URL to an empty string to confirm by polling only.
+    """
+    with _trackers_lock:
+        tracker = _trackers.get(url)
+        if tracker is None:
+            websocket_url = os.environ.get("SOLANA_WS_URL", websocket_url_for(url)) or None
+            tracker = _trackers[url] = ConfirmationTracker(url, websocket_url)
+    return tracker
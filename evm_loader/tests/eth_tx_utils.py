@@ -1,114 +1,235 @@
 from sha3 import keccak_256
+import itertools
 import json
-from web3.auto import w3
+import os
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
 from eth_keys import keys
 import struct
 
+try:
+    import coincurve
+except ImportError:
+    coincurve = None
+
+# worker processes of sign_payloads
+SIGNER_WORKERS = int(os.environ.get("SIGNER_WORKERS", os.cpu_count() or 1))
+# number of transactions signed by a worker at once
+SIGNER_CHUNK_SIZE = 256
+# layout of the `caller_ether + sign + msg` payload of the Neon instructions
+ETH_ADDRESS_SIZE = 20
+SIGNATURE_SIZE = 65
+# number of recovered senders kept by transaction hash
+SENDER_CACHE_SIZE = 65536
+# recover_senders uses worker processes when at least this number of senders isn't cached
+PARALLEL_RECOVERY_THRESHOLD = 256
+
+
+def rlp_decode(data, offset=0, copy=False):
+    """Decodes the RLP item at `offset` of `data`, returns the item and the offset following it.
+
+    The buffer is walked by offsets with an explicit stack instead of recursion. Items are represented
+    as by `unpack`: an int for a single byte, None for an empty string, () for an empty list, and
+    memoryviews over `data` for strings (bytes if `copy` is set).
+    """
+    data = memoryview(data)
+    size = len(data)
+    stack = []
+    while True:
+        if offset >= size:
+            raise Exception("RLP data is truncated at {}".format(offset))
+        ch = data[offset]
+        if ch < 0xC0:
+            if ch <= 0x7F:
+                (item, offset) = (ch, offset + 1)
+            elif ch == 0x80:
+                (item, offset) = (None, offset + 1)
+            else:
+                if ch <= 0xB7:
+                    (start, l) = (offset + 1, ch - 0x80)
+                else:
+                    lLen = ch - 0xB7
+                    (start, l) = (offset + 1 + lLen, int.from_bytes(data[offset + 1:offset + 1 + lLen], byteorder='big'))
+                offset = start + l
+                if offset > size:
+                    raise Exception("RLP string at {} exceeds the data".format(start))
+                item = data[start:offset].tobytes() if copy else data[start:offset]
+        else:
+            if ch <= 0xF7:
+                (start, l) = (offset + 1, ch - 0xC0)
+            else:
+                lLen = ch - 0xF7
+                (start, l) = (offset + 1 + lLen, int.from_bytes(data[offset + 1:offset + 1 + lLen], byteorder='big'))
+            if start + l > size:
+                raise Exception("RLP list at {} exceeds the data".format(start))
+            offset = start
+            if l == 0:
+                item = ()
+            else:
+                stack.append(([], start + l))
+                continue
+
+        # attach the item to its list, the lists which are complete then become items themselves
+        while stack:
+            (items, end) = stack[-1]
+            items.append(item)
+            if offset < end:
+                break
+            if offset > end:
+                raise Exception("RLP item at {} exceeds its list".format(offset))
+            stack.pop()
+            item = items
+        else:
+            return (item, offset)
+
+
+def rlp_decode_stream(data, copy=False):
+    """Decodes concatenated RLP items, e.g. many raw transactions, yields them one by one."""
+    data = memoryview(data)
+    offset = 0
+    while offset < len(data):
+        (item, offset) = rlp_decode(data, offset, copy)
+        yield item
+
 
 def unpack(data):
-    ch = data[0]
-    if (ch <= 0x7F):
-        return (ch, data[1:])
-    elif (ch == 0x80):
-        return (None, data[1:])
-    elif (ch <= 0xB7):
-        l = ch - 0x80
-        return (data[1:1 + l].tobytes(), data[1 + l:])
-    elif (ch <= 0xBF):
-        lLen = ch - 0xB7
-        l = int.from_bytes(data[1:1 + lLen], byteorder='big')
-        return (data[1 + lLen:1 + lLen + l].tobytes(), data[1 + lLen + l:])
-    elif (ch == 0xC0):
-        return ((), data[1:])
-    elif (ch <= 0xF7):
-        l = ch - 0xC0
-        lst = list()
-        sub = data[1:1 + l]
-        while len(sub):
-            (item, sub) = unpack(sub)
-            lst.append(item)
-        return (lst, data[1 + l:])
-    else:
-        lLen = ch - 0xF7
-        l = int.from_bytes(data[1:1 + lLen], byteorder='big')
-        lst = list()
-        sub = data[1 + lLen:1 + lLen + l]
-        while len(sub):
-            (item, sub) = unpack(sub)
-            lst.append(item)
-        return (lst, data[1 + lLen + l:])
+    (item, offset) = rlp_decode(data, copy=True)
+    return (item, memoryview(data)[offset:])
 
 
-def pack(data):
+# headers of short strings and lists, and single bytes, by value
+_STRING_HEADERS = [bytes([0x80 + l]) for l in range(56)]
+_LIST_HEADERS = [bytes([0xC0 + l]) for l in range(56)]
+_SINGLE_BYTES = [bytes([b]) for b in range(0x80)]
+
+
+def _header(length, base):
+    # base is 0x80 for strings and 0xC0 for lists
+    if length <= 55:
+        return (_STRING_HEADERS if base == 0x80 else _LIST_HEADERS)[length]
+    lLen = (length.bit_length() + 7) // 8
+    return (base + 55 + lLen).to_bytes(1, 'big') + length.to_bytes(lLen, 'big')
+
+
+def _encode(data, pieces):
+    """Appends the pieces of the encoding of `data` to `pieces`, returns the encoded size.
+
+    The header of a list is a placeholder until the size of its items is known.
+    """
     if data == None:
-        return (0x80).to_bytes(1, 'big')
+        pieces.append(_STRING_HEADERS[0])
+        return 1
     if isinstance(data, str):
-        return pack(data.encode('utf8'))
-    elif isinstance(data, bytes):
-        if len(data) <= 55:
-            return (len(data) + 0x80).to_bytes(1, 'big') + data
-        else:
-            l = len(data)
-            lLen = (l.bit_length() + 7) // 8
-            return (0xB7 + lLen).to_bytes(1, 'big') + l.to_bytes(lLen, 'big') + data
+        data = data.encode('utf8')
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        if len(data) == 1 and data[0] < 0x80:
+            pieces.append(_SINGLE_BYTES[data[0]])
+            return 1
+        header = _header(len(data), 0x80)
+        pieces.append(header)
+        pieces.append(data)
+        return len(header) + len(data)
     elif isinstance(data, int):
+        if data < 0:
+            raise Exception("RLP can't encode the negative integer {}".format(data))
         if data < 0x80:
-            return data.to_bytes(1, 'big')
-        else:
-            l = (data.bit_length() + 7) // 8
-            return (l + 0x80).to_bytes(1, 'big') + data.to_bytes(l, 'big')
-        pass
+            pieces.append(_SINGLE_BYTES[data])
+            return 1
+        l = (data.bit_length() + 7) // 8
+        pieces.append(_STRING_HEADERS[l])
+        pieces.append(data.to_bytes(l, 'big'))
+        return 1 + l
     elif isinstance(data, list) or isinstance(data, tuple):
-        if len(data) == 0:
-            return (0xC0).to_bytes(1, 'big')
-        else:
-            res = bytearray()
-            for d in data:
-                res += pack(d)
-            l = len(res)
-            if l <= 55:
-                return (l + 0xC0).to_bytes(1, 'big') + res
-            else:
-                lLen = (l.bit_length() + 7) // 8
-                return (lLen + 0xF7).to_bytes(1, 'big') + l.to_bytes(lLen, 'big') + res
+        index = len(pieces)
+        pieces.append(None)
+        size = 0
+        for d in data:
+            size += _encode(d, pieces)
+        header = _header(size, 0xC0)
+        pieces[index] = header
+        return len(header) + size
     else:
         raise Exception("Unknown type {} of data".format(str(type(data))))
 
 
+def pack(data):
+    """RLP encoding of `data`: the pieces are collected first and copied once into a buffer of the total size."""
+    pieces = []
+    _encode(data, pieces)
+    return b"".join(pieces)
+
+
+def pack_many(items):
+    """Encodes many items, e.g. unsigned transactions, into one contiguous buffer.
+
+    Returns the buffer and the offsets of the items in it, item i is buffer[offsets[i]:offsets[i + 1]].
+    """
+    pieces = []
+    offsets = [0]
+    for data in items:
+        offsets.append(offsets[-1] + _encode(data, pieces))
+    return (b"".join(pieces), offsets)
+
+
 def getInt(a):
     if isinstance(a, int): return a
-    if isinstance(a, bytes): return int.from_bytes(a, 'big')
+    if isinstance(a, (bytes, bytearray, memoryview)): return int.from_bytes(a, 'big')
     if a == None: return a
     raise Exception("Invalid convertion from {} to int".format(a))
 
 
+def getBytes(a):
+    if isinstance(a, int): return bytes([a])
+    return None if a == None else bytes(a)
+
+
 class Trx:
-    def __init__(self):
-        self.nonce = None
-        self.gasPrice = None
-        self.gasLimit = None
-        self.toAddress = None
-        self.value = None
-        self.callData = None
-        self.v = None
-        self.r = None
-        self.s = None
+    """Legacy Ethereum transaction.
+
+    The unsigned message, its hash and the sender are computed once; they are kept along with the
+    fields they were computed from, so assigning a field invalidates them.
+    """
+    __slots__ = ('nonce', 'gasPrice', 'gasLimit', 'toAddress', 'value', 'callData', 'v', 'r', 's',
+                 '_msg', '_hash', '_sender')
+
+    def __init__(self, nonce=None, gasPrice=None, gasLimit=None, toAddress=None, value=None, callData=None,
+                 v=None, r=None, s=None):
+        self.nonce = nonce
+        self.gasPrice = gasPrice
+        self.gasLimit = gasLimit
+        self.toAddress = toAddress
+        self.value = value
+        self.callData = callData
+        self.v = v
+        self.r = r
+        self.s = s
+        self._msg = None
+        self._hash = None
+        self._sender = None
 
     @classmethod
-    def fromString(cls, s):
-        t = Trx()
-        (unpacked, data) = unpack(memoryview(s))
+    def fromFields(cls, unpacked):
         (nonce, gasPrice, gasLimit, toAddress, value, callData, v, r, s) = unpacked
-        t.nonce = getInt(nonce)
-        t.gasPrice = getInt(gasPrice)
-        t.gasLimit = getInt(gasLimit)
-        t.toAddress = toAddress
-        t.value = getInt(value)
-        t.callData = callData
-        t.v = getInt(v)
-        t.r = getInt(r)
-        t.s = getInt(s)
-        return t
+        return cls(getInt(nonce), getInt(gasPrice), getInt(gasLimit), getBytes(toAddress), getInt(value),
+                   getBytes(callData), getInt(v), getInt(r), getInt(s))
+
+    @classmethod
+    def fromString(cls, s):
+        (unpacked, _) = rlp_decode(s)
+        return cls.fromFields(unpacked)
+
+    @classmethod
+    def from_raw_many(cls, raws):
+        """Decodes many raw transactions: an iterable of them or one buffer with them concatenated."""
+        if isinstance(raws, (bytes, bytearray, memoryview)):
+            return [cls.fromFields(unpacked) for unpacked in rlp_decode_stream(raws)]
+        return [cls.fromString(raw) for raw in raws]
+
+    def _unsigned(self, chainId):
+        # zero integers and empty strings are both encoded as the empty string
+        return (self.nonce or None, self.gasPrice or None, self.gasLimit or None, self.toAddress or None,
+                self.value or None, self.callData or None, chainId or self.chainId())
 
     def chainId(self):
         # chainid*2 + 35  xxxxx0 + 100011   xxxx0 + 100010 +1
@@ -129,31 +250,93 @@ class Trx:
         ).hex()
 
     def get_msg(self, chainId=None):
-        return pack((
-            self.nonce,
-            self.gasPrice,
-            self.gasLimit,
-            self.toAddress,
-            self.value,
-            self.callData,
-            chainId or self.chainId(), None, None))
+        fields = self._unsigned(chainId)
+        if self._msg is None or self._msg[0] != fields:
+            self._msg = (fields, pack(fields + (None, None)))
+        return self._msg[1]
 
     def hash(self, chainId=None):
-        trx = pack((
-            self.nonce,
-            self.gasPrice,
-            self.gasLimit,
-            self.toAddress,
-            self.value,
-            self.callData,
-            chainId or self.chainId(), None, None))
-        return keccak_256(trx).digest()
+        fields = self._unsigned(chainId)
+        if self._hash is None or self._hash[0] != fields:
+            self._hash = (fields, keccak_256(self.get_msg(chainId)).digest())
+        return self._hash[1]
+
+    def signature(self):
+        return keys.Signature(vrs=[1 if self.v % 2 == 0 else 0, self.r, self.s])
+
+    def tx_hash(self):
+        """Hash of the signed transaction, the keccak of its raw encoding."""
+        return keccak_256(pack(self._unsigned(None)[:-1] + (self.v, self.r, self.s))).digest()
 
     def sender(self):
-        msgHash = self.hash()
-        sig = keys.Signature(vrs=[1 if self.v % 2 == 0 else 0, self.r, self.s])
-        pub = sig.recover_public_key_from_msg_hash(msgHash)
-        return pub.to_canonical_address().hex()
+        fields = self._unsigned(None) + (self.v, self.r, self.s)
+        if self._sender is None or self._sender[0] != fields:
+            self._sender = (fields, recover_senders([self])[0].hex())
+        return self._sender[1]
+
+
+def _recover_sender(item):
+    """Canonical address of the signer of `msg_hash`, the signature is r || s || recovery id."""
+    (msg_hash, signature) = item
+    if coincurve is not None:
+        pub = coincurve.PublicKey.from_signature_and_message(signature, msg_hash, hasher=None)
+        return keccak_256(pub.format(compressed=False)[1:]).digest()[-20:]
+    return keys.Signature(signature).recover_public_key_from_msg_hash(msg_hash).to_canonical_address()
+
+
+_senders = OrderedDict()
+_senders_lock = threading.Lock()
+
+_process_pools = {}
+_process_pools_lock = threading.Lock()
+
+
+def process_pool(max_workers=SIGNER_WORKERS):
+    """Worker processes shared by the signing, recovery and address derivation helpers, started on first use."""
+    with _process_pools_lock:
+        pool = _process_pools.get(max_workers)
+        if pool is None:
+            pool = _process_pools[max_workers] = ProcessPoolExecutor(max_workers=max_workers)
+        return pool
+
+
+def recover_senders(trxs):
+    """Canonical sender addresses of signed transactions: Trx objects, raw bytes or hex strings.
+
+    Senders are cached by transaction hash, so a transaction is recovered only once; coincurve
+    is used when it is installed and large batches are recovered in worker processes.
+    """
+    items = []
+    for trx in trxs:
+        if isinstance(trx, Trx):
+            items.append((trx.tx_hash(), trx))
+            continue
+        if isinstance(trx, str):
+            trx = bytes.fromhex(trx[2:] if trx[:2] == "0x" else trx)
+        items.append((keccak_256(trx).digest(), trx))
+
+    with _senders_lock:
+        found = {tx_hash: _senders[tx_hash] for (tx_hash, _) in items if tx_hash in _senders}
+        for tx_hash in found:
+            _senders.move_to_end(tx_hash)
+
+    missing = OrderedDict()
+    for (tx_hash, trx) in items:
+        if tx_hash not in found and tx_hash not in missing:
+            trx = trx if isinstance(trx, Trx) else Trx.fromString(trx)
+            missing[tx_hash] = (trx.hash(), trx.signature().to_bytes())
+    if len(missing) >= PARALLEL_RECOVERY_THRESHOLD:
+        recovered = list(process_pool().map(_recover_sender, missing.values(), chunksize=64))
+    else:
+        recovered = [_recover_sender(item) for item in missing.values()]
+    found.update(zip(missing, recovered))
+
+    with _senders_lock:
+        for (tx_hash, sender) in zip(missing, recovered):
+            _senders[tx_hash] = sender
+        while len(_senders) > SENDER_CACHE_SIZE:
+            _senders.popitem(last=False)
+    return [found[tx_hash] for (tx_hash, _) in items]
 
 
 class JsonEncoder(json.JSONEncoder):
@@ -163,6 +346,94 @@ class JsonEncoder(json.JSONEncoder):
         return json.JSONEncoder.default(self.obj)
 
 
+_private_keys = {}
+
+
+def _private_key(private_key):
+    """eth_keys private key with its address, derived once per key."""
+    if isinstance(private_key, keys.PrivateKey):
+        private_key = private_key.to_bytes()
+    elif isinstance(private_key, str):
+        private_key = bytes.fromhex(private_key[2:] if private_key[:2] == "0x" else private_key)
+    else:
+        private_key = bytes(private_key)
+    entry = _private_keys.get(private_key)
+    if entry is None:
+        key = keys.PrivateKey(private_key)
+        entry = _private_keys[private_key] = (key, key.public_key.to_canonical_address())
+    return entry
+
+
+def _hex_bytes(value):
+    if value == None: return None
+    if isinstance(value, str):
+        return bytes.fromhex(value[2:] if value[:2] == "0x" else value)
+    return bytes(value)
+
+
+def unsigned_tx_fields(tx):
+    """Fields of the unsigned message of a w3 style transaction dict, encoded by `pack` as w3 signs it."""
+    if tx.get('chainId') == None:
+        raise Exception("chainId value is needed in input dict")
+    # zero integers and empty strings are both encoded as the empty string
+    return (tx['nonce'] or None, tx['gasPrice'] or None, tx['gas'] or None, _hex_bytes(tx.get('to')) or None,
+            tx.get('value') or None, _hex_bytes(tx.get('data')) or None, tx['chainId'], None, None)
+
+
+def sign_tx(tx, private_key):
+    """Signs the unsigned message of the transaction directly, returns (address, signature, message)."""
+    (key, address) = _private_key(private_key)
+    msg = pack(unsigned_tx_fields(tx))
+    return (address, key.sign_msg_hash(keccak_256(msg).digest()).to_bytes(), msg)
+
+
+def sign_txs(txs, private_key):
+    """`sign_tx` for many transactions of one sender, their messages are encoded into one buffer."""
+    (key, address) = _private_key(private_key)
+    (buffer, offsets) = pack_many([unsigned_tx_fields(tx) for tx in txs])
+    result = []
+    for (start, end) in zip(offsets, offsets[1:]):
+        msg = buffer[start:end]
+        result.append((address, key.sign_msg_hash(keccak_256(msg).digest()).to_bytes(), msg))
+    return result
+
+
+def _sign_payloads_chunk(private_key, txs):
+    return [address + sign + msg for (address, sign, msg) in sign_txs(txs, private_key)]
+
+
+def sign_payloads(txs, private_key, first_nonce=None, max_workers=SIGNER_WORKERS, chunk_size=SIGNER_CHUNK_SIZE):
+    """Signs a stream of transaction dicts of one sender in worker processes.
+
+    Yields the `caller_ether + sign + msg` payloads of the Neon instructions in the order of `txs`;
+    the message starts at ETH_ADDRESS_SIZE + SIGNATURE_SIZE. Transactions get consecutive nonces
+    starting from `first_nonce` if it is given. Only a few chunks per worker are kept in flight,
+    so the stream may be arbitrarily long.
+    """
+    (key, _) = _private_key(private_key)
+    private_key = key.to_bytes()
+    if first_nonce is not None:
+        txs = (dict(tx, nonce=nonce) for (tx, nonce) in zip(txs, itertools.count(first_nonce)))
+    txs = iter(txs)
+
+    executor = process_pool(max_workers)
+    pending = deque()
+    try:
+        while True:
+            while len(pending) < 2 * max_workers:
+                chunk = list(itertools.islice(txs, chunk_size))
+                if not chunk:
+                    break
+                pending.append(executor.submit(_sign_payloads_chunk, private_key, chunk))
+            if not pending:
+                return
+            yield from pending.popleft().result()
+    finally:
+        # the pool is shared, don't leave the chunks of an abandoned stream behind
+        for future in pending:
+            future.cancel()
+
+
 def make_instruction_data_from_tx(instruction, private_key=None):
     if isinstance(instruction, dict):
         if instruction['chainId'] == None:
@@ -170,18 +441,7 @@ def make_instruction_data_from_tx(instruction, private_key=None):
         if private_key == None:
             raise Exception("Needed private key for transaction creation from fields")
 
-        signed_tx = w3.eth.account.sign_transaction(instruction, private_key)
-        # print(signed_tx.rawTransaction.hex())
-        _trx = Trx.fromString(signed_tx.rawTransaction)
-        # print(json.dumps(_trx.__dict__, cls=JsonEncoder, indent=3))     
-
-        raw_msg = _trx.get_msg(instruction['chainId'])
-        sig = keys.Signature(vrs=[1 if _trx.v % 2 == 0 else 0, _trx.r, _trx.s])
-        pub = sig.recover_public_key_from_msg_hash(_trx.hash())
-
-        # print(pub.to_hex())
-
-        return (pub.to_canonical_address(), sig.to_bytes(), raw_msg)
+        return sign_tx(instruction, private_key)
     elif isinstance(instruction, str):
         if instruction[:2] == "0x":
             instruction = instruction[2:]
@@ -190,14 +450,9 @@ def make_instruction_data_from_tx(instruction, private_key=None):
         # print(json.dumps(_trx.__dict__, cls=JsonEncoder, indent=3))
 
         raw_msg = _trx.get_msg()
-        sig = keys.Signature(vrs=[1 if _trx.v % 2 == 0 else 0, _trx.r, _trx.s])
-        pub = sig.recover_public_key_from_msg_hash(_trx.hash())
-
-        data = pub.to_canonical_address()
-        data += sig.to_bytes()
-        data += raw_msg
+        (sender,) = recover_senders([_trx])
 
-        return (pub.to_canonical_address(), sig.to_bytes(), raw_msg)
+        return (sender, _trx.signature().to_bytes(), raw_msg)
     else:
         raise Exception("function gets ")
 
@@ -0,0 +1,262 @@
+"""Fake Solana node for the unit tests of the helpers, no validator is needed.
+
+FakeNode answers the JSON-RPC methods the helpers use on a local port and serves the pubsub
+websocket (signatureSubscribe) on the next port, as a validator does. Transactions aren't
+executed: sent ones are recorded and are confirmed right away or when the test says so.
+"""
+import asyncio
+import base64
+import socket
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+from aiohttp import WSMsgType, web
+from base58 import b58encode
+from solana.publickey import PublicKey
+from solana.transaction import Transaction
+
+SYSTEM_PROGRAM = "11111111111111111111111111111111"
+# number of blocks a blockhash stays valid for
+BLOCKHASH_LIFETIME = 150
+
+
+class RpcError(Exception):
+    """Raised by a handler to answer with a JSON-RPC error."""
+
+    def __init__(self, message: str, code: int = -32002):
+        super().__init__(message)
+        self.code = code
+
+
+def _free_port_pair() -> int:
+    """A free port whose next port is free as well."""
+    while True:
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        try:
+            with socket.socket() as sock:
+                sock.bind(("127.0.0.1", port + 1))
+        except OSError:
+            continue
+        return port
+
+
+def status(err=None, confirmation_status="confirmed", confirmations=0, slot=1) -> dict:
+    return {"slot": slot, "confirmations": confirmations, "err": err, "confirmationStatus": confirmation_status}
+
+
+class FakeNode:
+    """Serves a scripted Solana node from a daemon thread.
+
+    `handlers` overrides (or adds) RPC methods: a handler gets the params and returns the result.
+    Every request is recorded in `calls` as (method, params), websocket subscriptions included.
+    """
+
+    def __init__(self, auto_confirm: bool = True):
+        self.auto_confirm = auto_confirm
+        self.websocket_enabled = True
+        # called with the signature of every signatureSubscribe request before it is acknowledged
+        self.on_subscribe: Optional[Callable[[str], None]] = None
+        self.handlers: Dict[str, Callable[[list], object]] = {}
+        self.calls: List[Tuple[str, list]] = []
+        self.transactions: Dict[str, Transaction] = {}
+        self.statuses: Dict[str, dict] = {}
+        self.accounts: Dict[str, dict] = {}
+        self.slot = 1
+        self.block_height = 1000
+        self.blockhash = str(PublicKey(1))
+        self.url: Optional[str] = None
+        self.websocket_url: Optional[str] = None
+        self._blockhashes = 1
+        self._subscriptions: Dict[int, Tuple[web.WebSocketResponse, str]] = {}
+        self._subscription_ids = iter(range(1, 1 << 62))
+        self._websockets = set()
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> 'FakeNode':
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def start(self) -> 'FakeNode':
+        port = _free_port_pair()
+        self.url = "http://127.0.0.1:{}".format(port)
+        self.websocket_url = "ws://127.0.0.1:{}".format(port + 1)
+        started = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(port, started), name="fake-node", daemon=True)
+        self._thread.start()
+        started.wait()
+        return self
+
+    def stop(self):
+        # the confirmation tracker and the blockhash provider shared per node keep polling it
+        from blockhash_provider import get_blockhash_provider
+        from confirmation_tracker import get_confirmation_tracker
+        get_confirmation_tracker(self.url).stop()
+        get_blockhash_provider(self.url).stop()
+        self.drop_websockets()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+    def drop_websockets(self):
+        """Closes the open websockets, new ones are refused while `websocket_enabled` is False."""
+        asyncio.run_coroutine_threadsafe(self._close_websockets(), self._loop).result()
+
+    async def _close_websockets(self):
+        for ws in list(self._websockets):
+            await ws.close()
+
+    def _run(self, port: int, started: threading.Event):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        rpc = web.Application()
+        rpc.router.add_post("/", self._handle_rpc)
+        pubsub = web.Application()
+        pubsub.router.add_get("/", self._handle_websocket)
+        runners = [web.AppRunner(rpc), web.AppRunner(pubsub)]
+        for (runner, runner_port) in zip(runners, (port, port + 1)):
+            self._loop.run_until_complete(runner.setup())
+            self._loop.run_until_complete(web.TCPSite(runner, "127.0.0.1", runner_port).start())
+        started.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            for runner in runners:
+                self._loop.run_until_complete(runner.cleanup())
+            self._loop.close()
+
+    def count(self, method: str) -> int:
+        with self._lock:
+            return sum(1 for (called, _) in self.calls if called == method)
+
+    def params(self, method: str) -> List[list]:
+        with self._lock:
+            return [params for (called, params) in self.calls if called == method]
+
+    def set_account(self, pubkey, data: bytes = b"", lamports: int = 1, owner=SYSTEM_PROGRAM, executable=False):
+        with self._lock:
+            self.accounts[str(pubkey)] = {
+                "lamports": lamports,
+                "owner": str(owner),
+                "executable": executable,
+                "rentEpoch": 0,
+                "data": [base64.b64encode(data).decode(), "base64"],
+            }
+
+    def new_blockhash(self) -> str:
+        with self._lock:
+            self._blockhashes += 1
+            self.blockhash = str(PublicKey(self._blockhashes.to_bytes(32, 'big')))
+            return self.blockhash
+
+    def confirm(self, signature: str, err=None):
+        """Confirms a signature, its subscribers are notified."""
+        with self._lock:
+            self.statuses[signature] = status(err, slot=self.slot)
+        asyncio.run_coroutine_threadsafe(self._notify(signature, err), self._loop).result()
+
+    async def _notify(self, signature: str, err):
+        with self._lock:
+            subscribed = [(subscription, ws) for (subscription, (ws, subscribed)) in self._subscriptions.items()
+                          if subscribed == signature]
+            for (subscription, _) in subscribed:
+                del self._subscriptions[subscription]
+        for (subscription, ws) in subscribed:
+            await ws.send_json({"jsonrpc": "2.0", "method": "signatureNotification", "params": {
+                "result": {"context": {"slot": self.slot}, "value": {"err": err}},
+                "subscription": subscription,
+            }})
+
+    async def _handle_rpc(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        (method, params) = (body["method"], body.get("params", []))
+        with self._lock:
+            self.calls.append((method, params))
+        handler = self.handlers.get(method) or getattr(self, "_rpc_" + method, None)
+        response = {"jsonrpc": "2.0", "id": body["id"]}
+        try:
+            if handler is None:
+                raise RpcError("Method not found", -32601)
+            response["result"] = handler(params)
+        except RpcError as err:
+            response["error"] = {"code": err.code, "message": str(err)}
+        return web.json_response(response)
+
+    async def _handle_websocket(self, request: web.Request) -> web.StreamResponse:
+        if not self.websocket_enabled:
+            raise web.HTTPServiceUnavailable()
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self._websockets.add(ws)
+        try:
+            await self._serve_websocket(ws)
+        finally:
+            self._websockets.discard(ws)
+            with self._lock:
+                for subscription in [subscription for (subscription, (subscribed, _)) in self._subscriptions.items()
+                                     if subscribed is ws]:
+                    del self._subscriptions[subscription]
+        return ws
+
+    async def _serve_websocket(self, ws: web.WebSocketResponse):
+        async for msg in ws:
+            if msg.type != WSMsgType.TEXT:
+                continue
+            body = msg.json()
+            with self._lock:
+                self.calls.append((body["method"], body["params"]))
+            if body["method"] == "signatureSubscribe":
+                if self.on_subscribe is not None:
+                    self.on_subscribe(body["params"][0])
+                subscription = next(self._subscription_ids)
+                with self._lock:
+                    self._subscriptions[subscription] = (ws, body["params"][0])
+                await ws.send_json({"jsonrpc": "2.0", "id": body["id"], "result": subscription})
+
+    def _context(self, value) -> dict:
+        return {"context": {"slot": self.slot}, "value": value}
+
+    def _rpc_sendTransaction(self, params):
+        trx = Transaction.deserialize(base64.b64decode(params[0]))
+        signature = b58encode(trx.signatures[0].signature).decode()
+        with self._lock:
+            self.transactions[signature] = trx
+            if self.auto_confirm:
+                self.statuses[signature] = status(slot=self.slot)
+        return signature
+
+    def _rpc_getSignatureStatuses(self, params):
+        with self._lock:
+            return self._context([self.statuses.get(signature) for signature in params[0]])
+
+    def _rpc_getConfirmedTransaction(self, params):
+        with self._lock:
+            if params[0] not in self.statuses:
+                return None
+            return {"slot": self.slot, "meta": {"err": self.statuses[params[0]]["err"]},
+                    "transaction": {"signatures": [params[0]]}}
+
+    def _rpc_getLatestBlockhash(self, params):
+        return self._context({"blockhash": self.blockhash, "lastValidBlockHeight": self.block_height + BLOCKHASH_LIFETIME})
+
+    def _rpc_getBlockHeight(self, params):
+        return self.block_height
+
+    def _rpc_getAccountInfo(self, params):
+        with self._lock:
+            return self._context(self.accounts.get(params[0]))
+
+    def _rpc_getMultipleAccounts(self, params):
+        with self._lock:
+            return self._context([self.accounts.get(key) for key in params[0]])
+
+    def _rpc_getEpochInfo(self, params):
+        return {"epoch": 0, "slotIndex": self.slot, "slotsInEpoch": 432000, "absoluteSlot": self.slot,
+                "blockHeight": self.block_height}
+
+    def _rpc_simulateTransaction(self, params):
+        return self._context({"err": None, "logs": [], "unitsConsumed": 0})
@@ -0,0 +1,92 @@
+import json
+import os
+import queue
+import subprocess
+import threading
+from typing import List, Optional, Tuple
+
+# number of neon-cli server processes shared by the helpers, 0 spawns neon-cli per command
+NEON_CLI_WORKERS = int(os.environ.get("NEON_CLI_WORKERS", "2"))
+RESPONSE_KEY = "neon_cli_server"
+
+
+class NeonCliWorker:
+    """neon-cli running in server mode, executes one command at a time.
+
+    The process is (re)started on demand, so a command that kills it (e.g. by calling exit)
+    only fails itself.
+    """
+
+    def __init__(self, path: str = "neon-cli"):
+        self.path = path
+        self.process: Optional[subprocess.Popen] = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        if self.process is not None and self.process.poll() is not None:
+            self._close()
+        if self.process is None:
+            self.process = subprocess.Popen([self.path, "server"], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                            universal_newlines=True, bufsize=1)
+
+    def stop(self):
+        with self._lock:
+            if self.process is not None:
+                self._close()
+
+    def _close(self):
+        self.process.stdin.close()
+        self.process.wait()
+        self.process.stdout.close()
+        self.process = None
+
+    def run(self, args: List[str]) -> Tuple[int, str]:
+        """Executes `neon-cli <args>`, returns its exit code and stdout."""
+        with self._lock:
+            self.start()
+            self.process.stdin.write(json.dumps(args) + "\n")
+            self.process.stdin.flush()
+            output = []
+            for line in self.process.stdout:
+                if line.startswith('{"' + RESPONSE_KEY + '"'):
+                    # the server puts a newline before the response, it isn't a part of the output
+                    return json.loads(line)[RESPONSE_KEY]["exit_code"], "".join(output)[:-1]
+                output.append(line)
+            # the process died in the middle of the command
+            return self.process.wait(), "".join(output)
+
+
+class NeonCliPool:
+    def __init__(self, size: int = NEON_CLI_WORKERS, path: str = "neon-cli"):
+        self.workers = queue.Queue()
+        for _ in range(size):
+            self.workers.put(NeonCliWorker(path))
+
+    def run(self, args: List[str]) -> Tuple[int, str]:
+        worker = self.workers.get()
+        try:
+            return worker.run(args)
+        finally:
+            self.workers.put(worker)
+
+    def check_output(self, args: List[str]) -> str:
+        """Counterpart of subprocess.check_output for neon-cli commands."""
+        (exit_code, output) = self.run(args)
+        if exit_code != 0:
+            raise subprocess.CalledProcessError(exit_code, ["neon-cli"] + args, output)
+        return output
+
+
+_pool: Optional[NeonCliPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_neon_cli_pool() -> Optional[NeonCliPool]:
+    """Returns the pool shared by the neon_cli helpers, None when NEON_CLI_WORKERS is 0."""
+    global _pool
+    if NEON_CLI_WORKERS <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = NeonCliPool()
+    return _pool
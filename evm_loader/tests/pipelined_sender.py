@@ -0,0 +1,135 @@
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from typing import Callable, Deque, Dict, Hashable, Iterator, List, NamedTuple, Optional, Tuple
+
+from solana.account import Account
+from solana.rpc.api import Client
+from solana.rpc.types import TxOpts
+from solana.transaction import Transaction
+
+from confirmation_tracker import get_confirmation_tracker
+from solana_utils import account_cache, send_signed_transaction
+
+# maximum number of transactions submitted but not yet confirmed
+DEFAULT_WINDOW = 32
+MAX_SEND_WORKERS = 8
+
+
+class TransactionOutcome(NamedTuple):
+    trx: Transaction
+    signature: Optional[str]
+    # signature status reported by the node, None if the transaction wasn't confirmed
+    status: Optional[dict]
+    # exception raised while sending or confirming, or the error the transaction failed with
+    error: Optional[object]
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class _Submission:
+    def __init__(self, trx: Transaction, signers: Tuple[Account, ...], ordering_key: Optional[Hashable]):
+        self.trx = trx
+        self.signers = signers
+        self.ordering_key = ordering_key
+        self.future: Future = Future()
+
+
+class PipelinedSender:
+    """Keeps up to `window` transactions in flight instead of waiting for each one to be confirmed.
+
+    Transactions are independent unless they share an `ordering_key`: a transaction is sent only
+    after the previous one with the same key is confirmed (or failed). Use the storage account as the key
+    for sequential continue instructions. `submit` blocks while the window is full.
+
+    Every submission gets a future resolved with its TransactionOutcome; `as_completed` yields the outcomes
+    as soon as they are known, `wait` returns them in submission order.
+    """
+
+    def __init__(self, client: Client, window: int = DEFAULT_WINDOW, confirmations: int = 0,
+                 opts: TxOpts = TxOpts(skip_confirmation=True, preflight_commitment="confirmed")):
+        self.client = client
+        self.confirmations = confirmations
+        self.opts = opts._replace(skip_confirmation=True)
+        self._tracker = get_confirmation_tracker(client._provider.endpoint_uri)
+        self._window = threading.BoundedSemaphore(window)
+        self._executor = ThreadPoolExecutor(max_workers=min(window, MAX_SEND_WORKERS), thread_name_prefix="sender")
+        self._lock = threading.Lock()
+        # submissions waiting for the previous transaction with the same key, the head is in flight
+        self._chains: Dict[Hashable, Deque[_Submission]] = {}
+        self._submitted: List[Future] = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def submit(self, trx: Transaction, *signers: Account, ordering_key: Optional[Hashable] = None,
+               callback: Optional[Callable[[Future], None]] = None) -> Future:
+        self._window.acquire()
+        submission = _Submission(trx, signers, ordering_key)
+        if callback is not None:
+            submission.future.add_done_callback(callback)
+        with self._lock:
+            self._submitted.append(submission.future)
+            if ordering_key is not None:
+                chain = self._chains.setdefault(ordering_key, deque())
+                chain.append(submission)
+                if len(chain) > 1:
+                    return submission.future
+        self._executor.submit(self._send, submission)
+        return submission.future
+
+    def _send(self, submission: _Submission):
+        try:
+            # the transaction may have waited in its chain long enough for the blockhash to expire
+            signature = send_signed_transaction(self.client, submission.trx, *submission.signers, opts=self.opts)["result"]
+        except Exception as err:
+            self._finish(submission, TransactionOutcome(submission.trx, None, None, err))
+            return
+        self._tracker.track(signature, self.confirmations,
+                            callback=lambda future: self._on_confirmed(submission, signature, future))
+
+    def _on_confirmed(self, submission: _Submission, signature: str, future: Future):
+        try:
+            status = future.result()
+            outcome = TransactionOutcome(submission.trx, signature, status, status.get('err'))
+        except Exception as err:
+            outcome = TransactionOutcome(submission.trx, signature, None, err)
+        self._finish(submission, outcome)
+
+    def _finish(self, submission: _Submission, outcome: TransactionOutcome):
+        account_cache.invalidate_transaction(submission.trx)
+        next_submission = None
+        if submission.ordering_key is not None:
+            with self._lock:
+                chain = self._chains[submission.ordering_key]
+                chain.popleft()
+                if chain:
+                    next_submission = chain[0]
+                else:
+                    del self._chains[submission.ordering_key]
+        if next_submission is not None:
+            self._executor.submit(self._send, next_submission)
+        self._window.release()
+        submission.future.set_result(outcome)
+
+    def as_completed(self) -> Iterator[TransactionOutcome]:
+        """Yields outcomes of the transactions submitted so far in completion order."""
+        with self._lock:
+            futures = list(self._submitted)
+        for future in as_completed(futures):
+            yield future.result()
+
+    def wait(self) -> List[TransactionOutcome]:
+        """Waits for all transactions submitted so far, outcomes are in submission order."""
+        with self._lock:
+            futures, self._submitted = self._submitted, []
+        return [future.result() for future in futures]
+
+    def close(self):
+        self.wait()
+        self._executor.shutdown()
@@ -1,16 +1,24 @@
 import base64
 import json
 import os
+import re
+import shlex
 import subprocess
+import threading
 import time
+from collections import OrderedDict
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
+from functools import cached_property, wraps
 from hashlib import sha256
-from typing import NamedTuple, Tuple, Union
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple, Union
 
 import base58
 import rlp
+import yaml
 from base58 import b58encode
-from construct import Bytes, Int8ul, Int64ul, Struct as cStruct
+from construct import Bytes, Float64l, Int8ul, Int32ul, Int64ul, Struct as cStruct
 from eth_keys import keys as eth_keys
 from sha3 import keccak_256
 from solana._layouts.system_instructions import SYSTEM_INSTRUCTIONS_LAYOUT, InstructionType as SystemInstructionType
@@ -20,11 +28,13 @@ from solana.rpc import types
 from solana.rpc.api import Client
 from solana.rpc.commitment import Confirmed
 from solana.rpc.types import TxOpts
+from solana.system_program import CreateAccountParams, create_account
 from solana.transaction import AccountMeta, TransactionInstruction, Transaction
 
-from eth_tx_utils import make_keccak_instruction_data, make_instruction_data_from_tx
-from spl.token.constants import TOKEN_PROGRAM_ID, ASSOCIATED_TOKEN_PROGRAM_ID, ACCOUNT_LEN
-from spl.token.instructions import get_associated_token_address, approve, ApproveParams, create_associated_token_account
+from eth_tx_utils import make_keccak_instruction_data, make_instruction_data_from_tx, process_pool
+from spl.token.constants import TOKEN_PROGRAM_ID, ASSOCIATED_TOKEN_PROGRAM_ID, ACCOUNT_LEN, MINT_LEN
+from spl.token.instructions import get_associated_token_address, approve, ApproveParams, create_associated_token_account, \
+    initialize_mint, InitializeMintParams, mint_to2, MintTo2Params, transfer2, Transfer2Params
 import base58
 import math
 
@@ -33,6 +43,16 @@ CREATE_ACCOUNT_LAYOUT = cStruct(
     "nonce" / Int8ul
 )
 
+SPL_MINT_LAYOUT = cStruct(
+    "mint_authority_option" / Int32ul,
+    "mint_authority" / Bytes(32),
+    "supply" / Int64ul,
+    "decimals" / Int8ul,
+    "is_initialized" / Int8ul,
+    "freeze_authority_option" / Int32ul,
+    "freeze_authority" / Bytes(32),
+)
+
 system = "11111111111111111111111111111111"
 tokenkeg = "TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA"
 sysvarclock = "SysvarC1ock11111111111111111111111111111111"
@@ -42,14 +62,13 @@ rentid = "SysvarRent111111111111111111111111111111111"
 incinerator = "1nc1nerator11111111111111111111111111111111"
 collateral_pool_base = "4sW3SZDJB7qXUyCYKA7pFL8eCTfm3REr8oSiKkww7MaT"
 COMPUTE_BUDGET_ID: PublicKey = PublicKey("ComputeBudget111111111111111111111111111111")
+SYSTEM_PROGRAM_ID: PublicKey = PublicKey(system)
+SYSINSTRUCT_ID: PublicKey = PublicKey(sysinstruct)
+INCINERATOR_ID: PublicKey = PublicKey(incinerator)
 
-solana_url = os.environ.get("SOLANA_URL", "http://localhost:8899")
-EVM_LOADER = os.environ.get("EVM_LOADER")
-ETH_TOKEN_MINT_ID: PublicKey = PublicKey(os.environ.get("ETH_TOKEN_MINT"))
-
-EVM_LOADER_SO = os.environ.get("EVM_LOADER_SO", 'target/bpfel-unknown-unknown/release/evm_loader.so')
-client = Client(solana_url)
 path_to_solana = 'solana'
+SOLANA_CLI_CONFIG = os.path.expanduser("~/.config/solana/cli/config.yml")
+SOLANA_DEFAULT_KEYPAIR = os.path.expanduser("~/.config/solana/id.json")
 
 ACCOUNT_SEED_VERSION=b'\1'
 
@@ -69,85 +88,272 @@ PAYMENT_TO_TREASURE = 5000
 LAMPORTS_PER_SIGNATURE = 5000
 # account storage overhead for calculation of base rent
 ACCOUNT_STORAGE_OVERHEAD = 128
+# expected slot duration in seconds, used to estimate the end of an epoch
+SLOT_DURATION = 0.4
 
 DEFAULT_UNITS=500*1000
 DEFAULT_HEAP_FRAME=256*1024
 DEFAULT_ADDITIONAL_FEE=0
+# bounds of the compute budget requested for transactions sized by simulation
+MAX_UNITS=1400*1000
+MIN_HEAP_FRAME=32*1024
+HEAP_FRAME_GRANULARITY=1024
+# share added on top of the measured compute units and heap usage
+COMPUTE_BUDGET_MARGIN=0.1
+
+# decimals of the mints created by SplToken.create_token, the same as spl-token create-token
+SPL_TOKEN_DEFAULT_DECIMALS = 9
+# number of token instructions SplToken batches into one transaction
+SPL_TOKEN_INSTRUCTIONS_PER_TRANSACTION = 10
+
+# size of the ed25519 secret stored for every keypair by KeypairFactory.save
+KEYPAIR_SECRET_SIZE = 32
+
+# getMultipleAccounts accepts at most 100 keys per request
+MAX_ACCOUNTS_PER_REQUEST = 100
+# number of accounts kept by the account data cache
+ACCOUNT_CACHE_SIZE = 1024
+# number of getConfirmedTransaction requests issued concurrently by getConfirmedTransactions
+MAX_RECEIPT_WORKERS = 16
+# number of derived ether account addresses kept in memory
+PROGRAM_ADDRESS_CACHE_SIZE = 65536
+# ether2programs derives addresses in worker processes when at least this number isn't cached
+PARALLEL_DERIVATION_THRESHOLD = 256
+# number of instruction templates kept by each create_neon_evm_instr_* builder
+INSTRUCTION_TEMPLATE_CACHE_SIZE = 1024
+
+
+class SolanaConfig:
+    """Settings of the tests, each one is resolved on first use.
+
+    Importing the module (star imports included) doesn't read the environment, create a client or
+    run the solana CLI; the module attributes solana_url, EVM_LOADER, ETH_TOKEN_MINT_ID,
+    EVM_LOADER_SO, client, rent_calculator and compute_budget_sizer are taken from here when they
+    are accessed.
+    """
+
+    def __init__(self, environ=os.environ, cli_config_path=SOLANA_CLI_CONFIG):
+        self.environ = environ
+        self.cli_config_path = cli_config_path
+
+    @cached_property
+    def solana_url(self) -> str:
+        return self.environ.get("SOLANA_URL", "http://localhost:8899")
+
+    @cached_property
+    def evm_loader(self) -> Optional[str]:
+        return self.environ.get("EVM_LOADER")
+
+    @cached_property
+    def eth_token_mint(self) -> PublicKey:
+        return PublicKey(self.environ.get("ETH_TOKEN_MINT"))
+
+    @cached_property
+    def evm_loader_so(self) -> str:
+        return self.environ.get("EVM_LOADER_SO", 'target/bpfel-unknown-unknown/release/evm_loader.so')
+
+    @cached_property
+    def client(self) -> Client:
+        return Client(self.solana_url)
+
+    @cached_property
+    def rent_calculator(self) -> "RentCalculator":
+        return RentCalculator(self.client)
+
+    @cached_property
+    def compute_budget_sizer(self) -> "ComputeBudgetSizer":
+        return ComputeBudgetSizer(self.client)
+
+    @cached_property
+    def cli_config(self) -> dict:
+        """Values of the solana CLI config file, the same file `solana config get` shows."""
+        try:
+            with open(self.cli_config_path) as f:
+                values = yaml.safe_load(f)
+        except FileNotFoundError:
+            return {}
+        return values if isinstance(values, dict) else {}
+
+    @cached_property
+    def keypair_path(self) -> str:
+        return self.cli_config.get("keypair_path", SOLANA_DEFAULT_KEYPAIR)
+
+
+solana_config = SolanaConfig()
+
+_CONFIG_ATTRIBUTES = {
+    "solana_url": "solana_url",
+    "EVM_LOADER": "evm_loader",
+    "ETH_TOKEN_MINT_ID": "eth_token_mint",
+    "EVM_LOADER_SO": "evm_loader_so",
+    "client": "client",
+    "rent_calculator": "rent_calculator",
+    "compute_budget_sizer": "compute_budget_sizer",
+}
+
+
+def __getattr__(name):
+    if name in _CONFIG_ATTRIBUTES:
+        return getattr(solana_config, _CONFIG_ATTRIBUTES[name])
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
 
 
 class SplToken:
+    """spl-token operations built from token program instructions and sent in-process.
+
+    `owner` is the keypair (an Account or the path of its file, as spl-token --owner) of the token
+    account owner or of the mint authority, `fee_payer` the keypair paying the fees (and the rent of
+    created accounts); both are the wallet keypair by default, as with spl-token.
+    Amounts are in tokens and are converted with the decimals of the mint.
+    """
+
     def __init__(self, url):
         self.url = url
+        self.client = Client(url)
+        self._decimals = {}
 
-    def call(self, arguments):
-        cmd = 'spl-token --url {} {}'.format(self.url, arguments)
-        print('cmd:', cmd)
+    @staticmethod
+    def _keypair(owner) -> Account:
+        if owner is None:
+            owner = wallet_path()
+        if isinstance(owner, Account):
+            return owner
+        with open(owner) as f:
+            return Account(json.load(f)[0:32])
+
+    def decimals(self, mint) -> int:
+        mint = str(mint)
+        if mint not in self._decimals:
+            data = getAccountData(self.client, mint, SPL_MINT_LAYOUT.sizeof())
+            self._decimals[mint] = SPL_MINT_LAYOUT.parse(data).decimals
+        return self._decimals[mint]
+
+    def _raw_amount(self, mint, amount) -> int:
+        from decimal import Decimal
+        return int(Decimal(str(amount)).scaleb(self.decimals(mint)))
+
+    def _send(self, instructions: Sequence[TransactionInstruction], fee_payer, *signers: Account) -> List["Receipt"]:
+        """Sends the instructions in as few transactions as possible, waits for all of them.
+
+        Raises if any of the transactions fails.
+        """
+        fee_payer = self._keypair(fee_payer)
+        signers = [fee_payer] + [signer for signer in signers if signer.public_key() != fee_payer.public_key()]
+        receipts = []
+        opts = TxOpts(skip_confirmation=True, preflight_commitment="confirmed")
+        for i in range(0, len(instructions), SPL_TOKEN_INSTRUCTIONS_PER_TRANSACTION):
+            trx = Transaction(fee_payer=fee_payer.public_key())
+            for instruction in instructions[i:i + SPL_TOKEN_INSTRUCTIONS_PER_TRANSACTION]:
+                trx.add(instruction)
+            signature = send_signed_transaction(self.client, trx, *signers, opts=opts)["result"]
+            receipts.append((trx, Receipt(self.client, signature)))
         try:
-            return subprocess.check_output(cmd, shell=True, universal_newlines=True)
-        except subprocess.CalledProcessError as err:
-            import sys
-            print("ERR: spl-token error {}".format(err))
-            raise
-
-    def transfer(self, mint, amount, recipient):
-        self.call("transfer {} {} {}".format(mint, amount, recipient))
+            statuses = confirm_transactions(self.client, [receipt.signature for (_, receipt) in receipts])
+        finally:
+            for (trx, _) in receipts:
+                account_cache.invalidate_transaction(trx)
+        for ((_, receipt), status) in zip(receipts, statuses):
+            if status.get('err'):
+                raise Exception("spl-token transaction {} failed: {}".format(receipt.signature, status['err']))
+        return [receipt for (_, receipt) in receipts]
+
+    def _token_accounts(self, mint: PublicKey, recipients: Sequence[Union[str, PublicKey]]) -> List[PublicKey]:
+        """Token accounts are used as they are, other addresses are replaced by their associated token accounts."""
+        accounts = getMultipleAccounts(self.client, recipients)
+        return [PublicKey(recipient) if info is not None and info.owner == str(TOKEN_PROGRAM_ID)
+                else get_associated_token_address(PublicKey(recipient), mint)
+                for (recipient, info) in zip(recipients, accounts)]
+
+    def transfer(self, mint, amount, recipient, owner=None, fee_payer=None) -> "Receipt":
+        """Transfers from the associated token account of the owner to `recipient`.
+
+        As with spl-token, the recipient is either a token account or a wallet address whose
+        associated token account receives the tokens.
+        """
+        return self.transfer_many(mint, [(recipient, amount)], owner, fee_payer)[0]
+
+    def transfer_many(self, mint, transfers: Sequence[Tuple[Union[str, PublicKey], object]], owner=None,
+                      fee_payer=None) -> List["Receipt"]:
+        """Transfers (recipient, amount) pairs, many of them in a transaction."""
+        owner = self._keypair(owner)
+        mint = PublicKey(mint)
+        source = get_associated_token_address(owner.public_key(), mint)
+        destinations = self._token_accounts(mint, [recipient for (recipient, _) in transfers])
+        instructions = [transfer2(Transfer2Params(program_id=TOKEN_PROGRAM_ID, source=source, mint=mint,
+                                                  dest=dest, owner=owner.public_key(),
+                                                  amount=self._raw_amount(mint, amount), decimals=self.decimals(mint)))
+                        for (dest, (_, amount)) in zip(destinations, transfers)]
+        return self._send(instructions, fee_payer, owner)
 
     def balance(self, acc):
         from decimal import Decimal
-        res = self.call("balance --address {}".format(acc))
-        return Decimal(res.rstrip())
-
-    def mint(self, mint_id, recipient, amount, owner=None):
-        if owner is None:
-            self.call("mint {} {} {}".format(mint_id, amount, recipient))
-        else:
-            self.call("mint {} {} {} --owner {}".format(mint_id, amount, recipient, owner))
+        res = self.client.get_token_account_balance(acc, commitment=Confirmed)
+        if 'error' in res:
+            raise Exception("Can't get token balance of {}: {}".format(acc, res['error']))
+        return Decimal(res['result']['value']['uiAmountString'])
+
+    def mint(self, mint_id, recipient, amount, owner=None, fee_payer=None) -> "Receipt":
+        """Mints to the `recipient` token account, as spl-token mint."""
+        receipt = self.mint_many(mint_id, [(recipient, amount)], owner, fee_payer)[0]
         print("minting {} tokens for {}".format(amount, recipient))
-
-    def create_token(self, owner=None):
-        if owner is None:
-            res = self.call("create-token")
-        else:
-            res = self.call("create-token --owner {}".format(owner))
-        if not res.startswith("Creating token "):
-            raise Exception("create token error")
-        else:
-            return res.split()[2]
-
-    def create_token_account(self, token, owner=None):
-        if owner is None:
-            res = self.call("create-account {}".format(token))
-        else:
-            res = self.call("create-account {} --owner {}".format(token, owner))
-        if not res.startswith("Creating account "):
-            raise Exception("create account error %s" % res)
-        else:
-            return res.split()[2]
+        return receipt
+
+    def mint_many(self, mint_id, mints: Sequence[Tuple[Union[str, PublicKey], object]], owner=None,
+                  fee_payer=None) -> List["Receipt"]:
+        """Mints to (recipient token account, amount) pairs, many of them in a transaction."""
+        owner = self._keypair(owner)
+        mint = PublicKey(mint_id)
+        instructions = [mint_to2(MintTo2Params(program_id=TOKEN_PROGRAM_ID, mint=mint, dest=PublicKey(recipient),
+                                               mint_authority=owner.public_key(),
+                                               amount=self._raw_amount(mint, amount), decimals=self.decimals(mint)))
+                        for (recipient, amount) in mints]
+        return self._send(instructions, fee_payer, owner)
+
+    def create_token(self, owner=None, decimals=SPL_TOKEN_DEFAULT_DECIMALS, fee_payer=None) -> str:
+        """Creates a mint with the owner as the mint authority, returns its address."""
+        owner = self._keypair(owner)
+        fee_payer = self._keypair(fee_payer)
+        mint = Account()
+        lamports = solana_config.rent_calculator.minimum_balance(MINT_LEN)
+        self._send([
+            create_account(CreateAccountParams(from_pubkey=fee_payer.public_key(), new_account_pubkey=mint.public_key(),
+                                               lamports=lamports, space=MINT_LEN, program_id=TOKEN_PROGRAM_ID)),
+            initialize_mint(InitializeMintParams(decimals=decimals, program_id=TOKEN_PROGRAM_ID,
+                                                 mint=mint.public_key(), mint_authority=owner.public_key())),
+        ], fee_payer, mint)
+        self._decimals[str(mint.public_key())] = decimals
+        return str(mint.public_key())
+
+    def create_token_account(self, token, owner=None, fee_payer=None) -> PublicKey:
+        """Creates the associated token account of the owner, returns its address."""
+        return self.create_token_accounts(token, [self._keypair(owner).public_key()], fee_payer)[0]
+
+    def create_token_accounts(self, token, wallets: Sequence[Union[str, PublicKey]], fee_payer=None) -> List[PublicKey]:
+        """Creates the associated token accounts of the wallets, the fee payer pays for them."""
+        payer = self._keypair(fee_payer)
+        mint = PublicKey(token)
+        instructions = [create_associated_token_account(payer.public_key(), PublicKey(wallet), mint)
+                        for wallet in wallets]
+        self._send(instructions, payer)
+        return [get_associated_token_address(PublicKey(wallet), mint) for wallet in wallets]
 
 
 def create_collateral_pool_address(collateral_pool_index):
     COLLATERAL_SEED_PREFIX = "collateral_seed_"
     seed = COLLATERAL_SEED_PREFIX + str(collateral_pool_index)
-    return accountWithSeed(PublicKey(collateral_pool_base), seed, PublicKey(EVM_LOADER))
+    return accountWithSeed(PublicKey(collateral_pool_base), seed, PublicKey(solana_config.evm_loader))
 
 
 def confirm_transaction(http_client, tx_sig, confirmations=0):
     """Confirm a transaction."""
-    TIMEOUT = 30  # 30 seconds pylint: disable=invalid-name
-    elapsed_time = 0
-    while elapsed_time < TIMEOUT:
-        print('confirm_transaction for %s', tx_sig)
-        resp = http_client.get_signature_statuses([tx_sig])
-        print('confirm_transaction: %s', resp)
-        if resp["result"]:
-            status = resp['result']['value'][0]
-            if status and (status['confirmationStatus'] == 'finalized' or status['confirmationStatus'] == 'confirmed'
-                           and status['confirmations'] >= confirmations):
-                return
-        sleep_time = 0.1
-        time.sleep(sleep_time)
-        elapsed_time += sleep_time
-    raise RuntimeError("could not confirm transaction: ", tx_sig)
+    from confirmation_tracker import get_confirmation_tracker
+    return get_confirmation_tracker(http_client._provider.endpoint_uri).confirm(tx_sig, confirmations)
+
+
+def confirm_transactions(http_client, tx_sigs, confirmations=0):
+    """Confirm many transactions at once, their statuses are polled in batches."""
+    from confirmation_tracker import get_confirmation_tracker
+    return get_confirmation_tracker(http_client._provider.endpoint_uri).confirm_many(tx_sigs, confirmations)
 
 
 def accountWithSeed(base, seed, program):
@@ -181,6 +387,63 @@ def createAccountWithSeed(funding, base, seed, lamports, space, program):
     )
 
 
+def _ether_bytes(ether: Union[str, bytes]) -> bytes:
+    if isinstance(ether, str):
+        if ether.startswith('0x'): ether = ether[2:]
+        return bytes.fromhex(ether)
+    return bytes(ether)
+
+
+def _derive_program_address(key: Tuple[bytes, str]) -> Tuple[str, int]:
+    (ether, program_id) = key
+    (address, nonce) = PublicKey.find_program_address([ACCOUNT_SEED_VERSION, ether], PublicKey(program_id))
+    return str(address), nonce
+
+
+_program_addresses = OrderedDict()
+_program_addresses_lock = threading.Lock()
+
+
+def _cache_program_addresses(items: Iterable[Tuple[Tuple[bytes, str], Tuple[str, int]]]):
+    with _program_addresses_lock:
+        for (key, value) in items:
+            _program_addresses[key] = value
+            _program_addresses.move_to_end(key)
+        while len(_program_addresses) > PROGRAM_ADDRESS_CACHE_SIZE:
+            _program_addresses.popitem(last=False)
+
+
+def ether2program(ether: Union[str, bytes], program_id=None) -> Tuple[str, int]:
+    """Solana address and nonce of an ether account, the same as make_solana_program_address of neon-cli."""
+    if program_id is None:
+        program_id = solana_config.evm_loader
+    key = (_ether_bytes(ether), str(program_id))
+    with _program_addresses_lock:
+        value = _program_addresses.get(key)
+        if value is not None:
+            _program_addresses.move_to_end(key)
+            return value
+    value = _derive_program_address(key)
+    _cache_program_addresses([(key, value)])
+    return value
+
+
+def ether2programs(ethers: Iterable[Union[str, bytes]], program_id=None) -> List[Tuple[str, int]]:
+    if program_id is None:
+        program_id = solana_config.evm_loader
+    keys = [(_ether_bytes(ether), str(program_id)) for ether in ethers]
+    with _program_addresses_lock:
+        found = {key: _program_addresses[key] for key in keys if key in _program_addresses}
+    missing = list(OrderedDict.fromkeys(key for key in keys if key not in found))
+    if len(missing) >= PARALLEL_DERIVATION_THRESHOLD:
+        derived = list(process_pool().map(_derive_program_address, missing, chunksize=64))
+    else:
+        derived = [_derive_program_address(key) for key in missing]
+    found.update(zip(missing, derived))
+    _cache_program_addresses((key, found[key]) for key in keys)
+    return [found[key] for key in keys]
+
+
 class solana_cli:
     def __init__(self, acc=None):
         self.acc = acc
@@ -188,9 +451,10 @@ class solana_cli:
     def call(self, arguments):
         cmd = ""
         if self.acc == None:
-            cmd = '{} --url {} {}'.format(path_to_solana, solana_url, arguments)
+            cmd = '{} --url {} {}'.format(path_to_solana, solana_config.solana_url, arguments)
         else:
-            cmd = '{} --keypair {} --url {} {}'.format(path_to_solana, self.acc.get_path(), solana_url, arguments)
+            cmd = '{} --keypair {} --url {} {}'.format(path_to_solana, self.acc.get_path(), solana_config.solana_url,
+                                                       arguments)
         try:
             return subprocess.check_output(cmd, shell=True, universal_newlines=True)
         except subprocess.CalledProcessError as err:
@@ -203,23 +467,31 @@ class neon_cli:
     def __init__(self, verbose_flags=''):
         self.verbose_flags = verbose_flags
 
+    def run(self, arguments):
+        """Runs neon-cli on a shared server-mode worker, or as a separate process if workers are disabled."""
+        from neon_cli_worker import get_neon_cli_pool
+        pool = get_neon_cli_pool()
+        if pool is None:
+            return subprocess.check_output('neon-cli ' + arguments, shell=True, universal_newlines=True)
+        return pool.check_output(shlex.split(arguments))
+
     def call(self, arguments):
-        cmd = 'neon-cli {} --commitment=processed --url {} {} -vvv'.format(self.verbose_flags, solana_url, arguments)
+        cmd = '{} --commitment=processed --url {} {} -vvv'.format(self.verbose_flags, solana_config.solana_url, arguments)
         try:
-            return subprocess.check_output(cmd, shell=True, universal_newlines=True)
+            return self.run(cmd)
         except subprocess.CalledProcessError as err:
             import sys
             print("ERR: neon-cli error {}".format(err))
             raise
 
     def emulate(self, loader_id, arguments):
-        cmd = 'neon-cli {} --commitment=processed --evm_loader {} --url {} emulate {}'.format(self.verbose_flags,
-                                                                                           loader_id,
-                                                                                           solana_url,
-                                                                                           arguments)
+        cmd = '{} --commitment=processed --evm_loader {} --url {} emulate {}'.format(self.verbose_flags,
+                                                                                  loader_id,
+                                                                                  solana_config.solana_url,
+                                                                                  arguments)
         print('cmd:', cmd)
         try:
-            output = subprocess.check_output(cmd, shell=True, universal_newlines=True)
+            output = self.run(cmd)
             without_empty_lines = os.linesep.join([s for s in output.splitlines() if s])
             last_line = without_empty_lines.splitlines()[-1]
             return last_line
@@ -228,30 +500,128 @@ class neon_cli:
             print("ERR: neon-cli error {}".format(err))
             raise
 
+    @staticmethod
+    def _emulation_request(sender, contract, data=None, value=None):
+        """`SENDER CONTRACT [DATA] [VALUE]` line of `emulate --batch`, missing data is written as none.
+
+        Addresses and data may be given as bytes, neon-cli reads all of them and the value as hex.
+        """
+        def hex_item(item):
+            return '0x' + bytes(item).hex() if isinstance(item, (bytes, bytearray)) else str(item)
+
+        items = [hex_item(sender), hex_item(contract), hex_item(data) if data else "none"]
+        if value is not None:
+            items.append(hex(value))
+        return " ".join(items)
+
+    def emulate_many(self, loader_id, requests):
+        """Emulates (sender, contract, data, value) tuples in a single neon-cli process.
+
+        Yields the parsed result of every request in order as soon as it is ready; requests which
+        neon-cli can't emulate are answered with {"error": ..., "error_code": ...}.
+        """
+        cmd = 'neon-cli {} --commitment=processed --evm_loader {} --url {} emulate --batch -'.format(self.verbose_flags,
+                                                                                                   loader_id,
+                                                                                                   solana_config.solana_url)
+        process = subprocess.Popen(shlex.split(cmd), stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                   universal_newlines=True)
+
+        def write_requests():
+            try:
+                for request in requests:
+                    process.stdin.write(self._emulation_request(*request) + "\n")
+                process.stdin.close()
+            except BrokenPipeError:
+                pass
+
+        writer = threading.Thread(target=write_requests, daemon=True)
+        writer.start()
+        finished = False
+        try:
+            for line in process.stdout:
+                if line.strip():
+                    yield json.loads(line)
+            finished = True
+        finally:
+            if not finished:
+                process.kill()
+            process.stdout.close()
+            process.wait()
+            writer.join()
+        if process.returncode != 0:
+            raise subprocess.CalledProcessError(process.returncode, cmd)
+
+
+class KeypairFactory:
+    """Generates ed25519 keypairs in memory, deterministically from `seed` if it is given.
+
+    With `keep` the generated keypairs are remembered, and `save` stores them in one keystore
+    file of 32-byte secrets; `load` reads them back. Otherwise only the caller holds them.
+    """
+
+    def __init__(self, seed: Optional[bytes] = None, keep: bool = False):
+        self.seed = seed
+        self.keep = keep
+        self.count = 0
+        self.accounts: List[Account] = []
+        self._lock = threading.Lock()
+
+    def _secret(self, index: int) -> bytes:
+        if self.seed is None:
+            return os.urandom(KEYPAIR_SECRET_SIZE)
+        return sha256(self.seed + index.to_bytes(8, byteorder="little")).digest()
+
+    def new(self) -> Account:
+        return self.new_many(1)[0]
+
+    def new_many(self, count: int) -> List[Account]:
+        with self._lock:
+            start = self.count
+            self.count += count
+        accounts = [Account(self._secret(index)) for index in range(start, start + count)]
+        if self.keep:
+            with self._lock:
+                self.accounts.extend(accounts)
+        return accounts
+
+    def save(self, path: str):
+        if not self.keep:
+            raise Exception("KeypairFactory doesn't keep the keypairs it generates, create it with keep=True")
+        with self._lock:
+            data = b"".join(account.secret_key() for account in self.accounts)
+        with open(path + ".tmp", "wb") as f:
+            f.write(data)
+        os.replace(path + ".tmp", path)
+
+    @staticmethod
+    def load(path: str) -> List[Account]:
+        with open(path, "rb") as f:
+            data = f.read()
+        return [Account(data[i:i + KEYPAIR_SECRET_SIZE]) for i in range(0, len(data), KEYPAIR_SECRET_SIZE)]
+
+
+_seed = os.environ.get("KEYPAIR_SEED")
+keypair_factory = KeypairFactory(_seed.encode() if _seed else None)
+
 
 class RandomAccount:
-    def __init__(self, path=None):
+    def __init__(self, path=None, factory=None):
         if path == None:
-            self.make_random_path()
-            print("New keypair file: {}".format(self.path))
-            self.generate_key()
+            self.path = None
+            self.acc = (factory or keypair_factory).new()
         else:
             self.path = path
-        self.retrieve_keys()
+            self.retrieve_keys()
         print('New Public key:', self.acc.public_key())
         print('Private:', self.acc.secret_key())
 
     def make_random_path(self):
         self.path  = os.urandom(5).hex()+ ".json"
 
-    def generate_key(self):
-        cmd_generate = 'solana-keygen new --no-passphrase --outfile {}'.format(self.path)
-        try:
-            return subprocess.check_output(cmd_generate, shell=True, universal_newlines=True)
-        except subprocess.CalledProcessError as err:
-            import sys
-            print("ERR: solana error {}".format(err))
-            raise
+    def save_key(self):
+        """Writes the keypair file in the solana-keygen format."""
+        with open(self.path, "w") as f:
+            json.dump(list(self.acc.secret_key() + bytes(self.acc.public_key())), f)
 
     def retrieve_keys(self):
         with open(self.path) as f:
@@ -259,6 +629,11 @@ class RandomAccount:
             self.acc = Account(d[0:32])
 
     def get_path(self):
+        """Path of the keypair file for the command line tools, the file is written on first use."""
+        if self.path is None:
+            self.make_random_path()
+            print("New keypair file: {}".format(self.path))
+            self.save_key()
         return self.path
 
     def get_acc(self):
@@ -292,11 +667,17 @@ class OperatorAccount:
         return self.acc
 
 
+# default of EvmLoader's programId: the EVM_LOADER environment variable, None deploys a new loader
+_CONFIGURED = object()
+
+
 class EvmLoader:
-    def __init__(self, acc: OperatorAccount, programId=EVM_LOADER):
+    def __init__(self, acc: OperatorAccount, programId=_CONFIGURED):
+        if programId is _CONFIGURED:
+            programId = solana_config.evm_loader
         if programId == None:
             print("Load EVM loader...")
-            result = json.loads(solana_cli(acc).call('deploy {}'.format(EVM_LOADER_SO)))
+            result = json.loads(solana_cli(acc).call('deploy {}'.format(solana_config.evm_loader_so)))
             programId = result['programId']
         EvmLoader.loader_id = programId
         print("Done\n")
@@ -309,16 +690,17 @@ class EvmLoader:
         operator = self.acc.get_acc()
 
         (neon_evm_authority, _) = PublicKey.find_program_address([b"Deposit"], PublicKey(self.loader_id))
-        pool_token_account = get_associated_token_address(neon_evm_authority, ETH_TOKEN_MINT_ID)
-        source_token_account = get_associated_token_address(operator.public_key(), ETH_TOKEN_MINT_ID)
+        pool_token_account = get_associated_token_address(neon_evm_authority, solana_config.eth_token_mint)
+        source_token_account = get_associated_token_address(operator.public_key(), solana_config.eth_token_mint)
         (user_solana_address, _) = self.ether2program(user_ether_address)
 
-        pool_account_exists = client.get_account_info(pool_token_account, commitment="processed")["result"]["value"] is not None
+        pool_account_exists = solana_config.client.get_account_info(pool_token_account, commitment="processed")["result"]["value"] is not None
         print("Pool Account Exists: ", pool_account_exists)
 
         trx = TransactionWithComputeBudget()
         if not pool_account_exists:
-            trx.add(create_associated_token_account(operator.public_key(), neon_evm_authority, ETH_TOKEN_MINT_ID))
+            trx.add(create_associated_token_account(operator.public_key(), neon_evm_authority,
+                                                    solana_config.eth_token_mint))
 
         trx.add(approve(ApproveParams(
             program_id=TOKEN_PROGRAM_ID,
@@ -338,7 +720,7 @@ class EvmLoader:
                 AccountMeta(pubkey=TOKEN_PROGRAM_ID, is_signer=False, is_writable=False),
             ]
         ))
-        result = send_transaction(client, trx, operator)
+        result = send_transaction(solana_config.client, trx, operator)
         print("Airdrop transaction: ", result)
 
 
@@ -350,12 +732,14 @@ class EvmLoader:
             output = neon_cli().call("deploy --evm_loader {} --config {} {}".format(self.loader_id, config,
                                                                                        contract_path))
         print(type(output), output)
+        # neon-cli changes the caller, contract and code accounts behind the cache's back
+        account_cache.clear()
         result = json.loads(output.splitlines()[-1])
         return result
 
     def createEtherAccount(self, ether):
         (trx, sol) = self.createEtherAccountTrx(ether)
-        result = send_transaction(client, trx, self.acc.get_acc())
+        result = send_transaction(solana_config.client, trx, self.acc.get_acc())
         print('result:', result)
         return sol
 
@@ -370,29 +754,31 @@ class EvmLoader:
         return (acc, 255)
 
     def ether2program(self, ether):
-        if isinstance(ether, str):
-            if ether.startswith('0x'): ether = ether[2:]
-        else:
-            ether = ether.hex()
-        output = neon_cli().call("create-program-address --evm_loader {} {}".format(self.loader_id, ether))
-        items = output.rstrip().split(' ')
-        return items[0], int(items[1])
+        return ether2program(ether, self.loader_id)
+
+    def ether2programs(self, ethers):
+        return ether2programs(ethers, self.loader_id)
 
     def checkAccount(self, solana):
-        info = client.get_account_info(solana)
+        info = solana_config.client.get_account_info(solana)
         print("checkAccount({}): {}".format(solana, info))
 
+    def checkAccounts(self, solanas):
+        for (solana, info) in zip(solanas, getMultipleAccounts(solana_config.client, solanas)):
+            print("checkAccount({}): {}".format(solana, info))
+
     def deployChecked(self, location, caller, caller_ether):
-        trx_count = getTransactionCount(client, caller)
+        # the nonce changes with transactions sent behind the cache's back (neon-cli, raw client calls)
+        trx_count = getTransactionCount(solana_config.client, caller)
         ether = keccak_256(rlp.encode((caller_ether, trx_count))).digest()[-20:]
 
         program = self.ether2program(ether)
         code = self.ether2seed(ether)
-        info = client.get_account_info(program[0])
-        if info['result']['value'] is None:
+        info = account_cache.get(solana_config.client, program[0])
+        if info is None:
             res = self.deploy(location)
             return res['programId'], bytes.fromhex(res['ethereum'][2:]), res['codeId']
-        elif info['result']['value']['owner'] != self.loader_id:
+        elif info.owner != self.loader_id:
             raise Exception("Invalid owner for account {}".format(program))
         else:
             return program[0], ether, code[0]
@@ -431,8 +817,48 @@ class EvmLoader:
         return (trx, sol)
 
 
+RENT_LAYOUT = cStruct(
+    "lamports_per_byte_year" / Int64ul,
+    "exemption_threshold" / Float64l,
+    "burn_percent" / Int8ul,
+)
+
+
+class RentCalculator:
+    """Computes rent-exempt minimum balances locally from the rent sysvar.
+
+    The sysvar is re-read once the epoch it was read in is estimated to be over,
+    so bursts of account creations don't need any RPC call.
+    """
+
+    def __init__(self, client: Client):
+        self.client = client
+        self.rent = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        epoch_info = self.client.get_epoch_info(commitment=Confirmed)['result']
+        info = self.client.get_account_info(rentid, commitment=Confirmed)['result']['value']
+        self.rent = RENT_LAYOUT.parse(base64.b64decode(info['data'][0]))
+        slots_left = epoch_info['slotsInEpoch'] - epoch_info['slotIndex']
+        self._expires_at = time.monotonic() + slots_left * SLOT_DURATION
+
+    def minimum_balance(self, size: int) -> int:
+        with self._lock:
+            if self.rent is None or time.monotonic() >= self._expires_at:
+                self._refresh()
+            rent = self.rent
+        return int((ACCOUNT_STORAGE_OVERHEAD + size) * rent.lamports_per_byte_year * rent.exemption_threshold)
+
+
+
 def getBalance(account):
-    return client.get_balance(account, commitment=Confirmed)['result']['value']
+    return solana_config.client.get_balance(account, commitment=Confirmed)['result']['value']
+
+
+def getBalances(accounts) -> List[int]:
+    return [info.lamports if info else 0 for info in getMultipleAccounts(solana_config.client, accounts)]
 
 
 ACCOUNT_INFO_LAYOUT = cStruct(
@@ -459,20 +885,165 @@ class AccountInfo(NamedTuple):
         return AccountInfo(cont.ether, cont.trx_count, PublicKey(cont.code_account))
 
 
-def getAccountData(client: Client, account: Union[str, PublicKey], expected_length: int) -> bytes:
-    info = client.get_account_info(account, commitment=Confirmed)['result']['value']
-    if info is None:
+def getAccountData(client: Client, account: Union[str, PublicKey], expected_length: int, cache=None) -> bytes:
+    if cache is not None:
+        info = cache.get(client, account)
+        data = info.data if info else None
+    else:
+        info = client.get_account_info(account, commitment=Confirmed)['result']['value']
+        data = base64.b64decode(info['data'][0]) if info else None
+    if data is None:
         raise Exception("Can't get information about {}".format(account))
 
-    data = base64.b64decode(info['data'][0])
     if len(data) < expected_length:
         print("len(data)({}) < expected_length({})".format(len(data), expected_length))
         raise Exception("Wrong data length for account data {}".format(account))
     return data
 
 
-def getTransactionCount(client: Client, sol_account: Union[str, PublicKey]) -> int:
-    info = getAccountData(client, sol_account, ACCOUNT_INFO_LAYOUT.sizeof())
+class AccountData(NamedTuple):
+    pubkey: str
+    lamports: int
+    owner: str
+    executable: bool
+    data: bytes
+    slot: int
+
+
+def getMultipleAccounts(client: Client, accounts: Sequence[Union[str, PublicKey]],
+                        commitment=Confirmed) -> List[Optional[AccountData]]:
+    """Reads accounts with getMultipleAccounts, None stands for accounts that don't exist."""
+    keys = [str(account) for account in accounts]
+    result = []
+    for i in range(0, len(keys), MAX_ACCOUNTS_PER_REQUEST):
+        chunk = keys[i:i + MAX_ACCOUNTS_PER_REQUEST]
+        resp = client._provider.make_request(types.RPCMethod("getMultipleAccounts"), chunk,
+                                             {"encoding": "base64", "commitment": commitment})
+        result.extend(decodeMultipleAccounts(chunk, resp))
+    return result
+
+
+def decodeMultipleAccounts(keys: Sequence[str], resp) -> List[Optional[AccountData]]:
+    if 'error' in resp:
+        raise Exception("Can't get information about {}: {}".format(keys, resp['error']))
+    slot = resp['result']['context']['slot']
+    return [
+        AccountData(key, info['lamports'], info['owner'], info['executable'], base64.b64decode(info['data'][0]), slot)
+        if info else None
+        for (key, info) in zip(keys, resp['result']['value'])
+    ]
+
+
+class AccountCache:
+    """Read-through LRU cache of account data keyed by (pubkey, commitment).
+
+    Entries remember the slot they were read at. Transactions sent through the helpers of this
+    module drop their writable accounts from `account_cache`; writes made behind the helpers' back
+    (neon-cli, raw client calls) are not seen, so callers opt in by passing the cache explicitly.
+    """
+
+    def __init__(self, maxsize: int = ACCOUNT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[Tuple[str, str], AccountData]' = OrderedDict()
+        self._lock = threading.Lock()
+        # invalidations made while fetches are in flight: pubkey -> epoch of the invalidation
+        self._epoch = 0
+        self._invalidated: Dict[str, int] = {}
+        self._cleared = 0
+        self._fetching = 0
+
+    def get(self, client: Client, account: Union[str, PublicKey], commitment=Confirmed,
+            min_slot: int = 0) -> Optional[AccountData]:
+        return self.get_many(client, [account], commitment, min_slot)[0]
+
+    def get_many(self, client: Client, accounts: Sequence[Union[str, PublicKey]], commitment=Confirmed,
+                 min_slot: int = 0) -> List[Optional[AccountData]]:
+        keys = [str(account) for account in accounts]
+        result = {}
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get((key, commitment))
+                if entry is not None and entry.slot >= min_slot:
+                    self._entries.move_to_end((key, commitment))
+                    result[key] = entry
+                    self.hits += 1
+            missing = [key for key in dict.fromkeys(keys) if key not in result]
+            self.misses += len(missing)
+            if missing:
+                epoch = self._epoch
+                self._fetching += 1
+
+        if missing:
+            fetched = None
+            try:
+                fetched = getMultipleAccounts(client, missing, commitment)
+            finally:
+                with self._lock:
+                    self._fetching -= 1
+                    # data read before an invalidation of its account is returned but not cached
+                    for (key, info) in zip(missing, fetched or []):
+                        result[key] = info
+                        if info is not None and max(self._cleared, self._invalidated.get(key, 0)) <= epoch:
+                            self._entries[(key, commitment)] = info
+                            self._entries.move_to_end((key, commitment))
+                    if self._fetching == 0:
+                        self._invalidated.clear()
+                    while len(self._entries) > self.maxsize:
+                        self._entries.popitem(last=False)
+        return [result[key] for key in keys]
+
+    def invalidate(self, accounts: Iterable[Union[str, PublicKey]]):
+        keys = set(str(account) for account in accounts)
+        with self._lock:
+            self._epoch += 1
+            if self._fetching:
+                for key in keys:
+                    self._invalidated[key] = self._epoch
+            for entry_key in [entry_key for entry_key in self._entries if entry_key[0] in keys]:
+                del self._entries[entry_key]
+
+    def invalidate_transaction(self, trx: Transaction):
+        self.invalidate(meta.pubkey for instr in trx.instructions for meta in instr.keys if meta.is_writable)
+
+    def clear(self):
+        with self._lock:
+            self._epoch += 1
+            self._cleared = self._epoch
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+account_cache = AccountCache()
+
+
+def getAccountsData(client: Client, accounts: Sequence[Union[str, PublicKey]], expected_length: int) -> List[bytes]:
+    result = []
+    for (account, info) in zip(accounts, getMultipleAccounts(client, accounts)):
+        if info is None:
+            raise Exception("Can't get information about {}".format(account))
+        if len(info.data) < expected_length:
+            print("len(data)({}) < expected_length({})".format(len(info.data), expected_length))
+            raise Exception("Wrong data length for account data {}".format(account))
+        result.append(info.data)
+    return result
+
+
+def getTransactionCounts(client: Client, sol_accounts: Sequence[Union[str, PublicKey]]) -> List[int]:
+    infos = getAccountsData(client, sol_accounts, ACCOUNT_INFO_LAYOUT.sizeof())
+    return [int.from_bytes(AccountInfo.frombytes(info).trx_count, 'little') for info in infos]
+
+
+def getNeonBalances(client: Client, sol_accounts: Sequence[Union[str, PublicKey]]) -> List[int]:
+    infos = getAccountsData(client, sol_accounts, ACCOUNT_INFO_LAYOUT.sizeof())
+    return [int.from_bytes(ACCOUNT_INFO_LAYOUT.parse(info).balance, byteorder="little") for info in infos]
+
+
+def getTransactionCount(client: Client, sol_account: Union[str, PublicKey], cache=None) -> int:
+    info = getAccountData(client, sol_account, ACCOUNT_INFO_LAYOUT.sizeof(), cache)
     acc_info = AccountInfo.frombytes(info)
     res = int.from_bytes(acc_info.trx_count, 'little')
     print('getTransactionCount {}: {}'.format(sol_account, res))
@@ -487,31 +1058,198 @@ def getNeonBalance(client: Client, sol_account: Union[str, PublicKey]) -> int:
 
 
 def wallet_path():
-    res = solana_cli().call("config get")
-    substr = "Keypair Path: "
-    for line in res.splitlines():
-        if line.startswith(substr):
-            return line[len(substr):].strip()
-    raise Exception("cannot get keypair path")
+    return solana_config.keypair_path
 
 def operator1_keypair_path():
-    res = solana_cli().call("config get")
-    substr = "Keypair Path: "
-    for line in res.splitlines():
-        if line.startswith(substr):
-            return line[len(substr):].strip()
-    raise Exception("cannot get keypair path")
+    return solana_config.keypair_path
 
 def operator2_keypair_path():
     return "/root/.config/solana/id2.json"
 
-def send_transaction(client, trx, acc):
-    result = client.send_transaction(trx, acc, opts=TxOpts(skip_confirmation=True, preflight_commitment="confirmed"))
-    confirm_transaction(client, result["result"])
-    result = client.get_confirmed_transaction(result["result"])
+def sign_transaction(client, trx, *signers):
+    """Sign a transaction with the prefetched recent blockhash of the node."""
+    from blockhash_provider import get_blockhash_provider
+    if getattr(trx, 'fit_compute_budget', False):
+        solana_config.compute_budget_sizer.fit(trx, *signers)
+    return get_blockhash_provider(client._provider.endpoint_uri).sign(trx, *signers)
+
+
+def send_signed_transaction(client, trx, *signers, opts=TxOpts()):
+    """Drop-in replacement for client.send_transaction without the getRecentBlockhash round-trip.
+
+    A transaction which is already signed is only re-signed when its blockhash is about to expire.
+    Its writable accounts are dropped from `account_cache`, once more when it is confirmed if
+    `opts.skip_confirmation` is set.
+    """
+    from blockhash_provider import get_blockhash_provider
+    from confirmation_tracker import get_confirmation_tracker
+    if getattr(trx, 'fit_compute_budget', False):
+        solana_config.compute_budget_sizer.fit(trx, *signers)
+    get_blockhash_provider(client._provider.endpoint_uri).ensure_valid(trx, *signers)
+    try:
+        result = client.send_raw_transaction(trx.serialize(), opts=opts)
+    finally:
+        account_cache.invalidate_transaction(trx)
+    if opts.skip_confirmation:
+        # the accounts may be read (and cached) again before the transaction lands
+        get_confirmation_tracker(client._provider.endpoint_uri).track(
+            result["result"], callback=lambda _: account_cache.invalidate_transaction(trx))
     return result
 
 
+def send_transaction(client, trx, acc):
+    try:
+        result = client.send_raw_transaction(sign_transaction(client, trx, acc).serialize(),
+                                             opts=TxOpts(skip_confirmation=True, preflight_commitment="confirmed"))
+        confirm_transaction(client, result["result"])
+    finally:
+        account_cache.invalidate_transaction(trx)
+    return Receipt(client, result["result"])
+
+
+class Receipt(Mapping):
+    """Response of getConfirmedTransaction for a sent transaction, fetched on first access."""
+
+    def __init__(self, client: Client, signature: str):
+        self.client = client
+        self.signature = signature
+        self._response = None
+        self._lock = threading.Lock()
+
+    @property
+    def fetched(self) -> bool:
+        return self._response is not None
+
+    @property
+    def response(self):
+        with self._lock:
+            if self._response is None:
+                self._response = self.client.get_confirmed_transaction(self.signature)
+            return self._response
+
+    @property
+    def result(self):
+        return self.response["result"]
+
+    def __getitem__(self, key):
+        return self.response[key]
+
+    def __iter__(self):
+        return iter(self.response)
+
+    def __len__(self):
+        return len(self.response)
+
+    def __repr__(self):
+        return repr(self._response) if self.fetched else "Receipt({})".format(self.signature)
+
+
+def getConfirmedTransactions(client: Client, signatures: Iterable[str],
+                             max_workers: int = MAX_RECEIPT_WORKERS) -> List[dict]:
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(client.get_confirmed_transaction, signatures))
+
+
+def fetchReceipts(receipts: Sequence[Receipt], max_workers: int = MAX_RECEIPT_WORKERS) -> Sequence[Receipt]:
+    """Fetches the receipts which weren't accessed yet concurrently."""
+    pending = [receipt for receipt in receipts if not receipt.fetched]
+    if pending:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(lambda receipt: receipt.response, pending))
+    return receipts
+
+
+class InstructionTemplate:
+    """Program, accounts and data prefix of an instruction, built once and reused for every call.
+
+    Accounts are kept as (pubkey, is_signer, is_writable), the AccountMeta objects are created per
+    instruction because Transaction.compile_message updates them in place.
+    """
+    __slots__ = ("program_id", "prefix", "metas")
+
+    def __init__(self, program_id, prefix: bytes, keys: Sequence[AccountMeta]):
+        self.program_id = program_id
+        self.prefix = bytes(prefix)
+        self.metas = tuple((meta.pubkey, meta.is_signer, meta.is_writable) for meta in keys)
+
+    def instruction(self, data: bytes = b"") -> TransactionInstruction:
+        return TransactionInstruction(
+            program_id=self.program_id,
+            data=self.prefix + data,
+            keys=[AccountMeta(pubkey, is_signer, is_writable) for (pubkey, is_signer, is_writable) in self.metas])
+
+    def step(self, step_count: int, data: bytes = b"") -> TransactionInstruction:
+        return self.instruction(step_count.to_bytes(8, byteorder='little') + data)
+
+
+def _template_key(values) -> tuple:
+    key = []
+    for value in values:
+        if isinstance(value, (PublicKey, bytearray, memoryview)):
+            value = bytes(value)
+        elif isinstance(value, (list, tuple)):
+            value = tuple((bytes(meta.pubkey), meta.is_signer, meta.is_writable) for meta in value)
+        key.append(value)
+    return tuple(key)
+
+
+def instruction_template(build):
+    """Caches the InstructionTemplate returned by `build` for every binding of its arguments."""
+    templates = OrderedDict()
+    lock = threading.Lock()
+
+    @wraps(build)
+    def cached(*args, **kwargs):
+        key = _template_key(args) + (_template_key(kwargs.values()), tuple(kwargs))
+        with lock:
+            template = templates.get(key)
+            if template is not None:
+                templates.move_to_end(key)
+                return template
+        template = build(*args, **kwargs)
+        with lock:
+            templates[key] = template
+            while len(templates) > INSTRUCTION_TEMPLATE_CACHE_SIZE:
+                templates.popitem(last=False)
+        return template
+
+    return cached
+
+
+@instruction_template
+def neon_evm_instr_05_template(evm_loader_program_id,
+                               caller_sol_acc,
+                               operator_sol_acc,
+                               contract_sol_acc,
+                               code_sol_acc,
+                               collateral_pool_index_buf,
+                               collateral_pool_address):
+    return InstructionTemplate(
+        evm_loader_program_id,
+        bytes.fromhex("05") + collateral_pool_index_buf,
+        [
+            # System instructions account:
+            AccountMeta(pubkey=SYSINSTRUCT_ID, is_signer=False, is_writable=False),
+
+            # Operator's SOL account:
+            AccountMeta(pubkey=operator_sol_acc, is_signer=True, is_writable=True),
+            # Collateral pool address:
+            AccountMeta(pubkey=collateral_pool_address, is_signer=False, is_writable=True),
+            # Operator's NEON account:
+            AccountMeta(pubkey=caller_sol_acc, is_signer=False, is_writable=True),
+            # System program account:
+            AccountMeta(pubkey=SYSTEM_PROGRAM_ID, is_signer=False, is_writable=False),
+            # NeonEVM program account
+            AccountMeta(pubkey=evm_loader_program_id, is_signer=False, is_writable=False),
+
+            AccountMeta(pubkey=contract_sol_acc, is_signer=False, is_writable=True),
+            AccountMeta(pubkey=code_sol_acc, is_signer=False, is_writable=True),
+            AccountMeta(pubkey=caller_sol_acc, is_signer=False, is_writable=True),
+
+            AccountMeta(pubkey=TOKEN_PROGRAM_ID, is_signer=False, is_writable=False),
+        ])
+
+
 def create_neon_evm_instr_05_single(evm_loader_program_id,
                                     caller_sol_acc,
                                     operator_sol_acc,
@@ -520,12 +1258,29 @@ def create_neon_evm_instr_05_single(evm_loader_program_id,
                                     collateral_pool_index_buf,
                                     collateral_pool_address,
                                     evm_instruction):
-    return TransactionInstruction(
-        program_id=evm_loader_program_id,
-        data=bytearray.fromhex("05") + collateral_pool_index_buf + evm_instruction,
-        keys=[
+    return neon_evm_instr_05_template(evm_loader_program_id, caller_sol_acc, operator_sol_acc, contract_sol_acc,
+                                      code_sol_acc, collateral_pool_index_buf,
+                                      collateral_pool_address).instruction(evm_instruction)
+
+
+@instruction_template
+def neon_evm_instr_13_template(evm_loader_program_id,
+                               caller_sol_acc,
+                               operator_sol_acc,
+                               storage_sol_acc,
+                               contract_sol_acc,
+                               code_sol_acc,
+                               collateral_pool_index_buf,
+                               collateral_pool_address,
+                               writable_code=True,
+                               add_meta=()):
+    return InstructionTemplate(
+        evm_loader_program_id,
+        bytes.fromhex("0D") + collateral_pool_index_buf,
+        [
+            AccountMeta(pubkey=storage_sol_acc, is_signer=False, is_writable=True),
             # System instructions account:
-            AccountMeta(pubkey=PublicKey(sysinstruct), is_signer=False, is_writable=False),
+            AccountMeta(pubkey=SYSINSTRUCT_ID, is_signer=False, is_writable=False),
 
             # Operator's SOL account:
             AccountMeta(pubkey=operator_sol_acc, is_signer=True, is_writable=True),
@@ -534,17 +1289,20 @@ def create_neon_evm_instr_05_single(evm_loader_program_id,
             # Operator's NEON account:
             AccountMeta(pubkey=caller_sol_acc, is_signer=False, is_writable=True),
             # System program account:
-            AccountMeta(pubkey=PublicKey(system), is_signer=False, is_writable=False),
+            AccountMeta(pubkey=SYSTEM_PROGRAM_ID, is_signer=False, is_writable=False),
             # NeonEVM program account
             AccountMeta(pubkey=evm_loader_program_id, is_signer=False, is_writable=False),
 
             AccountMeta(pubkey=contract_sol_acc, is_signer=False, is_writable=True),
-            AccountMeta(pubkey=code_sol_acc, is_signer=False, is_writable=True),
+            AccountMeta(pubkey=code_sol_acc, is_signer=False, is_writable=writable_code),
             AccountMeta(pubkey=caller_sol_acc, is_signer=False, is_writable=True),
-            
+
+            AccountMeta(pubkey=SYSINSTRUCT_ID, is_signer=False, is_writable=False),
+        ] + list(add_meta) + [
             AccountMeta(pubkey=TOKEN_PROGRAM_ID, is_signer=False, is_writable=False),
         ])
 
+
 def create_neon_evm_instr_13_partial_call_or_continue(evm_loader_program_id,
                                           caller_sol_acc,
                                           operator_sol_acc,
@@ -557,13 +1315,30 @@ def create_neon_evm_instr_13_partial_call_or_continue(evm_loader_program_id,
                                           evm_instruction,
                                           writable_code=True,
                                           add_meta=[]):
-    return TransactionInstruction(
-        program_id=evm_loader_program_id,
-        data=bytearray.fromhex("0D") + collateral_pool_index_buf + step_count.to_bytes(8, byteorder='little') + evm_instruction,
-        keys=[
+    return neon_evm_instr_13_template(evm_loader_program_id, caller_sol_acc, operator_sol_acc, storage_sol_acc,
+                                      contract_sol_acc, code_sol_acc, collateral_pool_index_buf,
+                                      collateral_pool_address, writable_code,
+                                      add_meta).step(step_count, evm_instruction)
+
+
+@instruction_template
+def neon_evm_instr_19_template(evm_loader_program_id,
+                               caller_sol_acc,
+                               operator_sol_acc,
+                               storage_sol_acc,
+                               contract_sol_acc,
+                               code_sol_acc,
+                               collateral_pool_index_buf,
+                               collateral_pool_address,
+                               writable_code=True,
+                               add_meta=()):
+    return InstructionTemplate(
+        evm_loader_program_id,
+        bytes.fromhex("13") + collateral_pool_index_buf,
+        [
             AccountMeta(pubkey=storage_sol_acc, is_signer=False, is_writable=True),
             # System instructions account:
-            AccountMeta(pubkey=PublicKey(sysinstruct), is_signer=False, is_writable=False),
+            AccountMeta(pubkey=SYSINSTRUCT_ID, is_signer=False, is_writable=False),
 
             # Operator's SOL account:
             AccountMeta(pubkey=operator_sol_acc, is_signer=True, is_writable=True),
@@ -572,16 +1347,14 @@ def create_neon_evm_instr_13_partial_call_or_continue(evm_loader_program_id,
             # Operator's NEON account:
             AccountMeta(pubkey=caller_sol_acc, is_signer=False, is_writable=True),
             # System program account:
-            AccountMeta(pubkey=PublicKey(system), is_signer=False, is_writable=False),
+            AccountMeta(pubkey=SYSTEM_PROGRAM_ID, is_signer=False, is_writable=False),
             # NeonEVM program account
             AccountMeta(pubkey=evm_loader_program_id, is_signer=False, is_writable=False),
 
             AccountMeta(pubkey=contract_sol_acc, is_signer=False, is_writable=True),
             AccountMeta(pubkey=code_sol_acc, is_signer=False, is_writable=writable_code),
             AccountMeta(pubkey=caller_sol_acc, is_signer=False, is_writable=True),
-
-            AccountMeta(pubkey=PublicKey(sysinstruct), is_signer=False, is_writable=False),
-        ] + add_meta + [
+        ] + list(add_meta) + [
             AccountMeta(pubkey=TOKEN_PROGRAM_ID, is_signer=False, is_writable=False),
         ])
 
@@ -598,14 +1371,29 @@ def create_neon_evm_instr_19_partial_call(evm_loader_program_id,
                                           evm_instruction,
                                           writable_code=True,
                                           add_meta=[]):
-    return TransactionInstruction(
-        program_id=evm_loader_program_id,
-        data=bytearray.fromhex("13") + collateral_pool_index_buf + step_count.to_bytes(8, byteorder='little') + evm_instruction,
-        keys=[
+    return neon_evm_instr_19_template(evm_loader_program_id, caller_sol_acc, operator_sol_acc, storage_sol_acc,
+                                      contract_sol_acc, code_sol_acc, collateral_pool_index_buf,
+                                      collateral_pool_address, writable_code,
+                                      add_meta).step(step_count, evm_instruction)
+
+
+@instruction_template
+def neon_evm_instr_20_template(evm_loader_program_id,
+                               caller_sol_acc,
+                               operator_sol_acc,
+                               storage_sol_acc,
+                               contract_sol_acc,
+                               code_sol_acc,
+                               collateral_pool_index_buf,
+                               collateral_pool_address,
+                               writable_code=True,
+                               add_meta=()):
+    return InstructionTemplate(
+        evm_loader_program_id,
+        bytes.fromhex("14") + collateral_pool_index_buf,
+        [
+            # Operator's storage account:
             AccountMeta(pubkey=storage_sol_acc, is_signer=False, is_writable=True),
-            # System instructions account:
-            AccountMeta(pubkey=PublicKey(sysinstruct), is_signer=False, is_writable=False),
-
             # Operator's SOL account:
             AccountMeta(pubkey=operator_sol_acc, is_signer=True, is_writable=True),
             # Collateral pool address:
@@ -613,14 +1401,14 @@ def create_neon_evm_instr_19_partial_call(evm_loader_program_id,
             # Operator's NEON account:
             AccountMeta(pubkey=caller_sol_acc, is_signer=False, is_writable=True),
             # System program account:
-            AccountMeta(pubkey=PublicKey(system), is_signer=False, is_writable=False),
+            AccountMeta(pubkey=SYSTEM_PROGRAM_ID, is_signer=False, is_writable=False),
             # NeonEVM program account
             AccountMeta(pubkey=evm_loader_program_id, is_signer=False, is_writable=False),
 
             AccountMeta(pubkey=contract_sol_acc, is_signer=False, is_writable=True),
             AccountMeta(pubkey=code_sol_acc, is_signer=False, is_writable=writable_code),
             AccountMeta(pubkey=caller_sol_acc, is_signer=False, is_writable=True),
-        ] + add_meta + [
+        ] + list(add_meta) + [
             AccountMeta(pubkey=TOKEN_PROGRAM_ID, is_signer=False, is_writable=False),
         ])
 
@@ -636,27 +1424,43 @@ def create_neon_evm_instr_20_continue(evm_loader_program_id,
                                       step_count,
                                       writable_code=True,
                                       add_meta=[]):
-    return TransactionInstruction(
-        program_id=evm_loader_program_id,
-        data=bytearray.fromhex("14") + collateral_pool_index_buf + step_count.to_bytes(8, byteorder='little'),
-        keys=[
-            # Operator's storage account:
+    return neon_evm_instr_20_template(evm_loader_program_id, caller_sol_acc, operator_sol_acc, storage_sol_acc,
+                                      contract_sol_acc, code_sol_acc, collateral_pool_index_buf,
+                                      collateral_pool_address, writable_code, add_meta).step(step_count)
+
+
+@instruction_template
+def neon_evm_instr_22_template(evm_loader_program_id,
+                               caller_sol_acc,
+                               operator_sol_acc,
+                               storage_sol_acc,
+                               holder_sol_acc,
+                               contract_sol_acc,
+                               code_sol_acc,
+                               collateral_pool_index_buf,
+                               collateral_pool_address):
+    return InstructionTemplate(
+        evm_loader_program_id,
+        bytes.fromhex("16") + collateral_pool_index_buf,
+        [
+            AccountMeta(pubkey=holder_sol_acc, is_signer=False, is_writable=True),
             AccountMeta(pubkey=storage_sol_acc, is_signer=False, is_writable=True),
+
             # Operator's SOL account:
             AccountMeta(pubkey=operator_sol_acc, is_signer=True, is_writable=True),
             # Collateral pool address:
             AccountMeta(pubkey=collateral_pool_address, is_signer=False, is_writable=True),
-            # Operator's NEON account:
+            # Operator's NEON token account:
             AccountMeta(pubkey=caller_sol_acc, is_signer=False, is_writable=True),
             # System program account:
-            AccountMeta(pubkey=PublicKey(system), is_signer=False, is_writable=False),
+            AccountMeta(pubkey=SYSTEM_PROGRAM_ID, is_signer=False, is_writable=False),
             # NeonEVM program account
             AccountMeta(pubkey=evm_loader_program_id, is_signer=False, is_writable=False),
 
             AccountMeta(pubkey=contract_sol_acc, is_signer=False, is_writable=True),
-            AccountMeta(pubkey=code_sol_acc, is_signer=False, is_writable=writable_code),
+            AccountMeta(pubkey=code_sol_acc, is_signer=False, is_writable=True),
             AccountMeta(pubkey=caller_sol_acc, is_signer=False, is_writable=True),
-        ] + add_meta + [
+
             AccountMeta(pubkey=TOKEN_PROGRAM_ID, is_signer=False, is_writable=False),
         ])
 
@@ -671,23 +1475,28 @@ def create_neon_evm_instr_22_begin(evm_loader_program_id,
                                    collateral_pool_index_buf,
                                    collateral_pool_address,
                                    step_count):
-    return TransactionInstruction(
-        program_id=evm_loader_program_id,
-        data=bytearray.fromhex("16") + collateral_pool_index_buf + step_count.to_bytes(8, byteorder='little'),
-        keys=[
-            AccountMeta(pubkey=holder_sol_acc, is_signer=False, is_writable=True),
+    return neon_evm_instr_22_template(evm_loader_program_id, caller_sol_acc, operator_sol_acc, storage_sol_acc,
+                                      holder_sol_acc, contract_sol_acc, code_sol_acc, collateral_pool_index_buf,
+                                      collateral_pool_address).step(step_count)
+
+
+@instruction_template
+def neon_evm_instr_21_template(evm_loader_program_id,
+                               caller_sol_acc,
+                               operator_sol_acc,
+                               storage_sol_acc,
+                               contract_sol_acc,
+                               code_sol_acc):
+    return InstructionTemplate(
+        evm_loader_program_id,
+        bytes.fromhex("15"),
+        [
             AccountMeta(pubkey=storage_sol_acc, is_signer=False, is_writable=True),
 
             # Operator's SOL account:
             AccountMeta(pubkey=operator_sol_acc, is_signer=True, is_writable=True),
-            # Collateral pool address:
-            AccountMeta(pubkey=collateral_pool_address, is_signer=False, is_writable=True),
-            # Operator's NEON token account:
-            AccountMeta(pubkey=caller_sol_acc, is_signer=False, is_writable=True),
-            # System program account:
-            AccountMeta(pubkey=PublicKey(system), is_signer=False, is_writable=False),
-            # NeonEVM program account
-            AccountMeta(pubkey=evm_loader_program_id, is_signer=False, is_writable=False),
+            # Incinerator
+            AccountMeta(pubkey=INCINERATOR_ID, is_signer=False, is_writable=True),
 
             AccountMeta(pubkey=contract_sol_acc, is_signer=False, is_writable=True),
             AccountMeta(pubkey=code_sol_acc, is_signer=False, is_writable=True),
@@ -704,16 +1513,37 @@ def create_neon_evm_instr_21_cancel(evm_loader_program_id,
                                     contract_sol_acc,
                                     code_sol_acc,
                                     nonce):
-    return TransactionInstruction(
-        program_id=evm_loader_program_id,
-        data=bytearray.fromhex("15") + nonce.to_bytes(8, 'little'),
-        keys=[
+    return neon_evm_instr_21_template(evm_loader_program_id, caller_sol_acc, operator_sol_acc, storage_sol_acc,
+                                      contract_sol_acc, code_sol_acc).step(nonce)
+
+
+@instruction_template
+def neon_evm_instr_14_template(evm_loader_program_id,
+                               caller_sol_acc,
+                               operator_sol_acc,
+                               storage_sol_acc,
+                               holder_sol_acc,
+                               contract_sol_acc,
+                               code_sol_acc,
+                               collateral_pool_index_buf,
+                               collateral_pool_address):
+    return InstructionTemplate(
+        evm_loader_program_id,
+        bytes.fromhex("0E") + collateral_pool_index_buf,
+        [
+            AccountMeta(pubkey=holder_sol_acc, is_signer=False, is_writable=True),
             AccountMeta(pubkey=storage_sol_acc, is_signer=False, is_writable=True),
 
             # Operator's SOL account:
             AccountMeta(pubkey=operator_sol_acc, is_signer=True, is_writable=True),
-            # Incinerator
-            AccountMeta(pubkey=PublicKey(incinerator), is_signer=False, is_writable=True),
+            # Collateral pool address:
+            AccountMeta(pubkey=collateral_pool_address, is_signer=False, is_writable=True),
+            # Operator's NEON account:
+            AccountMeta(pubkey=caller_sol_acc, is_signer=False, is_writable=True),
+            # System program account:
+            AccountMeta(pubkey=SYSTEM_PROGRAM_ID, is_signer=False, is_writable=False),
+            # NeonEVM program account
+            AccountMeta(pubkey=evm_loader_program_id, is_signer=False, is_writable=False),
 
             AccountMeta(pubkey=contract_sol_acc, is_signer=False, is_writable=True),
             AccountMeta(pubkey=code_sol_acc, is_signer=False, is_writable=True),
@@ -733,30 +1563,9 @@ def create_neon_evm_instr_14_combined_continue(evm_loader_program_id,
                                                collateral_pool_index_buf,
                                                collateral_pool_address,
                                                step_count):
-    return TransactionInstruction(
-        program_id=evm_loader_program_id,
-        data=bytearray.fromhex("0E") + collateral_pool_index_buf + step_count.to_bytes(8, byteorder='little'),
-        keys=[
-            AccountMeta(pubkey=holder_sol_acc, is_signer=False, is_writable=True),
-            AccountMeta(pubkey=storage_sol_acc, is_signer=False, is_writable=True),
-
-            # Operator's SOL account:
-            AccountMeta(pubkey=operator_sol_acc, is_signer=True, is_writable=True),
-            # Collateral pool address:
-            AccountMeta(pubkey=collateral_pool_address, is_signer=False, is_writable=True),
-            # Operator's NEON account:
-            AccountMeta(pubkey=caller_sol_acc, is_signer=False, is_writable=True),
-            # System program account:
-            AccountMeta(pubkey=PublicKey(system), is_signer=False, is_writable=False),
-            # NeonEVM program account
-            AccountMeta(pubkey=evm_loader_program_id, is_signer=False, is_writable=False),
-
-            AccountMeta(pubkey=contract_sol_acc, is_signer=False, is_writable=True),
-            AccountMeta(pubkey=code_sol_acc, is_signer=False, is_writable=True),
-            AccountMeta(pubkey=caller_sol_acc, is_signer=False, is_writable=True),
-
-            AccountMeta(pubkey=TOKEN_PROGRAM_ID, is_signer=False, is_writable=False),
-        ])
+    return neon_evm_instr_14_template(evm_loader_program_id, caller_sol_acc, operator_sol_acc, storage_sol_acc,
+                                      holder_sol_acc, contract_sol_acc, code_sol_acc, collateral_pool_index_buf,
+                                      collateral_pool_address).step(step_count)
 
 
 def evm_step_cost():
@@ -781,8 +1590,81 @@ class ComputeBudget():
             data=bytes.fromhex("01") + heapFrame.to_bytes(4, "little")
         )
 
-def TransactionWithComputeBudget(units=DEFAULT_UNITS, additional_fee=DEFAULT_ADDITIONAL_FEE, heapFrame=DEFAULT_HEAP_FRAME, **args):
+def TransactionWithComputeBudget(units=DEFAULT_UNITS, additional_fee=DEFAULT_ADDITIONAL_FEE, heapFrame=DEFAULT_HEAP_FRAME,
+                                 fit=False, **args):
+    """With fit=True the budget is replaced by the measured one when the transaction is signed for sending."""
     trx = Transaction(**args)
     if units: trx.add(ComputeBudget.requestUnits(units, additional_fee))
     if heapFrame: trx.add(ComputeBudget.requestHeapFrame(heapFrame))
+    trx.fit_compute_budget = fit
     return trx
+
+
+class ComputeBudgetSizer:
+    """Sizes compute units and heap frame of a transaction by simulating it.
+
+    unitsConsumed and the "Total memory occupied" log of evm_loader plus COMPUTE_BUDGET_MARGIN become
+    the requested budget. Measurements are cached per instruction shape (program, opcode and number of accounts),
+    so only the first transaction of a shape is simulated. Transactions which fail in simulation keep their budget.
+    """
+
+    MEMORY_LOG = re.compile(r"Total memory occupied: (\d+)")
+
+    def __init__(self, client: Client, margin: float = COMPUTE_BUDGET_MARGIN):
+        self.client = client
+        self.margin = margin
+        self.budgets = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def shape(trx: Transaction):
+        return tuple((str(instr.program_id), instr.data[:1], len(instr.keys))
+                     for instr in trx.instructions if instr.program_id != COMPUTE_BUDGET_ID)
+
+    def measure(self, trx: Transaction, *signers: Account):
+        """Returns (units, heap frame) needed by the transaction, None if its simulation fails."""
+        from blockhash_provider import get_blockhash_provider
+        trx.recent_blockhash = get_blockhash_provider(self.client._provider.endpoint_uri).get().blockhash
+        trx.sign(*signers)
+        result = self.client.simulate_transaction(trx, commitment=Confirmed)['result']['value']
+        if result['err'] or not result.get('unitsConsumed'):
+            return None
+
+        occupied = [int(m.group(1)) for m in map(self.MEMORY_LOG.search, result['logs'] or []) if m]
+        units = min(math.ceil(result['unitsConsumed'] * (1 + self.margin)), MAX_UNITS)
+        heap = math.ceil(max(occupied, default=0) * (1 + self.margin) / HEAP_FRAME_GRANULARITY) * HEAP_FRAME_GRANULARITY
+        return (units, min(max(heap, MIN_HEAP_FRAME), DEFAULT_HEAP_FRAME))
+
+    def fit(self, trx: Transaction, *signers: Account) -> Transaction:
+        """Resizes the compute budget instructions of `trx`, the transaction has to be signed again afterwards.
+
+        Budget instructions are not added to transactions which have none.
+        """
+        shape = self.shape(trx)
+        with self._lock:
+            budget = self.budgets.get(shape)
+        if budget is None:
+            budget = self.measure(trx, *signers)
+            if budget is None:
+                return trx
+            with self._lock:
+                self.budgets[shape] = budget
+
+        # budget instructions are replaced where they are, keccak instructions refer to others by index
+        (units, heap) = budget
+        for (index, instr) in enumerate(trx.instructions):
+            if instr.program_id != COMPUTE_BUDGET_ID:
+                continue
+            if instr.data[:1] == bytes.fromhex("00"):
+                additional_fee = int.from_bytes(instr.data[5:9], "little")
+                trx.instructions[index] = ComputeBudget.requestUnits(units, additional_fee)
+            elif instr.data[:1] == bytes.fromhex("01"):
+                trx.instructions[index] = ComputeBudget.requestHeapFrame(heap)
+        trx.signatures = []
+        trx.fit_compute_budget = False
+        return trx
+
+
+# the lazily resolved settings aren't star-imported, that would resolve them at import time;
+# use solana_config (or attributes of the module) instead
+__all__ = [name for name in globals() if not name.startswith("_")]
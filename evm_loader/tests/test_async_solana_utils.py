@@ -0,0 +1,69 @@
+import asyncio
+import unittest
+from unittest import mock
+
+from solana.account import Account
+from solana.system_program import TransferParams, transfer
+from solana.transaction import Transaction
+
+from async_solana_utils import *
+from fake_node import FakeNode
+
+
+def transfer_trx(sender: Account, lamports: int = 1) -> Transaction:
+    return Transaction().add(transfer(TransferParams(from_pubkey=sender.public_key(), to_pubkey=Account(2).public_key(),
+                                                     lamports=lamports)))
+
+
+class AsyncSolanaUtilsTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.node = FakeNode().start()
+        cls.sender = Account(1)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.node.stop()
+
+    def test_send_transaction_receipt_is_lazy(self):
+        async def send():
+            async with AsyncClient(self.node.url) as client:
+                receipts = [await send_transaction(client, transfer_trx(self.sender, lamports), self.sender)
+                            for lamports in (1, 2)]
+                self.assertEqual(self.node.count("getConfirmedTransaction"), 0)
+                self.assertFalse(any(receipt.fetched for receipt in receipts))
+
+                await fetchReceipts(receipts)
+                self.assertEqual(self.node.count("getConfirmedTransaction"), 2)
+                await receipts[0].fetch()
+                self.assertEqual(receipts[0]["result"]["transaction"]["signatures"], [receipts[0].signature])
+                self.assertEqual(self.node.count("getConfirmedTransaction"), 2)
+                return receipts
+
+        receipts = asyncio.run(send())
+        self.assertEqual(list(self.node.transactions)[-2:], [receipt.signature for receipt in receipts])
+
+    def test_default_endpoint(self):
+        with mock.patch.dict(solana_config.__dict__, {"solana_url": self.node.url}):
+            self.assertEqual(AsyncClient().endpoint_uri, self.node.url)
+        self.assertEqual(AsyncClient("http://solana:8899").endpoint_uri, "http://solana:8899")
+
+    def test_get_multiple_accounts(self):
+        keys = [Account(index + 10).public_key() for index in range(MAX_ACCOUNTS_PER_REQUEST + 5)]
+        for (index, key) in enumerate(keys[1:]):
+            self.node.set_account(key, data=bytes([index % 256]), lamports=index)
+
+        async def read():
+            async with AsyncClient(self.node.url) as client:
+                return await getMultipleAccounts(client, keys)
+
+        requests = self.node.count("getMultipleAccounts")
+        accounts = asyncio.run(read())
+        self.assertEqual(self.node.count("getMultipleAccounts") - requests, 2)
+        self.assertIsNone(accounts[0])
+        self.assertEqual([(info.pubkey, info.lamports, info.data) for info in accounts[1:]],
+                         [(str(key), index, bytes([index % 256])) for (index, key) in enumerate(keys[1:])])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import threading
+import unittest
+
+from solana.account import Account
+from solana.system_program import TransferParams, transfer
+from solana.transaction import Transaction
+
+from blockhash_provider import *
+from fake_node import BLOCKHASH_LIFETIME, FakeNode, RpcError
+
+
+def transfer_trx(sender: Account, lamports: int = 1) -> Transaction:
+    return Transaction().add(transfer(TransferParams(from_pubkey=sender.public_key(), to_pubkey=Account(2).public_key(),
+                                                     lamports=lamports)))
+
+
+class BlockhashProviderTest(unittest.TestCase):
+    def setUp(self):
+        self.node = FakeNode().start()
+        # refreshed by the tests only
+        self.provider = BlockhashProvider(self.node.url, refresh_interval=60)
+        self.sender = Account(1)
+
+    def tearDown(self):
+        self.provider.stop()
+        self.node.stop()
+
+    def test_get(self):
+        self.assertEqual(self.provider.get(), (self.node.blockhash, self.node.block_height + BLOCKHASH_LIFETIME))
+        self.node.new_blockhash()
+        self.assertNotEqual(self.provider.get().blockhash, self.node.blockhash)
+        self.assertEqual(self.node.count("getLatestBlockhash"), 1)
+        self.assertEqual(self.provider.refresh().blockhash, self.node.blockhash)
+
+    def test_is_expiring(self):
+        blockhash = self.provider.get().blockhash
+        self.assertFalse(self.provider.is_expiring(blockhash))
+        self.assertTrue(self.provider.is_expiring(Blockhash(str(Account(3).public_key()))))
+        self.node.block_height += BLOCKHASH_LIFETIME - EXPIRY_MARGIN + 1
+        self.node.new_blockhash()
+        self.provider.refresh()
+        self.assertTrue(self.provider.is_expiring(blockhash))
+        self.assertFalse(self.provider.is_expiring(self.node.blockhash))
+
+    def test_ensure_valid(self):
+        trx = self.provider.ensure_valid(transfer_trx(self.sender), self.sender)
+        self.assertEqual(trx.recent_blockhash, self.node.blockhash)
+        signature = trx.signature()
+        self.assertEqual(self.provider.ensure_valid(trx, self.sender).signature(), signature)
+
+        # the blockhash is about to expire, the transaction is signed with the new one
+        self.node.block_height += BLOCKHASH_LIFETIME - EXPIRY_MARGIN + 1
+        self.node.new_blockhash()
+        self.provider.refresh()
+        self.assertEqual(self.provider.ensure_valid(trx, self.sender).recent_blockhash, self.node.blockhash)
+        self.assertNotEqual(trx.signature(), signature)
+
+    def test_sign_duplicate(self):
+        first = self.provider.sign(transfer_trx(self.sender), self.sender)
+        # the same message signed with the same blockhash would be a duplicate of the first transaction
+        threading.Timer(0.05, self.node.new_blockhash).start()
+        second = self.provider.sign(transfer_trx(self.sender), self.sender)
+        self.assertNotEqual(second.recent_blockhash, first.recent_blockhash)
+        self.assertNotEqual(second.signature(), first.signature())
+        self.assertEqual(second.recent_blockhash, self.node.blockhash)
+
+    def test_get_fees_fallback(self):
+        def not_found(params):
+            raise RpcError("Method not found", -32601)
+
+        self.node.handlers.update({
+            "getLatestBlockhash": not_found,
+            "getFees": lambda params: self.node._context({
+                "blockhash": self.node.blockhash, "feeCalculator": {"lamportsPerSignature": 5000},
+                "lastValidSlot": self.node.slot + BLOCKHASH_LIFETIME, "lastValidBlockHeight": None}),
+            "getSlot": lambda params: self.node.slot,
+        })
+        self.assertEqual(self.provider.get(), (self.node.blockhash, self.node.slot + BLOCKHASH_LIFETIME))
+        self.assertEqual(self.provider.block_height(), self.node.slot)
+        self.assertFalse(self.provider.is_expiring(self.node.blockhash))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,159 @@
+import threading
+import time
+import unittest
+
+from base58 import b58encode
+
+from confirmation_tracker import *
+from fake_node import FakeNode, status
+
+POLL_INTERVAL = 0.02
+
+
+def signatures(count, start=0):
+    return [b58encode((index + 1).to_bytes(64, 'big')).decode() for index in range(start, start + count)]
+
+
+class ConfirmationTrackerTest(unittest.TestCase):
+    def setUp(self):
+        self.node = FakeNode().start()
+        self.tracker = ConfirmationTracker(self.node.url, timeout=5, poll_interval=POLL_INTERVAL).start()
+
+    def tearDown(self):
+        self.tracker.stop()
+        self.node.stop()
+
+    def wait_polls(self, count=2):
+        polls = self.node.count("getSignatureStatuses")
+        while self.node.count("getSignatureStatuses") < polls + count:
+            time.sleep(POLL_INTERVAL / 2)
+
+    def test_batched_statuses(self):
+        pending = signatures(MAX_SIGNATURES_PER_REQUEST + 44)
+        futures = [self.tracker.track(tx_sig) for tx_sig in pending]
+        self.wait_polls()
+        self.assertFalse(any(future.done() for future in futures))
+        self.assertEqual(self.tracker.pending_count, len(pending))
+
+        for tx_sig in pending:
+            self.node.statuses[tx_sig] = status(slot=7)
+        self.assertEqual([future.result(5)['slot'] for future in futures], [7] * len(pending))
+        self.assertEqual(self.tracker.pending_count, 0)
+        # every tick asks for all pending signatures in as few requests as possible
+        sizes = [len(params[0]) for params in self.node.params("getSignatureStatuses")]
+        self.assertEqual(max(sizes), MAX_SIGNATURES_PER_REQUEST)
+        self.assertIn(44, sizes)
+
+    def test_confirm_many(self):
+        pending = signatures(5)
+        for tx_sig in pending:
+            self.node.statuses[tx_sig] = status(err={"InstructionError": [0, "Custom"]} if tx_sig == pending[2] else None)
+        statuses = self.tracker.confirm_many(pending)
+        self.assertEqual([bool(status['err']) for status in statuses], [False, False, True, False, False])
+
+    def test_confirmations(self):
+        (tx_sig,) = signatures(1)
+        called = threading.Event()
+        future = self.tracker.track(tx_sig, confirmations=2, callback=lambda future: called.set())
+        self.node.statuses[tx_sig] = status(confirmations=1)
+        self.wait_polls()
+        self.assertFalse(future.done())
+
+        self.node.statuses[tx_sig] = status(confirmations=2)
+        self.assertEqual(future.result(5)['confirmations'], 2)
+        self.assertTrue(called.wait(5))
+
+    def test_finalized(self):
+        (tx_sig,) = signatures(1)
+        self.node.statuses[tx_sig] = status(confirmation_status="finalized", confirmations=None)
+        self.assertEqual(self.tracker.confirm(tx_sig, confirmations=10)['confirmationStatus'], "finalized")
+
+    def test_timeout(self):
+        tracker = ConfirmationTracker(self.node.url, timeout=0.1, poll_interval=POLL_INTERVAL)
+        try:
+            with self.assertRaises(RuntimeError):
+                tracker.confirm(signatures(1)[0])
+            self.assertEqual(tracker.pending_count, 0)
+        finally:
+            tracker.stop()
+
+
+class WebsocketConfirmationTest(unittest.TestCase):
+    def setUp(self):
+        self.node = FakeNode().start()
+        self.tracker = None
+
+    def tearDown(self):
+        self.tracker.stop()
+        self.node.stop()
+
+    def start_tracker(self, poll_interval):
+        self.tracker = ConfirmationTracker(self.node.url, self.node.websocket_url, timeout=10,
+                                           poll_interval=poll_interval).start()
+        deadline = time.monotonic() + 5
+        while not self.tracker.websocket_connected and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertTrue(self.tracker.websocket_connected)
+
+    def wait_subscriptions(self, count):
+        deadline = time.monotonic() + 5
+        while self.node.count("signatureSubscribe") < count and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.node.count("signatureSubscribe"), count)
+
+    def test_notification(self):
+        # polling is too slow to be the one resolving the signature
+        self.start_tracker(poll_interval=30)
+        (tx_sig,) = signatures(1)
+        future = self.tracker.track(tx_sig)
+        self.wait_subscriptions(1)
+        self.node.confirm(tx_sig, err={"InstructionError": [0, "Custom"]})
+        self.assertEqual(future.result(5)['err'], {"InstructionError": [0, "Custom"]})
+
+    def poll_slowly(self):
+        """Tracks a signature which is never confirmed and returns right after a poll at the slow rate."""
+        self.tracker.track(signatures(1, start=100)[0])
+        self.wait_subscriptions(1)
+        time.sleep(POLL_INTERVAL * 2)
+        polls = self.node.count("getSignatureStatuses")
+        while self.node.count("getSignatureStatuses") == polls:
+            time.sleep(0.005)
+
+    def test_confirmed_before_subscription(self):
+        # the transaction is confirmed before its subscription is registered, no notification is sent
+        self.start_tracker(poll_interval=POLL_INTERVAL)
+        self.poll_slowly()
+        (tx_sig,) = signatures(1)
+        self.node.on_subscribe = lambda subscribed: self.node.statuses.update({subscribed: status()})
+        started = time.monotonic()
+        self.tracker.confirm(tx_sig)
+        self.assertLess(time.monotonic() - started, WS_POLL_INTERVAL / 2)
+
+    def test_polling_fallback(self):
+        self.start_tracker(poll_interval=POLL_INTERVAL)
+        self.poll_slowly()
+        (tx_sig,) = signatures(1)
+        future = self.tracker.track(tx_sig)
+        self.node.websocket_enabled = False
+        self.node.drop_websockets()
+        self.node.statuses[tx_sig] = status()
+        started = time.monotonic()
+        future.result(5)
+        self.assertLess(time.monotonic() - started, WS_POLL_INTERVAL / 2)
+        self.assertFalse(self.tracker.websocket_connected)
+
+    def test_resubscribe_after_reconnect(self):
+        self.start_tracker(poll_interval=30)
+        pending = signatures(3)
+        futures = [self.tracker.track(tx_sig) for tx_sig in pending]
+        self.wait_subscriptions(3)
+        self.node.drop_websockets()
+        # pending signatures are subscribed again on the new connection (after WS_RECONNECT_DELAY)
+        self.wait_subscriptions(6)
+        for tx_sig in pending:
+            self.node.confirm(tx_sig)
+        self.assertEqual([future.result(5)['err'] for future in futures], [None] * 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -16,7 +16,7 @@ class EvmLoaderTestsNewAccount(unittest.TestCase):
     def setUpClass(cls):
         print("\ntest_delete_account.py setUpClass")
 
-        cls.token = SplToken(solana_url)
+        cls.token = SplToken(solana_config.solana_url)
         wallet = OperatorAccount(operator1_keypair_path())
         cls.loader = EvmLoader(wallet, evm_loader_id)
         cls.acc = wallet.get_acc()
@@ -55,7 +55,7 @@ class EvmLoaderTestsNewAccount(unittest.TestCase):
 
     def make_transactions(self, contract_eth, owner_contract, contract_code, nonce, position):
         if nonce is None:
-            nonce = getTransactionCount(client, self.caller)
+            nonce = getTransactionCount(solana_config.client, self.caller)
 
         tx = {
             'to': contract_eth,
@@ -111,7 +111,7 @@ class EvmLoaderTestsNewAccount(unittest.TestCase):
         (owner_contract, eth_contract, contract_code) = self.deploy_contract()
 
         trx = TransactionWithComputeBudget()
-        init_nonce = getTransactionCount(client, self.caller)
+        init_nonce = getTransactionCount(solana_config.client, self.caller)
         (keccak_tx_1, call_tx_1) = self.make_transactions(eth_contract, owner_contract, contract_code, init_nonce, len(trx.instructions) + 1)
         init_nonce += 1
         (keccak_tx_2, call_tx_2) = self.make_transactions(eth_contract, owner_contract, contract_code, init_nonce, len(trx.instructions) + 3)
@@ -120,7 +120,7 @@ class EvmLoaderTestsNewAccount(unittest.TestCase):
 
         err = "Program failed to complete"
         with self.assertRaisesRegex(Exception,err):
-            result = send_transaction(client, trx, self.acc)
+            result = send_transaction(solana_config.client, trx, self.acc)
             print(result)
 
 
@@ -128,8 +128,8 @@ class EvmLoaderTestsNewAccount(unittest.TestCase):
         (owner_contract, eth_contract, contract_code) = self.deploy_contract()
         self.loader.airdropNeonTokens(eth_contract, 100)
 
-        operator_token_balance = getNeonBalance(client, self.caller)
-        contract_token_balance = getNeonBalance(client, owner_contract)
+        operator_token_balance = getNeonBalance(solana_config.client, self.caller)
+        contract_token_balance = getNeonBalance(solana_config.client, owner_contract)
 
         caller_balance_pre = getBalance(self.acc.public_key())
         contract_balance_pre = getBalance(owner_contract)
@@ -139,13 +139,13 @@ class EvmLoaderTestsNewAccount(unittest.TestCase):
         (keccak_tx_1, call_tx_1) = self.make_transactions(eth_contract, owner_contract, contract_code, None, len(trx.instructions) + 1)
         trx.add( keccak_tx_1 ).add( call_tx_1 )
 
-        send_transaction(client, trx, self.acc)
+        send_transaction(solana_config.client, trx, self.acc)
 
         caller_balance_post = getBalance(self.acc.public_key())
         contract_balance_post = getBalance(owner_contract)
         code_balance_post = getBalance(contract_code)
 
-        operator_token_balance_post = getNeonBalance(client, self.caller)
+        operator_token_balance_post = getNeonBalance(solana_config.client, self.caller)
 
         # Check that lamports moved from code accounts to caller
         self.assertGreater(caller_balance_post, contract_balance_pre)
@@ -157,7 +157,7 @@ class EvmLoaderTestsNewAccount(unittest.TestCase):
 
         err = "Can't get information about"
         with self.assertRaisesRegex(Exception,err):
-            nonce = getTransactionCount(client, owner_contract)
+            nonce = getTransactionCount(solana_config.client, owner_contract)
             print(nonce)
 
 
@@ -2,6 +2,7 @@ import unittest
 from base58 import b58decode
 from solana_utils import *
 from eth_tx_utils import  make_instruction_data_from_tx, pack
+from pipelined_sender import PipelinedSender
 from spl.token.constants import TOKEN_PROGRAM_ID, ASSOCIATED_TOKEN_PROGRAM_ID, ACCOUNT_LEN
 from spl.token.instructions import get_associated_token_address, initialize_account, InitializeAccountParams
 from sha3 import keccak_256
@@ -108,24 +109,23 @@ class DeployTest(unittest.TestCase):
 
         # Write transaction to transaction holder account
         offset = 0
-        receipts = []
         rest = msg
-        while len(rest):
-            (part, rest) = (rest[:950], rest[950:])
-            trx = TransactionWithComputeBudget()
-            trx.add(TransactionInstruction(program_id=evm_loader_id,
-                data=write_holder_layout(holder_id, offset, part),
-                keys=[
-                    AccountMeta(pubkey=holder, is_signer=False, is_writable=True),
-                    AccountMeta(pubkey=self.operator_acc.public_key(), is_signer=True, is_writable=False),
-                ]))
-            receipts.append(client.send_transaction(trx, self.operator_acc, opts=TxOpts(skip_confirmation=True,
-                                                                                        preflight_commitment="confirmed"))["result"])
-            offset += len(part)
-        print("receipts", receipts)
-        for rcpt in receipts:
-            confirm_transaction(client, rcpt)
-            print("confirmed:", rcpt)
+        with PipelinedSender(client) as sender:
+            while len(rest):
+                (part, rest) = (rest[:950], rest[950:])
+                trx = TransactionWithComputeBudget()
+                trx.add(TransactionInstruction(program_id=evm_loader_id,
+                    data=write_holder_layout(holder_id, offset, part),
+                    keys=[
+                        AccountMeta(pubkey=holder, is_signer=False, is_writable=True),
+                        AccountMeta(pubkey=self.operator_acc.public_key(), is_signer=True, is_writable=False),
+                    ]))
+                sender.submit(trx, self.operator_acc)
+                offset += len(part)
+            outcomes = sender.wait()
+        print("confirmed:", [outcome.signature for outcome in outcomes])
+        for outcome in outcomes:
+            self.assertIsNone(outcome.error)
 
         base = self.operator_acc.public_key()
         seed = b58encode(ACCOUNT_SEED_VERSION+contract_eth).decode('utf8')
@@ -208,7 +208,7 @@ class DeployTest(unittest.TestCase):
         storage = PublicKey(sha256(bytes(self.operator_acc.public_key()) + bytes(seed, 'utf8') + bytes(PublicKey(evm_loader_id))).digest())
         print("Storage", storage)
 
-        minimum_balance = client.get_minimum_balance_for_rent_exemption(128*1024, commitment=Confirmed)["result"]
+        minimum_balance = solana_config.rent_calculator.minimum_balance(128*1024)
         print("Minimum balance required for account {}".format(minimum_balance))
 
         if getBalance(storage) == 0:
@@ -240,7 +240,7 @@ class DeployTest(unittest.TestCase):
                     # Check if storage balace were filled to rent exempt
                     self.assertGreaterEqual(
                         getBalance(storage),
-                        client.get_minimum_balance_for_rent_exemption(128*1024, commitment=Confirmed)["result"])
+                        solana_config.rent_calculator.minimum_balance(128*1024))
                     return result
 
     def call_instr_14_several_times(self, holder, contract_sol, code_sol):
@@ -259,7 +259,7 @@ class DeployTest(unittest.TestCase):
                     # Check if storage balace were filled to rent exempt
                     self.assertGreaterEqual(
                         getBalance(storage),
-                        client.get_minimum_balance_for_rent_exemption(128*1024, commitment=Confirmed)["result"])
+                        solana_config.rent_calculator.minimum_balance(128*1024))
                     return result
 
     def test_01_executeTrxFromAccountDataIterative(self):
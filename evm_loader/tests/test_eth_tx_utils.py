@@ -0,0 +1,193 @@
+import os
+import unittest
+
+import rlp
+from eth_keys import keys
+from sha3 import keccak_256
+
+from eth_tx_utils import *
+
+CHAIN_ID = 111
+
+
+def signed_raw_trx(private_key, nonce=1, gas_price=1, gas=987654321, to=bytes(range(20)), value=5, data=b"\x01\x02\x03"):
+    """Canonical raw transaction signed with EIP-155 as web3 does it."""
+    msg = rlp.encode([nonce, gas_price, gas, to, value, data, CHAIN_ID, 0, 0])
+    signature = keys.PrivateKey(private_key).sign_msg_hash(keccak_256(msg).digest())
+    return rlp.encode([nonce, gas_price, gas, to, value, data, signature.v + CHAIN_ID * 2 + 35, signature.r, signature.s])
+
+
+def plain(item):
+    """Item decoded by rlp_decode as rlp.decode returns it."""
+    if item is None:
+        return b""
+    if isinstance(item, int):
+        return bytes([item])
+    if isinstance(item, (list, tuple)):
+        return [plain(i) for i in item]
+    return bytes(item)
+
+
+class RlpDecodeTest(unittest.TestCase):
+    ITEMS = [
+        b"",
+        b"\x01",
+        b"\x7f",
+        b"\x80",
+        b"dog",
+        b"x" * 55,
+        b"x" * 56,
+        b"x" * 1024,
+        [],
+        [b"cat", b"dog"],
+        [[], [[]], [[], [[]]]],
+        [b"a" * 60, [b"b", [b"c" * 100]], b""],
+        [1, 127, 128, 256, 2 ** 64],
+    ]
+
+    def test_decode_round_trip(self):
+        for item in self.ITEMS:
+            encoded = rlp.encode(item)
+            (decoded, offset) = rlp_decode(encoded, copy=True)
+            self.assertEqual(offset, len(encoded))
+            self.assertEqual(plain(decoded), rlp.decode(encoded), item)
+
+    def test_decode_representation(self):
+        self.assertEqual(rlp_decode(pack(b"\x05"))[0], 5)
+        self.assertIsNone(rlp_decode(pack(b""))[0])
+        self.assertEqual(rlp_decode(pack([]))[0], ())
+        self.assertIsInstance(rlp_decode(pack(b"dog"))[0], memoryview)
+        self.assertEqual(rlp_decode(pack(b"dog"), copy=True)[0], b"dog")
+
+    def test_decode_at_offset(self):
+        data = pack(b"dog") + pack([b"cat"])
+        (item, offset) = rlp_decode(data, len(pack(b"dog")), copy=True)
+        self.assertEqual(item, [b"cat"])
+        self.assertEqual(offset, len(data))
+
+    def test_truncated(self):
+        for item in [b"dog", b"x" * 100, [b"cat", b"dog"], [b"x" * 100]]:
+            encoded = pack(item)
+            for size in range(len(encoded)):
+                with self.assertRaises(Exception):
+                    rlp_decode(encoded[:size])
+
+    def test_item_exceeds_list(self):
+        # the list is one byte long, its string is two bytes long
+        with self.assertRaises(Exception):
+            rlp_decode(b"\xc1\x82ab" + b"\x00" * 4)
+
+    def test_decode_stream(self):
+        items = [[b"cat", b"dog"], b"x" * 100, b"\x01", []]
+        data = b"".join(pack(item) for item in items)
+        self.assertEqual([plain(item) for item in rlp_decode_stream(data)], [rlp.decode(pack(item)) for item in items])
+        self.assertEqual(list(rlp_decode_stream(b"")), [])
+
+
+class RlpEncodeTest(unittest.TestCase):
+    def test_pack_matches_rlp(self):
+        for item in RlpDecodeTest.ITEMS:
+            self.assertEqual(pack(item), rlp.encode(item), item)
+
+    def test_pack_many(self):
+        items = [[b"cat", b"dog"], b"x" * 100, 7]
+        (buffer, offsets) = pack_many(items)
+        self.assertEqual(len(offsets), len(items) + 1)
+        self.assertEqual([buffer[start:end] for (start, end) in zip(offsets, offsets[1:])], [pack(item) for item in items])
+
+    def test_pack_negative(self):
+        for item in [-1, -0x80, [1, -1]]:
+            with self.assertRaises(Exception):
+                pack(item)
+
+
+class TrxTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.private_key = keys.PrivateKey(os.urandom(32))
+        cls.address = cls.private_key.public_key.to_canonical_address()
+
+    def test_trx(self):
+        raw = signed_raw_trx(self.private_key.to_bytes())
+        trx = Trx.fromString(raw)
+        self.assertEqual(trx.chainId(), CHAIN_ID)
+        self.assertEqual(trx.sender(), self.address.hex())
+        self.assertEqual(trx.tx_hash(), keccak_256(raw).digest())
+        # memoized values are returned again
+        self.assertIs(trx.get_msg(), trx.get_msg())
+        self.assertEqual(trx.sender(), self.address.hex())
+
+    def test_trx_zero_fields(self):
+        raw = signed_raw_trx(self.private_key.to_bytes(), nonce=0, value=0, data=b"")
+        decoded = Trx.fromString(raw)
+        trx = Trx(0, decoded.gasPrice, decoded.gasLimit, decoded.toAddress, 0, b"", decoded.v, decoded.r, decoded.s)
+        self.assertEqual(trx.get_msg(), decoded.get_msg())
+        self.assertEqual(trx.tx_hash(), keccak_256(raw).digest())
+        self.assertEqual(trx.sender(), self.address.hex())
+
+    def test_trx_sender_follows_recovery_id(self):
+        trx = Trx.fromString(signed_raw_trx(self.private_key.to_bytes()))
+        self.assertEqual(trx.sender(), self.address.hex())
+        # the other recovery id of the same chain recovers another key
+        trx.v += 1 if trx.v == CHAIN_ID * 2 + 35 else -1
+        self.assertEqual(trx.chainId(), CHAIN_ID)
+        self.assertNotEqual(trx.sender(), self.address.hex())
+
+
+class SignTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.private_key = keys.PrivateKey(os.urandom(32))
+        cls.address = cls.private_key.public_key.to_canonical_address()
+
+    def tx(self, nonce):
+        return {'to': '0x' + '11' * 20, 'value': nonce % 2, 'gas': 9999999, 'gasPrice': 1, 'nonce': nonce,
+                'data': '3917b3df' if nonce % 3 else '', 'chainId': CHAIN_ID}
+
+    def test_sign_tx(self):
+        for nonce in range(4):
+            tx = self.tx(nonce)
+            (address, signature, msg) = sign_tx(tx, self.private_key.to_bytes())
+            self.assertEqual(address, self.address)
+            self.assertEqual(msg, rlp.encode([nonce, 1, 9999999, b"\x11" * 20, nonce % 2,
+                                               bytes.fromhex(tx['data']), CHAIN_ID, 0, 0]))
+            self.assertEqual(signature, self.private_key.sign_msg_hash(keccak_256(msg).digest()).to_bytes())
+            self.assertEqual(make_instruction_data_from_tx(tx, self.private_key.to_bytes()), (address, signature, msg))
+
+    def test_sign_txs(self):
+        txs = [self.tx(nonce) for nonce in range(5)]
+        self.assertEqual(sign_txs(txs, self.private_key), [sign_tx(tx, self.private_key) for tx in txs])
+
+    def test_sign_payloads(self):
+        txs = [self.tx(nonce) for nonce in range(5)]
+        payloads = list(sign_payloads(txs, self.private_key, max_workers=1, chunk_size=2))
+        self.assertEqual(payloads, [address + signature + msg for (address, signature, msg) in sign_txs(txs, self.private_key)])
+
+    def test_instruction_data_from_raw(self):
+        raw = signed_raw_trx(self.private_key.to_bytes())
+        (address, _, msg) = make_instruction_data_from_tx('0x' + raw.hex())
+        self.assertEqual(address, self.address)
+        self.assertEqual(msg, Trx.fromString(raw).get_msg())
+
+
+class RecoverSendersTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.private_key = keys.PrivateKey(os.urandom(32))
+        cls.address = cls.private_key.public_key.to_canonical_address()
+
+    def test_recover_senders(self):
+        raws = [signed_raw_trx(self.private_key.to_bytes(), nonce=nonce) for nonce in range(1, 4)]
+        expected = [self.address] * len(raws)
+        self.assertEqual(recover_senders(raws), expected)
+        self.assertEqual(recover_senders([raw.hex() for raw in raws]), expected)
+        self.assertEqual(recover_senders([Trx.fromString(raw) for raw in raws]), expected)
+
+    def test_recover_senders_in_workers(self):
+        raws = [signed_raw_trx(self.private_key.to_bytes(), nonce=nonce, data=os.urandom(8))
+                for nonce in range(PARALLEL_RECOVERY_THRESHOLD)]
+        self.assertEqual(recover_senders(raws), [self.address] * len(raws))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -21,19 +21,19 @@ class FundReturnTest(unittest.TestCase):
     def create_account(self, seed):
         bytes_seed = sha256(bytes(seed, 'utf8'))
         new_acc = Account(bytes_seed)
-        trx = client.request_airdrop(new_acc.public_key(), 10 * 10 ** 9)
-        confirm_transaction(client, trx['result'])
+        trx = solana_config.client.request_airdrop(new_acc.public_key(), 10 * 10 ** 9)
+        confirm_transaction(solana_config.client, trx['result'])
         return new_acc
 
 
     def create_account_with_seed_from_acc(self, acc, seed):
-        storage = PublicKey(sha256(bytes(acc.public_key()) + bytes(seed, 'utf8') + bytes(PublicKey(EVM_LOADER))).digest())
+        storage = PublicKey(sha256(bytes(acc.public_key()) + bytes(seed, 'utf8') + bytes(PublicKey(solana_config.evm_loader))).digest())
         print("Storage", storage)
 
         if getBalance(storage) == 0:
             trx = TransactionWithComputeBudget()
-            trx.add(createAccountWithSeed(acc.public_key(), acc.public_key(), seed, 10**9, 128*1024, PublicKey(EVM_LOADER)))
-            send_transaction(client, trx, acc)
+            trx.add(createAccountWithSeed(acc.public_key(), acc.public_key(), seed, 10**9, 128*1024, PublicKey(solana_config.evm_loader)))
+            send_transaction(solana_config.client, trx, acc)
 
         return storage
 
@@ -41,13 +41,13 @@ class FundReturnTest(unittest.TestCase):
     def call_refund_tx(self, del_key, acc, seed, signer):
         trx = TransactionWithComputeBudget()
         trx.add(TransactionInstruction(
-            program_id=EVM_LOADER,
+            program_id=solana_config.evm_loader,
             data=bytearray.fromhex("10") + bytes(seed, 'utf8'),
             keys=[
                 AccountMeta(pubkey=del_key, is_signer=False, is_writable=True),
                 AccountMeta(pubkey=acc.public_key(), is_signer=(signer==acc), is_writable=True),
             ]))
-        return send_transaction(client, trx, signer)
+        return send_transaction(solana_config.client, trx, signer)
 
 
     def test_creator_not_signer(self):
@@ -0,0 +1,86 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from neon_cli_worker import *
+
+# answers the commands of the tests the way `neon-cli server` answers neon-cli commands
+FAKE_NEON_CLI = """#!{python}
+import json, os, sys
+
+assert sys.argv[1:] == ["server"]
+for line in sys.stdin:
+    args = json.loads(line)
+    exit_code = 0
+    if args[0] == "echo":
+        sys.stdout.write(args[1])
+    elif args[0] == "pid":
+        sys.stdout.write(str(os.getpid()))
+    elif args[0] == "fail":
+        sys.stdout.write("bad request")
+        exit_code = int(args[1])
+    elif args[0] == "exit":
+        sys.stdout.write("exiting\\n")
+        sys.stdout.flush()
+        os._exit(int(args[1]))
+    sys.stdout.write("\\n" + json.dumps({{"neon_cli_server": {{"exit_code": exit_code}}}}, separators=(",", ":")) + "\\n")
+    sys.stdout.flush()
+"""
+
+
+class NeonCliWorkerTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        cls.path = os.path.join(cls.directory, "neon-cli")
+        with open(cls.path, "w") as script:
+            script.write(FAKE_NEON_CLI.format(python=sys.executable))
+        os.chmod(cls.path, 0o755)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.directory)
+
+    def setUp(self):
+        self.worker = NeonCliWorker(self.path)
+
+    def tearDown(self):
+        self.worker.stop()
+
+    def test_output(self):
+        self.assertEqual(self.worker.run(["echo", "0x5"]), (0, "0x5"))
+        self.assertEqual(self.worker.run(["echo", "{}\n"]), (0, "{}\n"))
+        self.assertEqual(self.worker.run(["echo", "two\nlines"]), (0, "two\nlines"))
+        self.assertEqual(self.worker.run(["fail", "2"]), (2, "bad request"))
+
+    def test_process_reused(self):
+        pid = self.worker.run(["pid"])[1]
+        self.assertEqual(self.worker.run(["pid"])[1], pid)
+        self.assertEqual(pid, str(self.worker.process.pid))
+
+    def test_restart_after_exit(self):
+        pid = self.worker.run(["pid"])[1]
+        # the command which kills the process fails alone
+        self.assertEqual(self.worker.run(["exit", "3"]), (3, "exiting\n"))
+        self.assertNotEqual(self.worker.run(["pid"])[1], pid)
+
+    def test_pool(self):
+        pool = NeonCliPool(size=2, path=self.path)
+        try:
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                outputs = list(executor.map(lambda index: pool.check_output(["echo", str(index)]), range(20)))
+            self.assertEqual(outputs, [str(index) for index in range(20)])
+            with self.assertRaises(subprocess.CalledProcessError) as raised:
+                pool.check_output(["fail", "1"])
+            self.assertEqual((raised.exception.returncode, raised.exception.output), (1, "bad request"))
+        finally:
+            while not pool.workers.empty():
+                pool.workers.get().stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -38,21 +38,21 @@ def create_holder_account(operator_acc):
     seed = keccak_256(b'holder' + holder_id_bytes).hexdigest()[:32]
     account_address = accountWithSeed(operator_acc.public_key(), seed, PublicKey(evm_loader_id))
     if get_recent_account_balance(account_address) == 0:
-        minimum_balance = client.get_minimum_balance_for_rent_exemption(128*1024, commitment=Confirmed)["result"]
+        minimum_balance = solana_config.rent_calculator.minimum_balance(128*1024)
         trx = TransactionWithComputeBudget()
         trx.add(createAccountWithSeed(operator_acc.public_key(), operator_acc.public_key(), seed, minimum_balance, 128*1024, PublicKey(evm_loader_id)))
-        send_transaction(client, trx, operator_acc)
+        send_transaction(solana_config.client, trx, operator_acc)
     return account_address
 
 
 def create_storage_account(operator_acc, seed):
     storage = PublicKey(sha256(bytes(operator_acc.public_key()) + bytes(seed, 'utf8') + bytes(PublicKey(evm_loader_id))).digest())
     print("Storage", storage)
-    minimum_balance = client.get_minimum_balance_for_rent_exemption(128*1024, commitment=Confirmed)["result"]
+    minimum_balance = solana_config.rent_calculator.minimum_balance(128*1024)
     if get_recent_account_balance(storage) == 0:
         trx = TransactionWithComputeBudget()
         trx.add(createAccountWithSeed(operator_acc.public_key(), operator_acc.public_key(), seed, minimum_balance, 128*1024, PublicKey(evm_loader_id)))
-        send_transaction(client, trx, operator_acc)
+        send_transaction(solana_config.client, trx, operator_acc)
     return storage
 
 
@@ -303,11 +303,10 @@ class EventTest(unittest.TestCase):
                     AccountMeta(pubkey=holder, is_signer=False, is_writable=True),
                     AccountMeta(pubkey=self.acc.public_key(), is_signer=True, is_writable=False),
                 ]))
-            receipts.append(http_client.send_transaction(trx, self.acc, opts=TxOpts(skip_confirmation=True, preflight_commitment="confirmed"))["result"])
+            receipts.append(send_signed_transaction(http_client, trx, self.acc, opts=TxOpts(skip_confirmation=True, preflight_commitment="confirmed"))["result"])
             offset += len(part)
 
-        for rcpt in receipts:
-            confirm_transaction(http_client, rcpt)
+        confirm_transactions(http_client, receipts)
 
     def call_partial_signed(self, input, contract_eth, contract, code):
         tx = {'to': contract_eth, 'value': 0, 'gas': 999_999_999, 'gasPrice': 0,
@@ -450,7 +449,7 @@ class EventTest(unittest.TestCase):
     def test_02_ecrecover(self):
         print('\ntest_02_ecrecover')
         tx = {'to': self.reId_caller_eth, 'value': 0, 'gas': 999999999, 'gasPrice': 0,
-              'nonce': getTransactionCount(client, self.caller), 'data': bytes().fromhex("001122"), 'chainId': 111}
+              'nonce': getTransactionCount(solana_config.client, self.caller), 'data': bytes().fromhex("001122"), 'chainId': 111}
 
         signed_tx = w3.eth.account.sign_transaction(tx, self.acc.secret_key())
         _trx = Trx.fromString(signed_tx.rawTransaction)
@@ -0,0 +1,113 @@
+import threading
+import time
+import unittest
+
+from base58 import b58encode
+from solana.account import Account
+from solana.system_program import TransferParams, transfer
+from solana.transaction import Transaction
+
+from fake_node import FakeNode, RpcError
+from pipelined_sender import *
+
+
+def transfer_trx(sender: Account, lamports: int) -> Transaction:
+    return Transaction().add(transfer(TransferParams(from_pubkey=sender.public_key(), to_pubkey=Account(2).public_key(),
+                                                     lamports=lamports)))
+
+
+def signature(trx: Transaction) -> str:
+    return b58encode(trx.signature()).decode()
+
+
+class PipelinedSenderTest(unittest.TestCase):
+    def setUp(self):
+        self.node = FakeNode(auto_confirm=False).start()
+        self.client = Client(self.node.url)
+        self.payer = Account(1)
+
+    def tearDown(self):
+        self.node.stop()
+
+    def wait_sent(self, count):
+        deadline = time.monotonic() + 5
+        while len(self.node.transactions) < count and time.monotonic() < deadline:
+            time.sleep(0.01)
+        # give a transaction which shouldn't be sent a chance to be
+        time.sleep(0.05)
+        self.assertEqual(len(self.node.transactions), count)
+        return list(self.node.transactions)
+
+    def test_ordering_key(self):
+        with PipelinedSender(self.client) as sender:
+            (first, second, independent) = [transfer_trx(self.payer, lamports) for lamports in (1, 2, 3)]
+            futures = [sender.submit(first, self.payer, ordering_key="storage"),
+                       sender.submit(second, self.payer, ordering_key="storage"),
+                       sender.submit(independent, self.payer)]
+            # the second transaction waits for the first one with the same key
+            self.assertEqual(set(self.wait_sent(2)), {signature(first), signature(independent)})
+            self.node.confirm(signature(first))
+            self.assertEqual(self.wait_sent(3)[2], signature(second))
+            self.assertFalse(futures[1].done())
+            for trx in (second, independent):
+                self.node.confirm(signature(trx))
+            outcomes = sender.wait()
+        self.assertEqual([outcome.trx for outcome in outcomes], [first, second, independent])
+        self.assertTrue(all(outcome.ok for outcome in outcomes))
+        self.assertEqual([future.result() for future in futures], outcomes)
+
+    def test_window(self):
+        sender = PipelinedSender(self.client, window=2)
+        for lamports in (1, 2):
+            sender.submit(transfer_trx(self.payer, lamports), self.payer)
+        sent = self.wait_sent(2)
+        # the window is full, the third submission blocks until a transaction is confirmed
+        submitted = threading.Event()
+
+        def submit():
+            sender.submit(transfer_trx(self.payer, 3), self.payer)
+            submitted.set()
+
+        threading.Thread(target=submit, daemon=True).start()
+        self.assertFalse(submitted.wait(0.1))
+        self.node.confirm(sent[0])
+        self.assertTrue(submitted.wait(5))
+        sent = self.wait_sent(3)
+        for tx_sig in sent[1:]:
+            self.node.confirm(tx_sig)
+        sender.close()
+
+    def test_failures(self):
+        err = {"InstructionError": [0, "Custom"]}
+        with PipelinedSender(self.client) as sender:
+            sender.submit(transfer_trx(self.payer, 1), self.payer)
+            (sent,) = self.wait_sent(1)
+            self.node.confirm(sent, err=err)
+            failed = next(sender.as_completed())
+
+            def rejected(params):
+                raise RpcError("Transaction simulation failed")
+
+            self.node.handlers["sendTransaction"] = rejected
+            sender.submit(transfer_trx(self.payer, 2), self.payer)
+            outcomes = sender.wait()
+        self.assertEqual((failed.signature, failed.error, failed.ok), (sent, err, False))
+        self.assertEqual(outcomes[0], failed)
+        self.assertIsNone(outcomes[1].signature)
+        self.assertIsInstance(outcomes[1].error, Exception)
+
+    def test_as_completed(self):
+        with PipelinedSender(self.client) as sender:
+            trxs = [transfer_trx(self.payer, lamports) for lamports in (1, 2)]
+            for trx in trxs:
+                sender.submit(trx, self.payer)
+            self.wait_sent(2)
+            self.node.confirm(signature(trxs[1]))
+            completed = sender.as_completed()
+            self.assertIs(next(completed).trx, trxs[1])
+            self.node.confirm(signature(trxs[0]))
+            self.assertIs(next(completed).trx, trxs[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
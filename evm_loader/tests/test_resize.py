@@ -26,7 +26,7 @@ class ResizeTest(unittest.TestCase):
 
         seed = b58encode(ACCOUNT_SEED_VERSION + os.urandom(20)).decode('utf8')
         code_account_new = accountWithSeed(self.acc.public_key(), seed, PublicKey(evm_loader_id))
-        minimum_balance = client.get_minimum_balance_for_rent_exemption(size)["result"]
+        minimum_balance = solana_config.rent_calculator.minimum_balance(size)
 
         create_with_seed = createAccountWithSeed(self.acc.public_key(), self.acc.public_key(), seed, minimum_balance, size, PublicKey(evm_loader_id))
         resize = TransactionInstruction(
@@ -28,7 +28,7 @@ def create_account_with_seed(client, funding, base, seed, storage_size):
     account = accountWithSeed(base.public_key(), seed, PublicKey(evm_loader_id))
 
     if client.get_balance(account, commitment=Confirmed)['result']['value'] == 0:
-        minimum_balance = client.get_minimum_balance_for_rent_exemption(storage_size, commitment=Confirmed)["result"]
+        minimum_balance = solana_config.rent_calculator.minimum_balance(storage_size)
         print("Minimum balance required for account {}".format(minimum_balance))
 
         trx = TransactionWithComputeBudget()
@@ -179,7 +179,7 @@ class RW_Locking_Test(unittest.TestCase):
         return send_transaction(client, trx, acc)
 
     def get_call_parameters(self, input, acc, caller, caller_ether):
-        nonce = getTransactionCount(client, caller)
+        nonce = getTransactionCount(client, caller, account_cache)
         tx = {'to': self.reId_eth, 'value': 0, 'gas': 9999999999, 'gasPrice': 0,
             'nonce': nonce, 'data': input, 'chainId': 111}
         (from_addr, sign, msg) = make_instruction_data_from_tx(tx, acc.secret_key())
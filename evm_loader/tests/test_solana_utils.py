@@ -0,0 +1,411 @@
+import itertools
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from solana.system_program import TransferParams, transfer
+
+import solana_utils
+from fake_node import FakeNode
+from solana_utils import *
+
+
+def transfer_trx(sender: Account, recipient: Account) -> Transaction:
+    return Transaction().add(transfer(TransferParams(from_pubkey=sender.public_key(),
+                                                     to_pubkey=recipient.public_key(), lamports=1)))
+
+
+class SolanaConfigTest(unittest.TestCase):
+    CLI_CONFIG = """---
+json_rpc_url: "http://solana:8899"
+websocket_url: ""
+keypair_path: /root/.config/solana/id.json
+address_labels:
+  "11111111111111111111111111111111": System Program
+commitment: confirmed
+"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.path = os.path.join(self.directory, "config.yml")
+
+    def config(self, text=None):
+        if text is not None:
+            with open(self.path, "w") as f:
+                f.write(text)
+        return SolanaConfig(environ={"SOLANA_URL": "http://solana:8899"}, cli_config_path=self.path)
+
+    def test_cli_config(self):
+        config = self.config(self.CLI_CONFIG)
+        self.assertEqual(config.cli_config["json_rpc_url"], "http://solana:8899")
+        self.assertEqual(config.cli_config["websocket_url"], "")
+        self.assertEqual(config.cli_config["address_labels"], {"11111111111111111111111111111111": "System Program"})
+        self.assertEqual(config.keypair_path, "/root/.config/solana/id.json")
+
+    def test_missing_cli_config(self):
+        for config in (self.config(), self.config(""), self.config("---\n")):
+            self.assertEqual(config.cli_config, {})
+            self.assertEqual(config.keypair_path, SOLANA_DEFAULT_KEYPAIR)
+
+    def test_settings(self):
+        config = self.config()
+        self.assertEqual(config.solana_url, "http://solana:8899")
+        self.assertIsNone(config.evm_loader)
+        self.assertEqual(config.client._provider.endpoint_uri, "http://solana:8899")
+
+
+class ProgramAddressTest(unittest.TestCase):
+    PROGRAM_ID = "53DfF883gyixYNXnM7s5xhdeyV8mVk9T4i2hGV9vG9io"
+    # make_solana_program_address of neon-cli (the first bumps of both are on the curve)
+    VECTORS = [
+        (bytes.fromhex("ff" * 20), ("HAR9YUmjADbYQotnHmbujrnbKdNMAMLxhTwcmjS1igyX", 252)),
+        (bytes.fromhex("c1566af4699928fdf9be097ca3dc47ece39f8f8e"), ("DfyNbtSY8dryLAanVLAbjpsFWsDSPuanSBsqXxPtFavz", 253)),
+    ]
+
+    def setUp(self):
+        solana_utils._program_addresses.clear()
+
+    def test_ether2program(self):
+        for (ether, expected) in self.VECTORS:
+            self.assertEqual(ether2program(ether, self.PROGRAM_ID), expected)
+            self.assertEqual(ether2program(ether.hex(), self.PROGRAM_ID), expected)
+            self.assertEqual(ether2program('0x' + ether.hex(), PublicKey(self.PROGRAM_ID)), expected)
+
+    def test_ether2programs(self):
+        ethers = [ether for (ether, _) in self.VECTORS]
+        self.assertEqual(ether2programs(ethers + ethers[:1], self.PROGRAM_ID),
+                         [expected for (_, expected) in self.VECTORS + self.VECTORS[:1]])
+
+    def test_ether2programs_in_workers(self):
+        ethers = [index.to_bytes(20, 'big') for index in range(PARALLEL_DERIVATION_THRESHOLD)]
+        ethers[7:9] = [ether for (ether, _) in self.VECTORS]
+        derived = ether2programs(ethers, self.PROGRAM_ID)
+        self.assertEqual(derived[7:9], [expected for (_, expected) in self.VECTORS])
+        self.assertEqual(len(set(derived)), len(ethers))
+
+
+class EmulationRequestTest(unittest.TestCase):
+    def test_emulation_request(self):
+        (sender, contract) = (bytes([0x11]) * 20, bytes([0x22]) * 20)
+        self.assertEqual(neon_cli._emulation_request(sender, contract, bytes.fromhex("3917b3df"), 16),
+                         "0x{} 0x{} 0x3917b3df 0x10".format("11" * 20, "22" * 20))
+        self.assertEqual(neon_cli._emulation_request("0x" + "11" * 20, "deploy"), "0x{} deploy none".format("11" * 20))
+        self.assertEqual(neon_cli._emulation_request("11" * 20, "22" * 20, "", 0),
+                         "{} {} none 0x0".format("11" * 20, "22" * 20))
+
+
+class InstructionTemplateTest(unittest.TestCase):
+    PROGRAM_ID = "53DfF883gyixYNXnM7s5xhdeyV8mVk9T4i2hGV9vG9io"
+
+    def test_instruction_template(self):
+        keys = [Account(index + 1).public_key() for index in range(6)]
+        (caller, operator, storage, contract, code, pool_address) = keys
+        pool_index = (3).to_bytes(4, 'little')
+        instruction = create_neon_evm_instr_20_continue(self.PROGRAM_ID, caller, operator, storage, contract, code,
+                                                        pool_index, pool_address, 500, writable_code=False)
+        self.assertEqual(instruction.data, bytes.fromhex("14") + pool_index + (500).to_bytes(8, 'little'))
+        self.assertEqual([meta.pubkey for meta in instruction.keys],
+                         [storage, operator, pool_address, caller, SYSTEM_PROGRAM_ID, self.PROGRAM_ID,
+                          contract, code, caller, TOKEN_PROGRAM_ID])
+        self.assertFalse(instruction.keys[7].is_writable)
+
+        template = neon_evm_instr_20_template(self.PROGRAM_ID, caller, operator, storage, contract, code, pool_index,
+                                              pool_address, False)
+        self.assertIs(template, neon_evm_instr_20_template(self.PROGRAM_ID, caller, operator, storage, contract, code,
+                                                           bytearray(pool_index), pool_address, False))
+
+        # Transaction.compile_message updates the metas of an instruction, the template isn't affected
+        instruction.keys[7].is_writable = True
+        self.assertFalse(template.step(500).keys[7].is_writable)
+        self.assertEqual(template.step(501).data, bytes.fromhex("14") + pool_index + (501).to_bytes(8, 'little'))
+
+
+class AccountCacheTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.node = FakeNode().start()
+        cls.client = Client(cls.node.url)
+        cls.keys = [Account(index + 1).public_key() for index in range(5)]
+        for (index, key) in enumerate(cls.keys):
+            cls.node.set_account(key, data=bytes([index]), lamports=index + 1)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.node.stop()
+
+    def setUp(self):
+        self.node.handlers.clear()
+        self.node.slot = 1
+        self.cache = AccountCache(maxsize=3)
+
+    def fetches(self):
+        return self.node.count("getMultipleAccounts")
+
+    def test_read_through(self):
+        fetches = self.fetches()
+        self.assertEqual(self.cache.get(self.client, self.keys[0]).data, bytes([0]))
+        self.assertEqual([info.lamports for info in self.cache.get_many(self.client, self.keys[:2])], [1, 2])
+        self.assertEqual(self.fetches() - fetches, 2)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 2))
+        # missing accounts are read again
+        self.assertIsNone(self.cache.get(self.client, Account(100).public_key()))
+        self.assertEqual(len(self.cache), 2)
+
+    def test_lru(self):
+        self.cache.get_many(self.client, self.keys[:3])
+        self.cache.get(self.client, self.keys[0])
+        self.cache.get(self.client, self.keys[3])
+        self.assertEqual(len(self.cache), 3)
+        fetches = self.fetches()
+        self.cache.get_many(self.client, [self.keys[0], self.keys[2], self.keys[3]])
+        self.assertEqual(self.fetches(), fetches)
+        # the least recently used account was evicted
+        self.cache.get(self.client, self.keys[1])
+        self.assertEqual(self.fetches(), fetches + 1)
+
+    def test_min_slot(self):
+        self.assertEqual(self.cache.get(self.client, self.keys[0]).slot, 1)
+        self.node.slot = 2
+        self.assertEqual(self.cache.get(self.client, self.keys[0]).slot, 1)
+        self.assertEqual(self.cache.get(self.client, self.keys[0], min_slot=2).slot, 2)
+
+    def test_invalidate(self):
+        self.cache.get_many(self.client, self.keys[:3])
+        self.cache.invalidate_transaction(transfer_trx(Account(1), Account(2)))
+        self.assertEqual(len(self.cache), 1)
+        self.cache.clear()
+        self.assertEqual(len(self.cache), 0)
+
+    def test_invalidated_while_fetching(self):
+        def invalidating(params):
+            self.cache.invalidate([self.keys[0]])
+            return self.node._rpc_getMultipleAccounts(params)
+
+        self.node.handlers["getMultipleAccounts"] = invalidating
+        infos = self.cache.get_many(self.client, self.keys[:2])
+        self.assertEqual([info.data for info in infos], [bytes([0]), bytes([1])])
+        # the data read before the invalidation of its account is returned but not cached
+        self.node.handlers.clear()
+        fetches = self.fetches()
+        self.cache.get_many(self.client, self.keys[:2])
+        self.assertEqual(self.node.params("getMultipleAccounts")[fetches:], [[[str(self.keys[0])], {
+            "encoding": "base64", "commitment": Confirmed}]])
+
+
+class RentCalculatorTest(unittest.TestCase):
+    def setUp(self):
+        self.node = FakeNode().start()
+        self.set_rent(lamports_per_byte_year=3480)
+        self.calculator = RentCalculator(Client(self.node.url))
+
+    def tearDown(self):
+        self.node.stop()
+
+    def set_rent(self, lamports_per_byte_year):
+        self.node.set_account(rentid, data=RENT_LAYOUT.build(dict(
+            lamports_per_byte_year=lamports_per_byte_year, exemption_threshold=2.0, burn_percent=50)))
+
+    def test_minimum_balance(self):
+        self.assertEqual(self.calculator.minimum_balance(0), 890880)
+        self.assertEqual(self.calculator.minimum_balance(165), 2039280)
+        self.assertEqual(self.calculator.minimum_balance(MINT_LEN), 1461600)
+        self.assertEqual((self.node.count("getEpochInfo"), self.node.count("getAccountInfo")), (1, 1))
+
+    def test_refresh_in_next_epoch(self):
+        # the epoch is over, the sysvar is read again on the next call
+        self.node.slot = 432000
+        self.assertEqual(self.calculator.minimum_balance(0), 890880)
+        self.set_rent(lamports_per_byte_year=6960)
+        self.assertEqual(self.calculator.minimum_balance(0), 890880 * 2)
+        self.assertEqual(self.node.count("getAccountInfo"), 2)
+
+
+class ReceiptTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.node = FakeNode().start()
+        cls.client = Client(cls.node.url)
+        cls.sender = Account(1)
+        # a message signed twice with one blockhash would wait for the next blockhash
+        cls.recipients = (Account(index) for index in itertools.count(10))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.node.stop()
+
+    def send(self, count):
+        return [send_transaction(self.client, transfer_trx(self.sender, next(self.recipients)), self.sender)
+                for _ in range(count)]
+
+    def fetches(self):
+        return self.node.count("getConfirmedTransaction")
+
+    def test_fetched_on_first_access(self):
+        fetches = self.fetches()
+        (receipt,) = self.send(1)
+        self.assertFalse(receipt.fetched)
+        self.assertEqual(self.fetches(), fetches)
+        self.assertIn(receipt.signature, repr(receipt))
+
+        self.assertEqual(receipt["result"]["transaction"]["signatures"], [receipt.signature])
+        self.assertEqual(receipt.result["meta"]["err"], None)
+        self.assertEqual(dict(receipt), receipt.response)
+        self.assertEqual(self.fetches(), fetches + 1)
+
+    def test_fetch_receipts(self):
+        receipts = self.send(3)
+        receipts[0].response
+        fetches = self.fetches()
+        self.assertIs(fetchReceipts(receipts), receipts)
+        self.assertTrue(all(receipt.fetched for receipt in receipts))
+        self.assertEqual(self.fetches(), fetches + 2)
+
+    def test_get_confirmed_transactions(self):
+        signatures = [receipt.signature for receipt in self.send(3)]
+        responses = getConfirmedTransactions(self.client, signatures, max_workers=2)
+        self.assertEqual([response["result"]["transaction"]["signatures"][0] for response in responses], signatures)
+
+
+class ComputeBudgetSizerTest(unittest.TestCase):
+    def setUp(self):
+        self.node = FakeNode().start()
+        self.simulation = {"err": None, "unitsConsumed": 100000,
+                           "logs": ["Program log: Total memory occupied: 40000", "Program log: Total memory occupied: 1"]}
+        self.node.handlers["simulateTransaction"] = lambda params: self.node._context(self.simulation)
+        self.sizer = ComputeBudgetSizer(Client(self.node.url), margin=0.5)
+        self.sender = Account(1)
+
+    def tearDown(self):
+        self.node.stop()
+
+    def budget_trx(self, transfers=1):
+        trx = TransactionWithComputeBudget(additional_fee=5, fit=True)
+        for index in range(transfers):
+            trx.add(transfer_trx(self.sender, Account(index + 2)).instructions[0])
+        return trx
+
+    def test_fit(self):
+        trx = self.budget_trx()
+        transfer_instruction = trx.instructions[2]
+        self.assertIs(self.sizer.fit(trx, self.sender), trx)
+        # units and heap frame with the margin, resized in place
+        self.assertEqual([instr.data for instr in trx.instructions[:2]],
+                         [ComputeBudget.requestUnits(150000, 5).data, ComputeBudget.requestHeapFrame(59 * 1024).data])
+        self.assertIs(trx.instructions[2], transfer_instruction)
+        self.assertEqual((trx.signatures, trx.fit_compute_budget), ([], False))
+
+    def test_cached_per_shape(self):
+        self.sizer.fit(self.budget_trx(), self.sender)
+        self.simulation["unitsConsumed"] = 200000
+        trx = self.sizer.fit(self.budget_trx(), self.sender)
+        self.assertEqual(trx.instructions[0].data, ComputeBudget.requestUnits(150000, 5).data)
+        self.assertEqual(self.node.count("simulateTransaction"), 1)
+        trx = self.sizer.fit(self.budget_trx(transfers=2), self.sender)
+        self.assertEqual(trx.instructions[0].data, ComputeBudget.requestUnits(300000, 5).data)
+        self.assertEqual(self.node.count("simulateTransaction"), 2)
+
+    def test_bounds(self):
+        self.simulation.update(unitsConsumed=MAX_UNITS, logs=None)
+        trx = self.sizer.fit(self.budget_trx(), self.sender)
+        self.assertEqual([instr.data for instr in trx.instructions[:2]],
+                         [ComputeBudget.requestUnits(MAX_UNITS, 5).data, ComputeBudget.requestHeapFrame(MIN_HEAP_FRAME).data])
+
+    def test_failed_simulation(self):
+        self.simulation["err"] = {"InstructionError": [2, "Custom"]}
+        trx = self.sizer.fit(self.budget_trx(), self.sender)
+        self.assertEqual(trx.instructions[0].data, ComputeBudget.requestUnits(DEFAULT_UNITS, 5).data)
+        # the failure isn't cached
+        self.sizer.fit(self.budget_trx(), self.sender)
+        self.assertEqual(self.node.count("simulateTransaction"), 2)
+
+    def test_no_budget_instructions(self):
+        trx = transfer_trx(self.sender, Account(2))
+        self.sizer.fit(trx, self.sender)
+        self.assertEqual(len(trx.instructions), 1)
+
+
+class KeypairFactoryTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_deterministic(self):
+        (first, second) = (KeypairFactory(b"seed"), KeypairFactory(b"seed"))
+        keys = [str(account.public_key()) for account in first.new_many(3)]
+        self.assertEqual([str(second.new().public_key()) for _ in range(3)], keys)
+        self.assertEqual(len(set(keys)), 3)
+        self.assertEqual(first.new().secret_key(), sha256(b"seed" + (3).to_bytes(8, "little")).digest())
+        self.assertNotEqual(KeypairFactory().new().public_key(), KeypairFactory().new().public_key())
+
+    def test_save_and_load(self):
+        path = os.path.join(self.directory, "keys")
+        factory = KeypairFactory(keep=True)
+        accounts = factory.new_many(3) + [factory.new()]
+        factory.save(path)
+        self.assertEqual(os.path.getsize(path), len(accounts) * KEYPAIR_SECRET_SIZE)
+        self.assertEqual([account.public_key() for account in KeypairFactory.load(path)],
+                         [account.public_key() for account in accounts])
+
+    def test_save_without_keep(self):
+        factory = KeypairFactory()
+        factory.new()
+        self.assertEqual(factory.accounts, [])
+        with self.assertRaises(Exception):
+            factory.save(os.path.join(self.directory, "keys"))
+
+    def test_random_account_file(self):
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(self.directory)
+        account = RandomAccount(factory=KeypairFactory(b"seed"))
+        self.assertEqual(os.listdir(self.directory), [])
+        # the keypair file is written on first use, in the solana-keygen format
+        path = account.get_path()
+        self.assertEqual(account.get_path(), path)
+        with open(path) as f:
+            self.assertEqual(len(json.load(f)), 64)
+        self.assertEqual(RandomAccount(path).get_acc().public_key(), account.get_acc().public_key())
+
+
+class SendSignedTransactionTest(unittest.TestCase):
+    def setUp(self):
+        self.node = FakeNode().start()
+        self.client = Client(self.node.url)
+        (self.sender, self.recipient) = (Account(1), Account(2))
+        for account in (self.sender, self.recipient):
+            self.node.set_account(account.public_key(), lamports=10 ** 9)
+        account_cache.clear()
+
+    def tearDown(self):
+        account_cache.clear()
+        self.node.stop()
+
+    def read_accounts(self):
+        account_cache.get_many(self.client, [self.sender.public_key(), self.recipient.public_key()])
+        self.assertEqual(len(account_cache), 2)
+
+    def test_invalidates_writable_accounts(self):
+        self.read_accounts()
+        send_signed_transaction(self.client, transfer_trx(self.sender, self.recipient), self.sender)
+        self.assertEqual(len(account_cache), 0)
+
+    def test_invalidates_again_when_confirmed(self):
+        self.node.auto_confirm = False
+        self.read_accounts()
+        result = send_signed_transaction(self.client, transfer_trx(self.sender, self.recipient), self.sender,
+                                         opts=TxOpts(skip_confirmation=True))
+        self.assertEqual(len(account_cache), 0)
+        # read again before the transaction lands
+        self.read_accounts()
+        self.node.confirm(result["result"])
+        deadline = time.monotonic() + 5
+        while len(account_cache) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(len(account_cache), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -20,7 +20,7 @@ class PrecompilesTests(unittest.TestCase):
     def setUpClass(cls):
         print("\ntest_solidity_precompiles.py setUpClass")
 
-        cls.token = SplToken(solana_url)
+        cls.token = SplToken(solana_config.solana_url)
         wallet = OperatorAccount(operator1_keypair_path())
         cls.loader = EvmLoader(wallet, evm_loader_id)
         cls.acc = wallet.get_acc()
@@ -63,7 +63,7 @@ class PrecompilesTests(unittest.TestCase):
             return b58decode(result['meta']['innerInstructions'][0]['instructions'][-1]['data'])[8+2:].hex()
         else:
             trx = self.make_transactions(data)
-            result = send_transaction(client, trx, self.acc)
+            result = send_transaction(solana_config.client, trx, self.acc)
             self.get_measurements(result)
             result = result["result"]
             print('result:', result)
@@ -132,7 +132,7 @@ class PrecompilesTests(unittest.TestCase):
             'value': 0,
             'gas': 999999999,
             'gasPrice': 0,
-            'nonce': getTransactionCount(client, self.caller),
+            'nonce': getTransactionCount(solana_config.client, self.caller),
             'data': call_data,
             'chainId': 111
         }
@@ -206,7 +206,7 @@ class PrecompilesTests(unittest.TestCase):
         if getBalance(storage) == 0:
             trx = TransactionWithComputeBudget()
             trx.add(createAccountWithSeed(self.acc.public_key(), self.acc.public_key(), seed, 10**9, 128*1024, PublicKey(evm_loader_id)))
-            client.send_transaction(trx, self.acc, opts=TxOpts(skip_confirmation=False, preflight_commitment="confirmed"))
+            solana_config.client.send_transaction(trx, self.acc, opts=TxOpts(skip_confirmation=False, preflight_commitment="confirmed"))
 
         return storage
 
@@ -225,16 +225,15 @@ class PrecompilesTests(unittest.TestCase):
                     AccountMeta(pubkey=holder, is_signer=False, is_writable=True),
                     AccountMeta(pubkey=self.acc.public_key(), is_signer=True, is_writable=False),
                 ]))
-            receipts.append(client.send_transaction(trx, self.acc, opts=TxOpts(skip_confirmation=True, preflight_commitment="confirmed"))["result"])
+            receipts.append(send_signed_transaction(solana_config.client, trx, self.acc, opts=TxOpts(skip_confirmation=True, preflight_commitment="confirmed"))["result"])
             offset += len(part)
 
-        for rcpt in receipts:
-            confirm_transaction(client, rcpt)
+        confirm_transactions(solana_config.client, receipts)
 
 
     def call_with_holder_account(self, input):
         tx = {'to': self.eth_contract, 'value': 0, 'gas': 999999999, 'gasPrice': 0,
-            'nonce': getTransactionCount(client, self.caller), 'data': input, 'chainId': 111}
+            'nonce': getTransactionCount(solana_config.client, self.caller), 'data': input, 'chainId': 111}
 
         (from_addr, sign, msg) = make_instruction_data_from_tx(tx, self.acc.secret_key())
         assert (from_addr == self.caller_ether)
@@ -248,13 +247,13 @@ class PrecompilesTests(unittest.TestCase):
 
         trx = TransactionWithComputeBudget()
         trx.add(self.sol_instr_22_partial_call_from_account(holder, storage, 0))
-        send_transaction(client, trx, self.acc)
+        send_transaction(solana_config.client, trx, self.acc)
 
         while (True):
             print("Continue")
             trx = TransactionWithComputeBudget()
             trx.add(self.sol_instr_20_continue(storage, 400))
-            result = send_transaction(client, trx, self.acc)
+            result = send_transaction(solana_config.client, trx, self.acc)
 
             self.get_measurements(result)
             result = result["result"]
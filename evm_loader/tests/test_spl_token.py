@@ -0,0 +1,105 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import solana_utils
+from fake_node import FakeNode, status
+from solana_utils import *
+
+
+class SplTokenTest(unittest.TestCase):
+    DECIMALS = 2
+
+    def setUp(self):
+        self.node = FakeNode().start()
+        self.directory = tempfile.mkdtemp()
+        # the wallet of the solana CLI config pays the fees by default
+        self.wallet = Account(1)
+        wallet_path = os.path.join(self.directory, "id.json")
+        with open(wallet_path, "w") as f:
+            json.dump(list(self.wallet.secret_key()), f)
+        config_path = os.path.join(self.directory, "config.yml")
+        with open(config_path, "w") as f:
+            f.write("---\njson_rpc_url: \"{}\"\nkeypair_path: {}\n".format(self.node.url, wallet_path))
+        config = mock.patch.object(solana_utils, "solana_config",
+                                   SolanaConfig(environ={"SOLANA_URL": self.node.url}, cli_config_path=config_path))
+        config.start()
+        self.addCleanup(config.stop)
+
+        self.owner = Account(2)
+        self.mint = Account(3).public_key()
+        self.node.set_account(self.mint, owner=TOKEN_PROGRAM_ID, data=SPL_MINT_LAYOUT.build(dict(
+            mint_authority_option=1, mint_authority=bytes(self.owner.public_key()), supply=0, decimals=self.DECIMALS,
+            is_initialized=1, freeze_authority_option=0, freeze_authority=bytes(32))))
+        self.node.set_account(rentid, data=RENT_LAYOUT.build(dict(
+            lamports_per_byte_year=3480, exemption_threshold=2.0, burn_percent=50)))
+        self.spl = SplToken(self.node.url)
+
+    def tearDown(self):
+        self.node.stop()
+        shutil.rmtree(self.directory)
+
+    def sent(self):
+        return list(self.node.transactions.values())
+
+    def test_transfer_many(self):
+        token_account = Account(4).public_key()
+        self.node.set_account(token_account, owner=TOKEN_PROGRAM_ID, data=bytes(ACCOUNT_LEN))
+        wallets = [Account(index + 10).public_key() for index in range(SPL_TOKEN_INSTRUCTIONS_PER_TRANSACTION)]
+        transfers = [(token_account, "1.5")] + [(wallet, 2) for wallet in wallets]
+
+        receipts = self.spl.transfer_many(self.mint, transfers, owner=self.owner)
+        self.assertEqual(len(receipts), 2)
+        trxs = self.sent()
+        self.assertEqual([len(trx.instructions) for trx in trxs], [SPL_TOKEN_INSTRUCTIONS_PER_TRANSACTION, 1])
+        self.assertEqual([[pair.pubkey for pair in trx.signatures] for trx in trxs],
+                         [[self.wallet.public_key(), self.owner.public_key()]] * 2)
+
+        instructions = [instruction for trx in trxs for instruction in trx.instructions]
+        # token accounts receive the tokens, wallets receive them in their associated token accounts
+        self.assertEqual([instruction.keys[2].pubkey for instruction in instructions],
+                         [token_account] + [get_associated_token_address(wallet, self.mint) for wallet in wallets])
+        self.assertEqual([int.from_bytes(instruction.data[1:9], "little") for instruction in instructions],
+                         [150] + [200] * len(wallets))
+        self.assertEqual(instructions[0].keys[0].pubkey, get_associated_token_address(self.owner.public_key(), self.mint))
+
+    def test_fee_payer(self):
+        fee_payer = Account(5)
+        self.spl.mint(self.mint, Account(4).public_key(), 1, owner=self.owner, fee_payer=fee_payer)
+        (trx,) = self.sent()
+        self.assertEqual([pair.pubkey for pair in trx.signatures], [fee_payer.public_key(), self.owner.public_key()])
+
+    def test_failed_transaction(self):
+        def failing(params):
+            signature = self.node._rpc_sendTransaction(params)
+            self.node.statuses[signature] = status(err={"InstructionError": [0, {"Custom": 1}]})
+            return signature
+
+        self.node.handlers["sendTransaction"] = failing
+        with self.assertRaisesRegex(Exception, "failed"):
+            self.spl.transfer(self.mint, 1, Account(4).public_key(), owner=self.owner)
+
+    def test_create_token(self):
+        mint = self.spl.create_token(owner=self.owner, decimals=9)
+        self.assertIsInstance(mint, str)
+        (trx,) = self.sent()
+        self.assertEqual([pair.pubkey for pair in trx.signatures], [self.wallet.public_key(), PublicKey(mint)])
+        # lamports of the created account, rent-exempt for the mint size
+        self.assertEqual(int.from_bytes(trx.instructions[0].data[4:12], "little"), 1461600)
+        self.assertEqual(self.spl.decimals(mint), 9)
+
+    def test_create_token_accounts(self):
+        wallets = [Account(index + 10).public_key() for index in range(3)]
+        accounts = self.spl.create_token_accounts(self.mint, wallets)
+        self.assertEqual(accounts, [get_associated_token_address(wallet, self.mint) for wallet in wallets])
+        (trx,) = self.sent()
+        self.assertEqual([instruction.keys[1].pubkey for instruction in trx.instructions], accounts)
+        self.assertEqual(self.spl.create_token_account(self.mint, owner=self.owner),
+                         get_associated_token_address(self.owner.public_key(), self.mint))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -27,7 +27,7 @@ class EvmLoaderTestsNewAccount(unittest.TestCase):
     def setUpClass(cls):
         print("\ntest_transaction.py setUpClass")
 
-        cls.token = SplToken(solana_url)
+        cls.token = SplToken(solana_config.solana_url)
         wallet = OperatorAccount(operator1_keypair_path())
         cls.loader = EvmLoader(wallet, evm_loader_id)
         cls.acc = wallet.get_acc()
@@ -65,8 +65,8 @@ class EvmLoaderTestsNewAccount(unittest.TestCase):
         print("wallet_2: ", wallet_2.path)
 
         if getBalance(cls.acc_2.public_key()) == 0:
-            tx = client.request_airdrop(cls.acc_2.public_key(), 10 * 10 ** 9)
-            confirm_transaction(client, tx['result'])
+            tx = solana_config.client.request_airdrop(cls.acc_2.public_key(), 10 * 10 ** 9)
+            confirm_transaction(solana_config.client, tx['result'])
 
         # Create ethereum account for user 2 account
         cls.caller_ether_2 = eth_keys.PrivateKey(cls.acc_2.secret_key()).public_key.to_canonical_address()
@@ -81,7 +81,7 @@ class EvmLoaderTestsNewAccount(unittest.TestCase):
             trx = TransactionWithComputeBudget()
             trx.add(createAccountWithSeed(self.acc.public_key(), self.acc.public_key(), seed, 10 ** 9, 128 * 1024,
                                           PublicKey(evm_loader_id)))
-            send_transaction(client, trx, self.acc)
+            send_transaction(solana_config.client, trx, self.acc)
 
         return storage
 
@@ -98,7 +98,7 @@ class EvmLoaderTestsNewAccount(unittest.TestCase):
 
     def get_keccak_instruction_and_trx_data(self, data_start, secret_key, caller, caller_ether, trx_cnt=None):
         if trx_cnt is None:
-            trx_cnt = getTransactionCount(client, caller)
+            trx_cnt = getTransactionCount(solana_config.client, caller)
         tx = self.get_tx(trx_cnt)
         (from_addr, sign, msg) = make_instruction_data_from_tx(tx, secret_key)
         keccak_instruction_data = make_keccak_instruction_data(3, len(msg), data_start)
@@ -226,7 +226,7 @@ class EvmLoaderTestsNewAccount(unittest.TestCase):
             .add(keccak_instruction) \
             .add(self.neon_emv_instr_05(trx_data, self.caller))
 
-        response = send_transaction(client, trx, self.acc)
+        response = send_transaction(solana_config.client, trx, self.acc)
         print('response:', response)
 
     def test_02_success_tx_send_iteratively_in_3_solana_transactions_sequentially(self):
@@ -238,11 +238,11 @@ class EvmLoaderTestsNewAccount(unittest.TestCase):
         trx = TransactionWithComputeBudget() \
             .add(neon_emv_instr_0d)
 
-        response = send_transaction(client, trx, self.acc)
+        response = send_transaction(solana_config.client, trx, self.acc)
         print('response_1:', response)
-        response = send_transaction(client, trx, self.acc)
+        response = send_transaction(solana_config.client, trx, self.acc)
         print('response_2:', response)
-        response = send_transaction(client, trx, self.acc)
+        response = send_transaction(solana_config.client, trx, self.acc)
         print('response_3:', response)
 
 
@@ -266,15 +266,15 @@ class EvmLoaderTestsNewAccount(unittest.TestCase):
         trx = TransactionWithComputeBudget() \
             .add(neon_emv_instr_0d)
 
-        response = send_transaction(client, trx, self.acc)
+        response = send_transaction(solana_config.client, trx, self.acc)
         print('response_1:', response)
-        response = send_transaction(client, trx, self.acc)
+        response = send_transaction(solana_config.client, trx, self.acc)
         print('response_2:', response)
-        response = send_transaction(client, trx, self.acc)
+        response = send_transaction(solana_config.client, trx, self.acc)
         print('response_3:', response)
 
         try:
-            send_transaction(client, trx, self.acc)
+            send_transaction(solana_config.client, trx, self.acc)
         except Exception as err:
             if str(err).startswith(
                     "Transaction simulation failed: Error processing Instruction 2: custom program error: 0x4"):
@@ -293,7 +293,7 @@ class EvmLoaderTestsNewAccount(unittest.TestCase):
             .add(neon_emv_instr_0d) \
             .add(neon_emv_instr_0d)
 
-        response = send_transaction(client, trx, self.acc)
+        response = send_transaction(solana_config.client, trx, self.acc)
         print('response:', response)
 
         evm_step_executed = 230
@@ -319,7 +319,7 @@ class EvmLoaderTestsNewAccount(unittest.TestCase):
             .add(neon_emv_instr_0d)
             # .add(neon_emv_instr_0d)
         try:
-            send_transaction(client, trx, self.acc)
+            send_transaction(solana_config.client, trx, self.acc)
         except Exception as err:
             if str(err).startswith(
                     "Transaction simulation failed: Error processing Instruction 4: custom program error: 0x4"):
@@ -344,7 +344,7 @@ class EvmLoaderTestsNewAccount(unittest.TestCase):
             .add(neon_emv_instr_0d)
 
         with self.assertRaisesRegex(RuntimeError, 'transaction too large'):
-            response = send_transaction(client, trx, self.acc)
+            response = send_transaction(solana_config.client, trx, self.acc)
             print(response)
 
         print('the solana transaction is too large')
@@ -362,7 +362,7 @@ class EvmLoaderTestsNewAccount(unittest.TestCase):
         print('Send a transaction "combined continue(0x0d)" before creating an account - wait for the confirmation '
               'and make sure of the error. See https://github.com/neonlabsorg/neon-evm/pull/320')
         with self.assertRaisesRegex(Exception, "invalid program argument"):
-            send_transaction(client, trx, self.acc)
+            send_transaction(solana_config.client, trx, self.acc)
 
         if getBalance(self.caller_2) == 0:
             print("Send a transaction to create an account - wait for the confirmation and make sure of successful "
@@ -375,24 +375,24 @@ class EvmLoaderTestsNewAccount(unittest.TestCase):
         print('Account_2:', self.acc_2.public_key(), bytes(self.acc_2.public_key()).hex())
         print("Caller_2:", self.caller_ether_2.hex(), self.caller_nonce_2, "->", self.caller_2,
               "({})".format(bytes(PublicKey(self.caller_2)).hex()))
-        neon_balance_on_start = getNeonBalance(client, self.caller_2)
+        neon_balance_on_start = getNeonBalance(solana_config.client, self.caller_2)
         print("Caller_2 NEON-token balance:", neon_balance_on_start)
 
         print('Send several transactions "combined continue(0x0d)" - wait for the confirmation and make sure of a '
               'successful completion')
 
-        response_0 = send_transaction(client, trx, self.acc)
+        response_0 = send_transaction(solana_config.client, trx, self.acc)
         print('response_0:', response_0)
-        neon_balance_on_response_0 = getNeonBalance(client, self.caller_2)
+        neon_balance_on_response_0 = getNeonBalance(solana_config.client, self.caller_2)
         print("Caller_2 NEON-token balance on response_0:", neon_balance_on_response_0)
-        response_1 = send_transaction(client, trx, self.acc)
+        response_1 = send_transaction(solana_config.client, trx, self.acc)
         print('response_1:', response_1)
-        neon_balance_on_response_1 = getNeonBalance(client, self.caller_2)
+        neon_balance_on_response_1 = getNeonBalance(solana_config.client, self.caller_2)
         print("Caller_2 NEON-token balance on response_1:", neon_balance_on_response_1)
 
-        response_2 = send_transaction(client, trx, self.acc)
+        response_2 = send_transaction(solana_config.client, trx, self.acc)
         print('response_2:', response_2)
-        neon_balance_on_response_2 = getNeonBalance(client, self.caller_2)
+        neon_balance_on_response_2 = getNeonBalance(solana_config.client, self.caller_2)
         print("Caller_2 NEON-token balance on response_2:", neon_balance_on_response_2)
 
         evm_step_executed = 230
@@ -412,7 +412,7 @@ class EvmLoaderTestsNewAccount(unittest.TestCase):
         print('the ether transaction was completed after creating solana-eth-account by three 0x0d transactions')
 
         try:
-            send_transaction(client, trx, self.acc)
+            send_transaction(solana_config.client, trx, self.acc)
         except Exception as err:
             if str(err).startswith(
                     "Transaction simulation failed: Error processing Instruction 2: custom program error: 0x4"):
@@ -420,7 +420,7 @@ class EvmLoaderTestsNewAccount(unittest.TestCase):
                 pass
             else:
                 raise
-        neon_balance_on_5_th_transaction = getNeonBalance(client, self.caller_2)
+        neon_balance_on_5_th_transaction = getNeonBalance(solana_config.client, self.caller_2)
 
         print("neon_balance_on_response_1", neon_balance_on_response_0)
         print("neon_balance_on_response_2", neon_balance_on_response_1)
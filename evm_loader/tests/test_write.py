@@ -87,7 +87,7 @@ class Test_Write(unittest.TestCase):
                                       data=write_holder_layout(nonce, 0, data),
                                       keys=metas))
         opts = TxOpts(skip_confirmation=True, preflight_commitment='confirmed')
-        return client.send_transaction(tx, signer, opts=opts)['id']
+        return send_signed_transaction(client, tx, signer, opts=opts)['id']
 
     def test_instruction_write_is_ok(self):
         print()